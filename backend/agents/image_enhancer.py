@@ -2,10 +2,12 @@ from __future__ import annotations
 """Image Enhancer Agent — generates enhanced images using Nano Banana Pro."""
 
 import logging
-from PIL import Image
 import google.genai as genai
-from tenacity import retry, stop_after_attempt, wait_exponential
+from budget import BudgetExceeded
 from config import config
+from image_asset import ImageAsset
+from model_calls import generate_content
+from tracing import traced
 
 logger = logging.getLogger("glowup.image_enhancer")
 
@@ -18,73 +20,64 @@ class ImageEnhancerAgent:
     The intelligence is in the Prompt Architect.
     """
 
-    @retry(
-        stop=stop_after_attempt(config.RETRY_MAX_ATTEMPTS),
-        wait=wait_exponential(
-            multiplier=config.RETRY_MULTIPLIER,
-            min=config.RETRY_MIN_WAIT,
-            max=config.RETRY_MAX_WAIT,
-        ),
-    )
-    def _call_api(self, contents, temperature):
-        client = genai.Client(api_key=config.GEMINI_API_KEY)
-        return client.models.generate_content(
-            model=config.IMAGE_MODEL,
-            contents=contents,
-            config=genai.types.GenerateContentConfig(
+    async def _call_api(self, contents, temperature):
+        return await generate_content(
+            config.IMAGE_MODEL,
+            contents,
+            genai.types.GenerateContentConfig(
                 response_modalities=["IMAGE"],
                 temperature=temperature,
             ),
         )
 
+    @traced("image_enhancer.enhance")
     async def enhance(
         self,
-        original_path: str,
+        original: ImageAsset,
         prompt: str,
-        reference_paths: list[str] | None = None,
+        references: list[ImageAsset] | None = None,
         temperature: float = 0.75,
-    ) -> bytes | None:
+    ) -> ImageAsset | None:
         """Generate an enhanced image.
 
         Args:
-            original_path: Path to user's original photo
+            original: The user's original photo
             prompt: The detailed enhancement prompt from the Prompt Architect
-            reference_paths: Optional paths to reference images from Photo Scout
+            references: Optional reference images from Photo Scout
             temperature: Generation temperature (higher = more variation)
 
         Returns:
-            Enhanced image as bytes, or None if generation failed
+            Enhanced image as an asset, or None if generation failed
+
+        Raises:
+            BudgetExceeded: the job's budget ran out; the pipeline stops retrying
         """
         contents = []
 
         # Add the original photo
-        original = Image.open(original_path)
-        contents.append(original)
+        contents.append(original.model_part())
 
         # Add reference images (up to 2 to keep within context limits)
-        if reference_paths:
-            for ref_path in reference_paths[:2]:
-                try:
-                    ref_img = Image.open(ref_path)
-                    contents.append(ref_img)
-                except Exception:
-                    continue
+        for ref in (references or [])[:2]:
+            contents.append(ref.model_part(config.MODEL_REFERENCE_MAX_DIMENSION))
 
         # Add the prompt
         contents.append(prompt)
 
         try:
-            response = self._call_api(contents, temperature)
+            response = await self._call_api(contents, temperature)
 
             # Extract the image from the response
             if response.candidates:
                 for part in response.candidates[0].content.parts:
                     if part.inline_data and part.inline_data.data:
-                        return part.inline_data.data
+                        return ImageAsset(part.inline_data.data)
 
             logger.warning("enhance: no image in response")
             return None
 
+        except BudgetExceeded:
+            raise
         except Exception as e:
             logger.error("enhance: generation error: %s", str(e))
             return None
@@ -4,6 +4,8 @@ from __future__ import annotations
 from mcp_servers.web_search import WebSearchMCP
 from mcp_servers.image_analysis import ImageAnalysisMCP
 from config import config
+from image_asset import ImageAsset
+from tracing import traced
 
 
 class PhotoScoutAgent:
@@ -15,46 +17,41 @@ class PhotoScoutAgent:
         - Web Search MCP (search + download references)
     """
 
-    def __init__(self):
-        self.search = WebSearchMCP()
-        self.analysis = ImageAnalysisMCP()
-
-    async def find_references(
+    def __init__(
         self,
-        user_photo_path: str,
-        vibe: str | None = None,
-        count: int | None = None,
-    ) -> list[str]:
-        """Analyze the user's photo and find matching professional references.
+        search: WebSearchMCP | None = None,
+        analysis: ImageAnalysisMCP | None = None,
+    ):
+        self.search = search or WebSearchMCP()
+        self.analysis = analysis or ImageAnalysisMCP()
+
+    @traced("photo_scout.analyze")
+    async def analyze(self, user_photo: ImageAsset) -> dict:
+        """Analyze the user's photo to understand what to search for."""
+        print("     [+] Analyzing photo characteristics...")
+        return await self.analysis.analyze_photo(user_photo)
 
-        Args:
-            user_photo_path: Path to the user's uploaded photo
-            vibe: Optional vibe/scene (e.g. "coffee_shop", "outdoors")
-            count: Number of references to find (defaults to config)
+    def build_query(self, analysis: dict, vibe: str | None = None) -> str:
+        """Build the reference search query for an analyzed photo."""
+        if vibe:
+            # Vibe mode: search for the specific vibe/setting
+            return f"professional portrait {vibe} {analysis.get('gender', '')} photography"
+        # Enhance mode: use the AI-generated search query
+        return analysis.get(
+            "search_query",
+            f"professional portrait {analysis.get('setting', '')} photography"
+        )
+
+    @traced("photo_scout.fetch_references")
+    async def fetch_references(self, query: str, count: int | None = None) -> list[str]:
+        """Search for and download up to ``count`` references for a query.
 
         Returns:
             List of local file paths to downloaded reference images
         """
         count = count or config.NUM_SCOUT_REFS
-
-        # Step 1: Analyze the user's photo to understand what to search for
-        print("     [+] Analyzing photo characteristics...")
-        analysis = await self.analysis.analyze_photo(user_photo_path)
-
-        # Step 2: Build search query
-        if vibe:
-            # Vibe mode: search for the specific vibe/setting
-            query = f"professional portrait {vibe} {analysis.get('gender', '')} photography"
-        else:
-            # Enhance mode: use the AI-generated search query
-            query = analysis.get(
-                "search_query",
-                f"professional portrait {analysis.get('setting', '')} photography"
-            )
-
         print(f"     [*] Searching: \"{query}\"")
 
-        # Step 3: Search for matching photos
         search_results = await self.search.search_images(
             query=query, count=count + 2  # fetch extras in case some fail to download
         )
@@ -63,7 +60,7 @@ class PhotoScoutAgent:
             print("     [!] No search results found, using photo as-is")
             return []
 
-        # Step 4: Download the top matches
+        # Download the top matches
         downloaded = []
         for result in search_results:
             if len(downloaded) >= count:
@@ -75,12 +72,26 @@ class PhotoScoutAgent:
                 photographer = result.get("photographer", "unknown")
                 print(f"     [+] Ref {len(downloaded)}: {src} by {photographer}")
 
-        # Also store the analysis for the Prompt Architect to use
-        self._last_analysis = analysis
-
         return downloaded
 
-    @property
-    def last_analysis(self) -> dict:
-        """Get the analysis from the most recent find_references call."""
-        return getattr(self, "_last_analysis", {})
+    @traced("photo_scout.find_references")
+    async def find_references(
+        self,
+        user_photo: ImageAsset,
+        vibe: str | None = None,
+        count: int | None = None,
+    ) -> tuple[dict, list[str]]:
+        """Analyze the user's photo and find matching professional references.
+
+        Args:
+            user_photo: The user's photo (working copy asset)
+            vibe: Optional vibe/scene (e.g. "coffee_shop", "outdoors")
+            count: Number of references to find (defaults to config)
+
+        Returns:
+            (photo analysis for the Prompt Architect, local file paths to
+            downloaded reference images)
+        """
+        analysis = await self.analyze(user_photo)
+        downloaded = await self.fetch_references(self.build_query(analysis, vibe), count)
+        return analysis, downloaded
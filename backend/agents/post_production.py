@@ -1,22 +1,51 @@
 from __future__ import annotations
 """Post-Production Agent — applies realism post-processing to generated images."""
 
+import asyncio
 import logging
+import os
+import posixpath
 import random
 from io import BytesIO
 from PIL import Image, ImageEnhance, ImageFilter
 from mcp_servers.storage import StorageMCP
 from config import config
+from image_asset import HAS_PIEXIF, ImageAsset
+from tracing import traced
 
-# Try to import piexif for EXIF injection; optional
-try:
+if HAS_PIEXIF:
     import piexif
-    HAS_PIEXIF = True
-except ImportError:
-    HAS_PIEXIF = False
 
 logger = logging.getLogger("glowup.post_production")
 
+# Rendition output format -> (PIL format name, file extension)
+_RENDITION_FORMATS = {
+    "jpeg": ("JPEG", "jpg"),
+    "webp": ("WEBP", "webp"),
+}
+
+
+def rendition_filenames(filename: str) -> dict[str, dict[str, str]]:
+    """Map a final image filename to its pre-rendered rendition filenames.
+
+    e.g. "abc_enhanced_1.jpg" -> {"thumb": {"jpeg": "abc_enhanced_1_thumb.jpg",
+    "webp": "abc_enhanced_1_thumb.webp"}, "preview": {...}}
+    """
+    stem = os.path.splitext(filename)[0]
+    return {
+        name: {fmt: f"{stem}_{name}.{ext}" for fmt, (_, ext) in _RENDITION_FORMATS.items()}
+        for name in config.RENDITION_SIZES
+    }
+
+
+def rendition_keys(key: str) -> dict[str, dict[str, str]]:
+    """``rendition_filenames`` for a storage key, kept in the key's directory."""
+    directory, filename = posixpath.split(key)
+    return {
+        name: {fmt: posixpath.join(directory, fname) for fmt, fname in formats.items()}
+        for name, formats in rendition_filenames(filename).items()
+    }
+
 
 class PostProductionAgent:
     """Agent that applies final post-processing to make the generated image
@@ -30,42 +59,90 @@ class PostProductionAgent:
         5. JPEG compression at realistic quality
         6. EXIF metadata (stripped by default for privacy)
 
+    Also writes thumbnail and preview renditions (JPEG + WebP) from the same
+    processed pixels, so galleries never have to load full-size images.
+
     MCP servers used:
         - Storage MCP (save final image)
     """
 
-    def __init__(self):
-        self.storage = StorageMCP()
+    def __init__(self, storage: StorageMCP | None = None):
+        self.storage = storage or StorageMCP()
 
+    @traced("post_production.process_and_save")
     async def process_and_save(
         self,
-        image_bytes: bytes,
-        output_path: str,
-        original_path: str | None = None,
+        image: ImageAsset,
+        key: str,
+        original: ImageAsset | None = None,
     ) -> str:
         """Apply all post-processing and save the result.
 
         Args:
-            image_bytes: Raw generated image bytes
-            output_path: Where to save the final JPEG
-            original_path: Optional path to original photo (to preserve EXIF)
+            image: The generated image (its decoded pixels are reused)
+            key: Storage key for the final JPEG (see ``job_key``)
+            original: Optional original photo (to preserve EXIF)
 
         Returns:
-            Path to the saved file
+            Storage key of the saved file (renditions are saved alongside
+            it, named per ``rendition_filenames``)
         """
-        final_bytes = self._make_it_look_real(image_bytes, original_path)
-
-        # Save via Storage MCP
-        import os
-        filename = os.path.basename(output_path)
-        subdir = os.path.dirname(output_path).replace("outputs/", "").replace("outputs\\", "")
-        path = await self.storage.save(final_bytes, filename, subdir)
-        logger.info("post_production.saved path=%s size_kb=%d", path, len(final_bytes) // 1024)
-        return path
+        # Pixel work runs off the event loop so other jobs keep moving meanwhile
+        final_bytes, final_img = await asyncio.to_thread(self._make_it_look_real, image, original)
+
+        # Save via Storage MCP while the renditions are encoded
+        _, renditions = await asyncio.gather(
+            self.storage.save(final_bytes, key),
+            asyncio.to_thread(self._render_renditions, final_img),
+        )
+        logger.info("post_production.saved key=%s size_kb=%d", key, len(final_bytes) // 1024)
+
+        names = rendition_keys(key)
+        await asyncio.gather(*(
+            self.storage.save(data, names[name][fmt]) for (name, fmt), data in renditions.items()
+        ))
+        logger.info(
+            "post_production.renditions key=%s count=%d size_kb=%d",
+            key, len(renditions), sum(len(d) for d in renditions.values()) // 1024,
+        )
+        return key
+
+    @traced("post_production.render_renditions")
+    def _render_renditions(self, img: Image.Image) -> dict[tuple[str, str], bytes]:
+        """Encode downscaled thumbnail/preview renditions in every rendition format.
+
+        Renditions carry no EXIF; they are display copies only.
+        """
+        renditions = {}
+        # Largest first, so each smaller rendition resamples an already-reduced image
+        source = img
+        for name, max_side in sorted(config.RENDITION_SIZES.items(), key=lambda kv: -kv[1]):
+            resized = source.copy()
+            resized.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+            source = resized
+            for fmt, (pil_format, _) in _RENDITION_FORMATS.items():
+                buffer = BytesIO()
+                if pil_format == "WEBP":
+                    resized.save(buffer, format=pil_format, quality=config.RENDITION_WEBP_QUALITY, method=4)
+                else:
+                    resized.save(
+                        buffer, format=pil_format,
+                        quality=config.RENDITION_JPEG_QUALITY, optimize=True, progressive=True,
+                    )
+                renditions[(name, fmt)] = buffer.getvalue()
+        return renditions
+
+    @traced("post_production.make_it_look_real")
+    def _make_it_look_real(
+        self, image: ImageAsset, original: ImageAsset | None = None
+    ) -> tuple[bytes, Image.Image]:
+        """Apply all realism post-processing layers.
 
-    def _make_it_look_real(self, image_bytes: bytes, original_path: str | None = None) -> bytes:
-        """Apply all realism post-processing layers."""
-        img = Image.open(BytesIO(image_bytes)).convert("RGB")
+        Returns:
+            (final JPEG bytes, processed image for rendering renditions)
+        """
+        # Every layer below returns a new image, so the shared decode is never modified
+        img = image.rgb
 
         # 1. Subtle lens vignette
         img = self._apply_vignette(img, strength=config.VIGNETTE_STRENGTH)
@@ -91,10 +168,10 @@ class PostProductionAgent:
 
         # 7. Handle EXIF metadata
         jpeg_bytes = buffer.getvalue()
-        if HAS_PIEXIF and original_path:
-            jpeg_bytes = self._copy_exif_from_original(jpeg_bytes, original_path)
+        if HAS_PIEXIF and original is not None:
+            jpeg_bytes = self._copy_exif_from_original(jpeg_bytes, original)
 
-        return jpeg_bytes
+        return jpeg_bytes, img
 
     def _apply_vignette(self, img: Image.Image, strength: float = 0.15) -> Image.Image:
         """Apply a subtle lens vignette (darkening at edges)."""
@@ -125,17 +202,18 @@ class PostProductionAgent:
         img_array = np.clip(img_array + noise, 0, 255).astype(np.uint8)
         return Image.fromarray(img_array)
 
-    def _copy_exif_from_original(self, jpeg_bytes: bytes, original_path: str) -> bytes:
+    def _copy_exif_from_original(self, jpeg_bytes: bytes, original: ImageAsset) -> bytes:
         """Copy EXIF from the original photo if available, otherwise strip EXIF."""
         if not HAS_PIEXIF:
             return jpeg_bytes
 
+        # Parsed once per original and shared by every variation;
+        # GPS/location data is stripped for privacy
+        exif_bytes = original.exif_without_gps
+        if exif_bytes is None:
+            logger.debug("No EXIF to copy from original, returning clean JPEG")
+            return jpeg_bytes
         try:
-            original_exif = piexif.load(original_path)
-            # Only copy basic camera info, strip GPS/location data for privacy
-            if "GPS" in original_exif:
-                original_exif["GPS"] = {}
-            exif_bytes = piexif.dump(original_exif)
             return piexif.insert(exif_bytes, jpeg_bytes)
         except Exception:
             # If original has no EXIF or it fails, return without EXIF (privacy-safe default)
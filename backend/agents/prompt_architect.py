@@ -2,14 +2,129 @@ from __future__ import annotations
 """Prompt Architect Agent — analyzes all inputs and writes the perfect prompt."""
 
 import logging
-from PIL import Image
-import google.genai as genai
+from image_asset import ImageAsset
 from mcp_servers.prompt_library import PromptLibraryMCP
+from mcp_servers.style_library import StyleLibraryMCP
 from config import config
-from tenacity import retry, stop_after_attempt, wait_exponential
+from model_calls import generate_content
+from prompt_templates import PromptSection, PromptTemplate
+from tracing import traced
 
 logger = logging.getLogger("glowup.prompt_architect")
 
+# ── Prompt templates (compiled once at import) ─────────────────────
+# Optional sections are dropped lowest-priority first when a prompt runs over
+# PROMPT_MAX_BYTES; past prompts are the cheapest to lose, realism rules the
+# most expensive.
+
+_STYLE_SECTION = PromptSection("style", """
+    AESTHETIC STYLE GOAL: {style_name}
+    {style_description}
+
+    YOU MUST seamlessly integrate the following specific aesthetic phrasing into
+    your final generated prompt (adjusting subject descriptions to match Image 1):
+
+    "{style_instruction}"
+    """, priority=3)
+
+_PAST_SECTION = PromptSection("past_prompts", """
+    Here are prompts that worked well for similar photos:
+    {past_prompts}
+    """, priority=0)
+
+_PATTERNS_SECTION = PromptSection("patterns", """
+    Include these proven enhancement patterns:
+    {patterns}
+    """, priority=1)
+
+_REALISM_SECTION = PromptSection("realism_rules", "{realism_rules}", priority=4)
+
+_FORMAT_SECTION = PromptSection("format", """
+    Write the prompt in this exact format:
+
+    SUBJECT: [describe the person — face, hair, skin tone, build, clothing exactly from Image 1]
+    SCENE: [describe the setting to recreate/create]
+    LIGHTING: [specific lighting direction, quality, color temperature — incorporate style injection here if relevant]
+    CAMERA: [specific lens, camera body, depth-of-field — incorporate style injection here if relevant]
+    EXPRESSION: [specific expression direction]
+    DETAILS: [specific details to include for maximum realism]
+    AVOID: [things that would make it look AI-generated]
+
+    Be EXTREMELY specific. Every detail matters for realism.
+    Make absolutely sure the SUBJECT description matches the uploaded photo exactly!
+    """, required=True)
+
+_VIBE_TEMPLATE = PromptTemplate(
+    "architect.vibe",
+    PromptSection("task", """
+        You are an expert AI prompt engineer specializing in photo-realistic
+        image generation. You have been given:
+
+        - Image 1: The user's ORIGINAL photo (this person's identity must be preserved)
+        - Images 2-{last_image}: Professional REFERENCE photos found from the web
+          (use these for composition, lighting, and setting inspiration ONLY — NOT their identity)
+
+        TASK: Write a detailed image generation prompt that creates a NEW image of the
+        person from Image 1 in a "{vibe}" setting/vibe.
+
+        - PRESERVE: The person's face, skin tone, body type, and identity exactly from Image 1
+        - CHANGE: Setting, lighting, and composition inspired by the reference photos
+        - The result must look like a REAL high-end photo for a dating app.
+        """, required=True),
+    _STYLE_SECTION,
+    _PAST_SECTION,
+    _PATTERNS_SECTION,
+    _REALISM_SECTION,
+    _FORMAT_SECTION,
+)
+
+_ENHANCE_TEMPLATE = PromptTemplate(
+    "architect.enhance",
+    PromptSection("task", """
+        You are an expert AI prompt engineer specializing in photo-realistic
+        image enhancement. You have been given:
+
+        - Image 1: The user's ORIGINAL photo (enhance THIS scene)
+        - Images 2-{last_image}: Professional REFERENCE photos found from the web
+          (use these for lighting and quality inspiration ONLY)
+
+        TASK: Write a detailed image ENHANCEMENT prompt that recreates the SAME scene
+        from Image 1 but with dramatically better:
+        - Lighting (fix issues, add warmth, natural golden tones)
+        - Composition (better framing if needed)
+        - Skin/facial quality (clearer, natural texture, NOT airbrushed)
+        - Background (slightly cleaner, better bokeh)
+        - Overall feel (more attractive, approachable, dating-app worthy)
+
+        CRITICAL: Keep the SAME clothes, SAME setting, SAME pose, SAME person.
+        Just make everything look much better — like a pro photographer was there.
+        Study the reference photos for how professional lighting should look.
+        """, required=True),
+    _STYLE_SECTION,
+    _PAST_SECTION,
+    _PATTERNS_SECTION,
+    _REALISM_SECTION,
+    _FORMAT_SECTION,
+)
+
+_FIX_TEMPLATE = PromptTemplate(
+    "architect.fix",
+    PromptSection("task", """
+        The previous enhancement prompt produced an image with these issues:
+        {issues}
+
+        Original prompt was:
+        {original_prompt}
+
+        Rewrite the prompt to specifically FIX these issues.
+        Add EXPLICIT instructions to avoid each listed problem.
+        Keep everything else the same — only fix the problems.
+
+        {vibe_instruction}
+        """, required=True),
+    _REALISM_SECTION,
+)
+
 
 class PromptArchitectAgent:
     """Agent that takes the user's photo, scouted references, and optional
@@ -18,200 +133,150 @@ class PromptArchitectAgent:
 
     MCP servers used:
         - Prompt Library MCP (retrieve successful past prompts + realism rules)
+        - Style Library MCP (aesthetic style presets)
     """
 
-    @retry(
-        stop=stop_after_attempt(config.RETRY_MAX_ATTEMPTS),
-        wait=wait_exponential(
-            multiplier=config.RETRY_MULTIPLIER,
-            min=config.RETRY_MIN_WAIT,
-            max=config.RETRY_MAX_WAIT,
-        ),
-    )
-    def _call_api(self, contents):
-        client = genai.Client(api_key=config.GEMINI_API_KEY)
-        return client.models.generate_content(
-            model=config.PROMPT_MODEL,
-            contents=contents,
-        )
+    async def _call_api(self, contents):
+        return await generate_content(config.PROMPT_MODEL, contents)
 
-    def __init__(self):
-        self.library = PromptLibraryMCP()
+    def __init__(
+        self,
+        library: PromptLibraryMCP | None = None,
+        styles: StyleLibraryMCP | None = None,
+    ):
+        self.library = library or PromptLibraryMCP()
+        self.styles = styles or StyleLibraryMCP()
+        self._static_context: dict | None = None
+
+    async def _static_library(self) -> dict:
+        """Realism rules and default enhancement patterns — fetched once per agent.
+
+        Static library data, not job state; concurrent first calls may both
+        fetch it, and either result is the same.
+        """
+        if self._static_context is None:
+            patterns = await self.library.get_enhancement_patterns()
+            self._static_context = {
+                "realism_rules": await self.library.get_realism_rules(),
+                "enhancement_patterns": patterns,
+                "patterns_text": "\n".join(f"- {p}" for p in patterns),
+            }
+        return self._static_context
+
+    @traced("prompt_architect.load_library_context")
+    async def load_library_context(
+        self,
+        vibe: str | None = None,
+        style: str | None = None,
+        photo_analysis: dict | None = None,
+    ) -> dict:
+        """Fetch the prompt-library inputs shared by every prompt for a photo.
 
+        The result can be passed to ``generate_prompt`` for each variation so
+        the library is read once per photo, not once per prompt. Past prompts
+        are the nearest past winners to ``photo_analysis``, topped up along
+        the vibe -> style -> default scenario hierarchy.
+        """
+        limit = 2
+        past_prompts = []
+        if photo_analysis:
+            past_prompts = await self.library.get_similar_prompts(photo_analysis, limit=limit)
+        if len(past_prompts) < limit:
+            seen = {p["prompt"] for p in past_prompts}
+            for p in await self.library.get_prompts_for(vibe, style, limit=limit):
+                if len(past_prompts) < limit and p["prompt"] not in seen:
+                    past_prompts.append(p)
+        return {**await self._static_library(), "past_prompts": past_prompts}
+
+    @traced("prompt_architect.generate_prompt")
     async def generate_prompt(
         self,
-        original_path: str,
-        reference_paths: list[str],
+        original: ImageAsset,
+        references: list[ImageAsset],
         mode: str = "enhance",
         vibe: str | None = None,
         photo_analysis: dict | None = None,
+        library_context: dict | None = None,
     ) -> str:
         """Generate a detailed enhancement prompt by analyzing all inputs.
 
         Args:
-            original_path: Path to user's original photo
-            reference_paths: Paths to scouted reference images
+            original: The user's original photo
+            references: Scouted reference images
             mode: "enhance" (improve as-is) or "vibe" (change setting)
             vibe: Optional vibe name if mode is "vibe"
             photo_analysis: Optional pre-computed analysis from Photo Scout
+            library_context: Optional pre-fetched result of ``load_library_context``
 
         Returns:
             Detailed enhancement prompt string
         """
         # Get realism rules and past successful patterns
-        realism_rules = await self.library.get_realism_rules()
-        scenario = f"{vibe}_vibe" if vibe else "default_enhance"
-        past_prompts = await self.library.get_successful_prompts(scenario, limit=2)
-        enhancement_patterns = await self.library.get_enhancement_patterns()
+        library_context = library_context or await self.load_library_context(
+            vibe, (photo_analysis or {}).get("style_category"), photo_analysis
+        )
 
         # Handle aesthetic style categorization
-        from mcp_servers.style_library import StyleLibraryMCP
-        style_library = StyleLibraryMCP()
-
         style_data = None
         if photo_analysis and "style_category" in photo_analysis:
-            style_category = photo_analysis["style_category"]
-            style_data = await style_library.get_style_by_id(style_category)
+            style_data = await self.styles.get_style_by_id(photo_analysis["style_category"])
 
         # Build the contents list for Gemini
         contents = []
 
         # Add user's original photo
-        user_photo = Image.open(original_path)
-        contents.append(user_photo)
+        contents.append(original.model_part())
 
         # Add reference photos (up to 3, to stay within context limits)
-        ref_images = []
-        for ref_path in reference_paths[:3]:
-            try:
-                ref_img = Image.open(ref_path)
-                ref_images.append(ref_img)
-                contents.append(ref_img)
-            except Exception:
-                continue
-
-        # Prepare style injection if available
-        style_injection = ""
-        if style_data:
-            style_injection = f"""
-            AESTHETIC STYLE GOAL: {style_data['name']}
-            {style_data['description']}
-
-            YOU MUST seamlessly integrate the following specific aesthetic phrasing into
-            your final generated prompt (adjusting subject descriptions to match Image 1):
-
-            "{style_data['instruction']}"
-            """
-
-        # Build the analysis instruction
-        if mode == "vibe" and vibe:
-            task = f"""You are an expert AI prompt engineer specializing in photo-realistic
-            image generation. You have been given:
-
-            - Image 1: The user's ORIGINAL photo (this person's identity must be preserved)
-            - Images 2-{1 + len(ref_images)}: Professional REFERENCE photos found from the web
-              (use these for composition, lighting, and setting inspiration ONLY — NOT their identity)
-
-            TASK: Write a detailed image generation prompt that creates a NEW image of the
-            person from Image 1 in a "{vibe}" setting/vibe.
-
-            - PRESERVE: The person's face, skin tone, body type, and identity exactly from Image 1
-            - CHANGE: Setting, lighting, and composition inspired by the reference photos
-            - The result must look like a REAL high-end photo for a dating app.
-
-            {style_injection}"""
-        else:
-            task = f"""You are an expert AI prompt engineer specializing in photo-realistic
-            image enhancement. You have been given:
-
-            - Image 1: The user's ORIGINAL photo (enhance THIS scene)
-            - Images 2-{1 + len(ref_images)}: Professional REFERENCE photos found from the web
-              (use these for lighting and quality inspiration ONLY)
-
-            TASK: Write a detailed image ENHANCEMENT prompt that recreates the SAME scene
-            from Image 1 but with dramatically better:
-            - Lighting (fix issues, add warmth, natural golden tones)
-            - Composition (better framing if needed)
-            - Skin/facial quality (clearer, natural texture, NOT airbrushed)
-            - Background (slightly cleaner, better bokeh)
-            - Overall feel (more attractive, approachable, dating-app worthy)
-
-            CRITICAL: Keep the SAME clothes, SAME setting, SAME pose, SAME person.
-            Just make everything look much better — like a pro photographer was there.
-            Study the reference photos for how professional lighting should look.
-
-            {style_injection}"""
-
-        # Add past successful patterns if available
-        past_context = ""
-        if past_prompts:
-            past_context = "\n\nHere are prompts that worked well for similar photos:\n"
-            for p in past_prompts[:2]:
-                past_context += f"- (score {p['score']}): {p['prompt'][:200]}...\n"
-
-        # Add enhancement patterns
-        patterns_text = "\n".join(f"- {p}" for p in enhancement_patterns)
-
-        prompt_construction = f"""{task}
-
-        {past_context}
-
-        Include these proven enhancement patterns:
-        {patterns_text}
-
-        {realism_rules}
-
-        Write the prompt in this exact format:
-
-        SUBJECT: [describe the person — face, hair, skin tone, build, clothing exactly from Image 1]
-        SCENE: [describe the setting to recreate/create]
-        LIGHTING: [specific lighting direction, quality, color temperature — incorporate style injection here if relevant]
-        CAMERA: [specific lens, camera body, depth-of-field — incorporate style injection here if relevant]
-        EXPRESSION: [specific expression direction]
-        DETAILS: [specific details to include for maximum realism]
-        AVOID: [things that would make it look AI-generated]
-
-        Be EXTREMELY specific. Every detail matters for realism.
-        Make absolutely sure the SUBJECT description matches the uploaded photo exactly!
-        """
+        ref_images = references[:3]
+        for ref in ref_images:
+            contents.append(ref.model_part(config.MODEL_REFERENCE_MAX_DIMENSION))
+
+        template = _VIBE_TEMPLATE if mode == "vibe" and vibe else _ENHANCE_TEMPLATE
+        prompt_construction = template.render(
+            max_bytes=config.PROMPT_MAX_BYTES,
+            last_image=1 + len(ref_images),
+            vibe=vibe,
+            style_name=style_data["name"] if style_data else "",
+            style_description=style_data["description"] if style_data else "",
+            style_instruction=style_data["instruction"] if style_data else "",
+            past_prompts="\n".join(
+                f"- (score {p['score']}): {p['prompt'][:200]}..."
+                for p in library_context["past_prompts"][:2]
+            ),
+            patterns=library_context["patterns_text"],
+            realism_rules=library_context["realism_rules"],
+        )
 
         contents.append(prompt_construction)
 
-        response = self._call_api(contents)
+        response = await self._call_api(contents)
 
         logger.info("prompt_architect.generated chars=%d", len(response.text))
         return response.text
 
+    @traced("prompt_architect.fix_prompt")
     async def fix_prompt(
         self,
-        original_path: str,
+        original: ImageAsset,
         original_prompt: str,
         issues: list[str],
         vibe: str | None = None,
+        realism_rules: str | None = None,
     ) -> str:
         """Rewrite a prompt to fix specific quality issues found by the Inspector."""
-        photo = Image.open(original_path)
-        issues_text = "\n".join(f"- {issue}" for issue in issues)
-
-        realism_rules = await self.library.get_realism_rules()
+        realism_rules = realism_rules or (await self._static_library())["realism_rules"]
         vibe_instruction = f"The desired vibe is: {vibe}" if vibe else "Enhance the existing scene."
 
-        response = self._call_api([
-            photo,
-            f"""The previous enhancement prompt produced an image with these issues:
-            {issues_text}
-
-            Original prompt was:
-            {original_prompt}
-
-            Rewrite the prompt to specifically FIX these issues.
-            Add EXPLICIT instructions to avoid each listed problem.
-            Keep everything else the same — only fix the problems.
-
-            {vibe_instruction}
-
-            {realism_rules}
-            """,
+        response = await self._call_api([
+            original.model_part(),
+            _FIX_TEMPLATE.render(
+                max_bytes=config.PROMPT_MAX_BYTES,
+                issues="\n".join(f"- {issue}" for issue in issues),
+                original_prompt=original_prompt,
+                vibe_instruction=vibe_instruction,
+                realism_rules=realism_rules,
+            ),
         ])
 
         logger.info("prompt_architect.fixed chars=%d issues=%d", len(response.text), len(issues))
@@ -1,8 +1,12 @@
 """Quality Inspector Agent — evaluates generated images using a SEPARATE model."""
 
+import asyncio
+from image_asset import ImageAsset
 from mcp_servers.image_analysis import ImageAnalysisMCP
 from mcp_servers.prompt_library import PromptLibraryMCP
 from config import config
+from prescreen import prescreen
+from tracing import current_span, traced
 
 
 class QualityInspectorAgent:
@@ -17,45 +21,129 @@ class QualityInspectorAgent:
         - Prompt Library MCP (save successful prompt scores)
     """
 
-    def __init__(self):
-        self.analysis = ImageAnalysisMCP()
-        self.library = PromptLibraryMCP()
+    def __init__(
+        self,
+        analysis: ImageAnalysisMCP | None = None,
+        library: PromptLibraryMCP | None = None,
+    ):
+        self.analysis = analysis or ImageAnalysisMCP()
+        self.library = library or PromptLibraryMCP()
 
+    @traced("quality_inspector.evaluate")
     async def evaluate(
         self,
-        generated_bytes: bytes,
-        original_path: str,
+        generated: ImageAsset,
+        original: ImageAsset,
     ) -> dict:
         """Evaluate a generated image against the original.
 
         Args:
-            generated_bytes: The generated image as bytes
-            original_path: Path to the original user photo
+            generated: The generated image
+            original: The original user photo
 
         Returns:
             Score dict with verdict, scores, issues, and fix_suggestions
         """
+        # Obvious failures are rejected locally, without a vision call
+        warnings: list[tuple[str, str]] = []
+        if config.PRESCREEN_ENABLED:
+            failures, warnings = await asyncio.to_thread(prescreen, generated, original)
+            active = current_span()
+            if active is not None:
+                active.set_attribute("prescreen.rejected", bool(failures))
+            if failures:
+                return self._prescreen_score(failures)
+
         # Use the Image Analysis MCP for the comparison
-        score = await self.analysis.compare_photos(original_path, generated_bytes)
+        score = await self.analysis.compare_photos(original, generated)
+        return self._apply_verdict(score, warnings)
+
+    @traced("quality_inspector.evaluate_batch")
+    async def evaluate_batch(
+        self,
+        candidates: list[ImageAsset],
+        original: ImageAsset,
+    ) -> list[dict]:
+        """Evaluate several generated images against the original at once.
 
-        # Apply our pass/fail criteria
+        Each candidate is pre-screened locally; the survivors are scored in a
+        single batched comparison that sends the original only once.
+
+        Returns:
+            One score dict per candidate, in input order
+        """
+        scores: list[dict | None] = [None] * len(candidates)
+        warnings: list[list[tuple[str, str]]] = [[] for _ in candidates]
+        if config.PRESCREEN_ENABLED:
+            screened = await asyncio.gather(
+                *(asyncio.to_thread(prescreen, candidate, original) for candidate in candidates)
+            )
+            for i, (failures, candidate_warnings) in enumerate(screened):
+                warnings[i] = candidate_warnings
+                if failures:
+                    scores[i] = self._prescreen_score(failures)
+
+        pending = [i for i, score in enumerate(scores) if score is None]
+        if pending:
+            compared = await self.analysis.compare_photos_batch(
+                original, [candidates[i] for i in pending]
+            )
+            for i, score in zip(pending, compared):
+                scores[i] = self._apply_verdict(score, warnings[i])
+
+        active = current_span()
+        if active is not None:
+            active.set_attribute("inspector.candidates", len(candidates))
+            active.set_attribute("inspector.compared", len(pending))
+        return scores
+
+    @staticmethod
+    def _apply_verdict(score: dict, warnings: list[tuple[str, str]] | None = None) -> dict:
+        """Override the model's verdict with our pass/fail thresholds.
+
+        Pre-screen warnings do not change the verdict. They are kept on the
+        score, and a failed image also lists them with its issues so the
+        prompt rewrite can address them.
+        """
         overall = score.get("overall", 0)
         ai_risk = score.get("ai_detection_risk", 10)
 
-        # Override verdict based on our thresholds
         if overall >= config.QUALITY_THRESHOLD and ai_risk <= config.AI_DETECTION_MAX:
             score["verdict"] = "PASS"
         else:
             score["verdict"] = "FAIL"
 
+        if warnings:
+            score["warnings"] = [issue for issue, _ in warnings]
+            if score["verdict"] == "FAIL":
+                score["issues"] = list(score.get("issues", [])) + score["warnings"]
+                score["fix_suggestions"] = list(score.get("fix_suggestions", [])) + [
+                    suggestion for _, suggestion in warnings
+                ]
+
         return score
 
+    @staticmethod
+    def _prescreen_score(failures: list[tuple[str, str]]) -> dict:
+        """A FAIL score in the compare_photos shape, built from pre-screen hits."""
+        return {
+            "realism": 0, "identity_match": 0, "naturalness": 0,
+            "attractiveness": 0, "ai_detection_risk": 10,
+            "enhancement_quality": 0, "overall": 0,
+            "issues": [issue for issue, _ in failures],
+            "verdict": "FAIL",
+            "fix_suggestions": [suggestion for _, suggestion in failures],
+            "prescreened": True,
+        }
+
+    @traced("quality_inspector.save_result")
     async def save_result(
         self,
         prompt: str,
         score: dict,
         scenario: str = "",
         photo_description: str = "",
+        photo_analysis: dict | None = None,
     ):
         """Save a successful prompt result to the library for future learning."""
         if score.get("verdict") == "PASS":
@@ -64,4 +152,5 @@ class QualityInspectorAgent:
                 score=score.get("overall", 0),
                 scenario=scenario,
                 photo_description=photo_description,
+                photo_analysis=photo_analysis,
             )
@@ -0,0 +1,55 @@
+from __future__ import annotations
+"""App-scoped agent registry — one set of agents and MCP servers per process.
+
+Agents and MCP servers hold only process-wide, thread-safe resources (the
+prompt library store, the reference cache directory, model clients through
+the key pool); everything about a job — the photo, its analysis, references,
+prompts — is passed in as arguments. So they are built once, wired to a
+single instance of each MCP server, and shared by every job and request.
+"""
+
+import logging
+import threading
+from agents.image_enhancer import ImageEnhancerAgent
+from agents.photo_scout import PhotoScoutAgent
+from agents.post_production import PostProductionAgent
+from agents.prompt_architect import PromptArchitectAgent
+from agents.quality_inspector import QualityInspectorAgent
+from mcp_servers.image_analysis import ImageAnalysisMCP
+from mcp_servers.prompt_library import PromptLibraryMCP
+from mcp_servers.storage import StorageMCP
+from mcp_servers.style_library import StyleLibraryMCP
+from mcp_servers.web_search import WebSearchMCP
+from retry_policy import RetryPolicy
+
+logger = logging.getLogger("glowup.registry")
+
+
+class AgentRegistry:
+    """The five pipeline agents, sharing one instance of each MCP server,
+    plus the retry policy learned from their past attempts."""
+
+    def __init__(self):
+        analysis = ImageAnalysisMCP()
+        library = PromptLibraryMCP()
+        self.scout = PhotoScoutAgent(search=WebSearchMCP(), analysis=analysis)
+        self.architect = PromptArchitectAgent(library=library, styles=StyleLibraryMCP())
+        self.enhancer = ImageEnhancerAgent()
+        self.inspector = QualityInspectorAgent(analysis=analysis, library=library)
+        self.post_prod = PostProductionAgent(storage=StorageMCP())
+        self.retry_policy = RetryPolicy(library)
+
+
+_registry: AgentRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_agents() -> AgentRegistry:
+    """Return the process-wide agents, building them on first use (blocking)."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = AgentRegistry()
+                logger.info("registry.built")
+    return _registry
@@ -0,0 +1,91 @@
+from __future__ import annotations
+"""Per-job latency and model-call budget.
+
+A job opens a budget with ``job_budget(...)``; it is tracked in a context
+variable like the active trace span, so every model call made for the job —
+including tenacity retries — is charged to it without threading it through
+agent signatures. The pipeline consults the budget to shed work (fewer
+variations, fewer retries, no prompt rewrite) before it runs out, and
+``generate_content`` refuses calls once it has.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger("glowup.budget")
+
+
+class BudgetExceeded(Exception):
+    """A model call was attempted after the job's deadline or call budget ran out."""
+
+
+class JobBudget:
+    """Wall-clock deadline plus a cap on model calls for one job."""
+
+    def __init__(self, deadline_s: float, max_calls: int):
+        self.deadline_s = deadline_s
+        self.max_calls = max_calls
+        self._started = time.monotonic()
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    @property
+    def elapsed_s(self) -> float:
+        return time.monotonic() - self._started
+
+    @property
+    def remaining_s(self) -> float:
+        return max(0.0, self.deadline_s - self.elapsed_s)
+
+    @property
+    def remaining_calls(self) -> int:
+        return max(0, self.max_calls - self._calls)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.remaining_calls == 0 or self.remaining_s == 0.0
+
+    def affords(self, calls: int, seconds: float = 0.0) -> bool:
+        """True if ``calls`` more model calls fit, with ``seconds`` of deadline to spare."""
+        return self.remaining_calls >= calls and self.remaining_s >= seconds
+
+    def charge(self) -> None:
+        """Count one model call, or raise BudgetExceeded if none are left."""
+        with self._lock:
+            if self._calls >= self.max_calls:
+                raise BudgetExceeded(f"model call budget of {self.max_calls} spent")
+            if self.remaining_s == 0.0:
+                raise BudgetExceeded(f"job deadline of {self.deadline_s:.0f}s passed")
+            self._calls += 1
+
+
+_current_budget: contextvars.ContextVar[JobBudget | None] = contextvars.ContextVar(
+    "glowup_job_budget", default=None
+)
+
+
+@contextmanager
+def job_budget(deadline_s: float, max_calls: int):
+    """Run the enclosed job (and every task it spawns) under a fresh budget."""
+    budget = JobBudget(deadline_s, max_calls)
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+        logger.info(
+            "budget.done calls=%d/%d elapsed_s=%.0f deadline_s=%.0f",
+            budget.calls, budget.max_calls, budget.elapsed_s, budget.deadline_s,
+        )
+
+
+def current_budget() -> JobBudget | None:
+    """Return the active job's budget, if any."""
+    return _current_budget.get()
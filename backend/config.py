@@ -21,16 +21,13 @@ class Config:
     # ── API Keys ───────────────────────────────────────────────────
     raw_keys = os.getenv("GEMINI_API_KEYS", os.getenv("GEMINI_API_KEY", ""))
     GEMINI_API_KEYS: list[str] = [k.strip() for k in raw_keys.split(",") if k.strip()]
-    _key_index: int = 0
 
-    @property
-    def GEMINI_API_KEY(self) -> str:
-        """Returns the next Gemini API key using round-robin rotation."""
-        if not self.GEMINI_API_KEYS:
-            return ""
-        key = self.GEMINI_API_KEYS[self._key_index % len(self.GEMINI_API_KEYS)]
-        Config._key_index += 1
-        return key
+    # Per-key quota model used by key_pool.GeminiKeyPool
+    GEMINI_KEY_RPM: float = float(os.getenv("GEMINI_KEY_RPM", "15"))
+    GEMINI_KEY_BURST: int = int(os.getenv("GEMINI_KEY_BURST", "5"))
+    GEMINI_KEY_COOLDOWN_S: float = 30.0
+    GEMINI_KEY_COOLDOWN_MAX_S: float = 300.0
+    GEMINI_KEY_ERROR_WINDOW_S: float = 300.0
 
     # Photo Scout APIs
     UNSPLASH_API_KEY: str = os.getenv("UNSPLASH_API_KEY", "")
@@ -43,12 +40,44 @@ class Config:
     NUM_VARIATIONS: int = int(os.getenv("NUM_VARIATIONS", "1"))
     NUM_SCOUT_REFS: int = int(os.getenv("NUM_SCOUT_REFS", "3"))
 
+    # ── Job Budget (per job; batch jobs get JOB_MAX_MODEL_CALLS per photo) ──
+    JOB_DEADLINE_S: float = float(os.getenv("JOB_DEADLINE_S", "600"))
+    JOB_MAX_MODEL_CALLS: int = int(os.getenv("JOB_MAX_MODEL_CALLS", "40"))
+    # Wall time to reserve before starting another generate + inspect attempt
+    JOB_ATTEMPT_ESTIMATE_S: float = 60.0
+    # How long a job request waits for warm-up before it is answered with 503
+    WARMUP_WAIT_TIMEOUT_S: float = float(os.getenv("WARMUP_WAIT_TIMEOUT_S", "30"))
+
+    # ── Quality Pre-screen (local checks before the vision model) ──
+    PRESCREEN_ENABLED: bool = os.getenv("PRESCREEN_ENABLED", "true").lower() == "true"
+    # Output short side below this fraction of the original's is a downscaled render
+    PRESCREEN_MIN_SIDE_RATIO: float = float(os.getenv("PRESCREEN_MIN_SIDE_RATIO", "0.5"))
+    # Aspect drift beyond this is a warning for the inspector, not a rejection
+    PRESCREEN_MAX_ASPECT_DRIFT: float = float(os.getenv("PRESCREEN_MAX_ASPECT_DRIFT", "0.25"))
+    PRESCREEN_MIN_CONTRAST: float = 6.0
+    PRESCREEN_MIN_SHARPNESS: float = 10.0
+    PRESCREEN_SHARPNESS_RATIO: float = 0.15
+    PRESCREEN_MAX_COLOR_CAST: float = 0.6
+    PRESCREEN_COLOR_CAST_MARGIN: float = 0.25
+    PRESCREEN_IDENTICAL_HISTOGRAM: float = 0.995
+    PRESCREEN_IDENTICAL_SSIM: float = 0.97
+
     # ── Upload Limits ──────────────────────────────────────────────
     MAX_UPLOAD_SIZE_MB: int = int(os.getenv("MAX_UPLOAD_SIZE_MB", "20"))
     MAX_UPLOAD_SIZE_BYTES: int = MAX_UPLOAD_SIZE_MB * 1024 * 1024
     MAX_PHOTOS_PER_REQUEST: int = 5
+    UPLOAD_CHUNK_SIZE_BYTES: int = 64 * 1024
+    # Room for form fields and multipart boundaries on top of the file bytes
+    UPLOAD_FORM_OVERHEAD_BYTES: int = 64 * 1024
     ALLOWED_IMAGE_TYPES: set[str] = {"image/jpeg", "image/png", "image/webp"}
 
+    # ── Ingest ─────────────────────────────────────────────────────
+    WORKING_MAX_DIMENSION: int = int(os.getenv("WORKING_MAX_DIMENSION", "2048"))
+    WORKING_JPEG_QUALITY: int = 95
+    # Reference photos are sent to models downscaled to this longest side
+    MODEL_REFERENCE_MAX_DIMENSION: int = 1024
+    MODEL_IMAGE_JPEG_QUALITY: int = 90
+
     # ── Rate Limiting ──────────────────────────────────────────────
     RATE_LIMIT: str = os.getenv("RATE_LIMIT", "5/minute")
 
@@ -63,19 +92,92 @@ class Config:
     OUTPUT_DIR: str = os.getenv("OUTPUT_DIR", "outputs")
     PROMPT_LIBRARY_PATH: str = os.getenv("PROMPT_LIBRARY_PATH", "prompt_library.db")
 
+    # ── Storage Backend ────────────────────────────────────────────
+    # "local" keeps outputs under OUTPUT_DIR; "s3" uses any S3-compatible store
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local").lower()
+    STORAGE_URL_EXPIRES_S: int = int(os.getenv("STORAGE_URL_EXPIRES_S", "86400"))
+    STORAGE_TIMEOUT_S: float = 30.0
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "https://s3.amazonaws.com")
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "")
+    S3_REGION: str = os.getenv("S3_REGION", "us-east-1")
+    S3_ACCESS_KEY_ID: str = os.getenv("S3_ACCESS_KEY_ID", "")
+    S3_SECRET_ACCESS_KEY: str = os.getenv("S3_SECRET_ACCESS_KEY", "")
+
+    # ── Output Retention ───────────────────────────────────────────
+    # A background sweep expires job files by age and trims the oldest jobs
+    # when the outputs exceed the byte quota (0 = no quota)
+    RETENTION_ENABLED: bool = os.getenv("RETENTION_ENABLED", "true").lower() in ("1", "true", "yes")
+    RETENTION_INTERVAL_S: float = float(os.getenv("RETENTION_INTERVAL_S", "600"))
+    RETENTION_MAX_AGE_HOURS: float = float(os.getenv("RETENTION_MAX_AGE_HOURS", "168"))
+    RETENTION_MAX_AGE_S: float = RETENTION_MAX_AGE_HOURS * 3600
+    RETENTION_MAX_GB: float = float(os.getenv("RETENTION_MAX_GB", "10"))
+    RETENTION_MAX_BYTES: int = int(RETENTION_MAX_GB * 1024 ** 3)
+    # Files this fresh are never evicted for quota (covers jobs mid-flight)
+    RETENTION_MIN_AGE_S: float = 3600.0
+    # Unreferenced content blobs younger than this may be mid-save
+    RETENTION_ORPHAN_GRACE_S: float = 600.0
+    # Directory listings and manifest reads in flight during a sweep
+    RETENTION_SCAN_CONCURRENCY: int = 16
+    RETENTION_DELETE_CONCURRENCY: int = 16
+
+    # ── Prompt Library Store ───────────────────────────────────────
+    PROMPT_LIBRARY_READERS: int = 2
+    PROMPT_LIBRARY_WRITE_BATCH: int = 50
+    PROMPT_LIBRARY_FLUSH_INTERVAL_S: float = 0.5
+    PROMPT_LIBRARY_SCENARIO_QUOTA: int = int(os.getenv("PROMPT_LIBRARY_SCENARIO_QUOTA", "100"))
+    PROMPT_LIBRARY_MAX_ROWS: int = int(os.getenv("PROMPT_LIBRARY_MAX_ROWS", "100000"))
+    PROMPT_LIBRARY_PRUNE_SLACK: int = 20
+    PROMPT_CACHE_MAX_SCENARIOS: int = 64
+    PROMPT_CACHE_PER_SCENARIO: int = 10
+    PROMPT_VECTOR_DIM: int = 128
+    PROMPT_SIMILARITY_MIN: float = 0.2
+
+    # ── Prompt Assembly ────────────────────────────────────────────
+    # Text budget per assembled prompt (UTF-8 bytes, roughly 4 per token);
+    # optional sections are trimmed lowest-value first to fit
+    PROMPT_MAX_BYTES: int = int(os.getenv("PROMPT_MAX_BYTES", "8000"))
+
     # ── Models ─────────────────────────────────────────────────────
     PROMPT_MODEL: str = "gemini-2.0-flash"
     IMAGE_MODEL: str = "gemini-2.0-flash-preview-image-generation"
     QUALITY_MODEL: str = "gemini-2.0-flash"
 
+    # ── Model Concurrency (AIMD governor per model) ────────────────
+    # Starting/maximum in-flight calls and the latency above which the limit backs off
+    MODEL_CONCURRENCY: dict[str, dict] = {
+        PROMPT_MODEL: {"initial_limit": 4, "max_limit": 16, "target_latency_s": 20.0},
+        IMAGE_MODEL: {"initial_limit": 2, "max_limit": 6, "target_latency_s": 60.0},
+        QUALITY_MODEL: {"initial_limit": 4, "max_limit": 16, "target_latency_s": 20.0},
+    }
+    MODEL_CONCURRENCY_DEFAULT: dict = {"initial_limit": 2, "max_limit": 8, "target_latency_s": 30.0}
+    GOVERNOR_RATE_LIMIT_BACKOFF: float = 0.5
+    GOVERNOR_LATENCY_BACKOFF: float = 0.9
+    GOVERNOR_DECREASE_COOLDOWN_S: float = 2.0
+
     # ── Generation Constants ───────────────────────────────────────
     BASE_TEMPERATURE: float = 0.75
     TEMPERATURE_INCREMENT: float = 0.05
+    # Retry attempts fire this many candidates at once (1 = serial retries)
+    SPECULATIVE_CANDIDATES: int = int(os.getenv("SPECULATIVE_CANDIDATES", "3"))
+    SPECULATIVE_TEMPERATURE_STEP: float = 0.05
     RETRY_MAX_ATTEMPTS: int = 12
     RETRY_MULTIPLIER: int = 2
     RETRY_MIN_WAIT: int = 15
     RETRY_MAX_WAIT: int = 120
 
+    # ── Learned Retry Policy ───────────────────────────────────────
+    # Attempt outcomes per scenario/style/issue type decide how many retries a
+    # photo gets, its starting temperature and when to give up early
+    RETRY_POLICY_ENABLED: bool = os.getenv("RETRY_POLICY_ENABLED", "true").lower() in ("1", "true", "yes")
+    # Stats are only trusted once a cell has this many trials
+    RETRY_POLICY_MIN_SAMPLES: int = 20
+    # Retries less likely than this to pass are not attempted
+    RETRY_POLICY_MIN_PASS_RATE: float = 0.1
+    # Share of photos that ignore the learned limits, so skipped retries keep being measured
+    RETRY_POLICY_EXPLORE_RATE: float = 0.1
+    RETRY_POLICY_TEMPERATURE_BUCKET: float = 0.05
+    RETRY_POLICY_CACHE_SCENARIOS: int = 64
+
     # ── Post-Production Constants ──────────────────────────────────
     VIGNETTE_STRENGTH: float = 0.15
     SENSOR_NOISE_INTENSITY: int = 3
@@ -87,8 +189,20 @@ class Config:
     JPEG_QUALITY_MIN: int = 87
     JPEG_QUALITY_MAX: int = 93
 
+    # ── Output Renditions ──────────────────────────────────────────
+    # Rendition name -> longest side in pixels
+    RENDITION_SIZES: dict[str, int] = {"thumb": 320, "preview": 1024}
+    RENDITION_JPEG_QUALITY: int = 82
+    RENDITION_WEBP_QUALITY: int = 80
+
     # ── Cache Settings ─────────────────────────────────────────────
     REF_CACHE_MAX_ENTRIES: int = int(os.getenv("REF_CACHE_MAX_ENTRIES", "200"))
+    # Keep-alive connections held open to the reference photo APIs and CDNs
+    REF_HTTP_MAX_CONNECTIONS: int = 20
+
+    # ── Tracing ────────────────────────────────────────────────────
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+    TRACE_EXPORT_PATH: str = os.getenv("TRACE_EXPORT_PATH", "traces.jsonl")
 
 
 config = Config()
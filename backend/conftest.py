@@ -0,0 +1,4 @@
+import os
+
+# Tests must not append spans to the working directory's trace file
+os.environ.setdefault("TRACING_ENABLED", "false")
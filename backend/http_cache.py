@@ -0,0 +1,153 @@
+from __future__ import annotations
+"""HTTP caching helpers for serving immutable output files.
+
+Every file under OUTPUT_DIR is written once and never modified, so responses
+can carry a strong content-hash ETag and a long-lived immutable Cache-Control,
+letting browsers and CDNs do most of the serving.
+"""
+
+import asyncio
+import hashlib
+import mimetypes
+import os
+import re
+from collections import OrderedDict
+
+from fastapi import Request
+from fastapi.responses import Response, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+_CHUNK_SIZE = 64 * 1024
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# (path, mtime_ns, size) -> strong ETag, so each file is hashed at most once
+_etag_cache: OrderedDict[tuple[str, int, int], str] = OrderedDict()
+_ETAG_CACHE_MAX = 4096
+
+
+def _hash_file(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+async def strong_etag(path: str, stat: os.stat_result) -> str:
+    """Return a strong ETag derived from the file's content hash."""
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    etag = _etag_cache.get(key)
+    if etag is None:
+        digest = await asyncio.to_thread(_hash_file, path)
+        etag = f'"{digest[:32]}"'
+        _etag_cache[key] = etag
+        if len(_etag_cache) > _ETAG_CACHE_MAX:
+            _etag_cache.popitem(last=False)
+    else:
+        _etag_cache.move_to_end(key)
+    return etag
+
+
+def _parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """Parse a single ``bytes=start-end`` range into inclusive offsets.
+
+    Returns None for unsupported (multi-range) or malformed headers, in which
+    case the full file is served. Raises ValueError if unsatisfiable.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    start_s, end_s = match.groups()
+    if not start_s and not end_s:
+        return None
+    if not start_s:
+        # Suffix range: last N bytes
+        length = int(end_s)
+        if length == 0:
+            raise ValueError("empty suffix range")
+        return max(0, size - length), size - 1
+    start = int(start_s)
+    end = int(end_s) if end_s else size - 1
+    if start >= size or end < start:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
+async def _iter_file(path: str, start: int, length: int):
+    f = await asyncio.to_thread(open, path, "rb")
+    try:
+        await asyncio.to_thread(f.seek, start)
+        remaining = length
+        while remaining > 0:
+            chunk = await asyncio.to_thread(f.read, min(_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+async def cached_file_response(
+    request: Request,
+    path: str,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """Serve an immutable file with a strong ETag, conditional GET and Range support."""
+    stat = await asyncio.to_thread(os.stat, path)
+    etag = await strong_etag(path, stat)
+    media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    base_headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Accept-Ranges": "bytes",
+        **(headers or {}),
+    }
+
+    # ── Conditional GET ────────────────────────────────────────────
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in if_none_match):
+        return Response(status_code=304, headers=base_headers)
+
+    # ── Range requests (single range; If-Range must match the ETag) ─
+    size = stat.st_size
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = _parse_range(range_header, size)
+        except ValueError:
+            return Response(
+                status_code=416,
+                headers={**base_headers, "Content-Range": f"bytes */{size}"},
+            )
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            return StreamingResponse(
+                _iter_file(path, start, length),
+                status_code=206,
+                media_type=media_type,
+                headers={
+                    **base_headers,
+                    "Content-Range": f"bytes {start}-{end}/{size}",
+                    "Content-Length": str(length),
+                },
+            )
+
+    return StreamingResponse(
+        _iter_file(path, 0, size),
+        media_type=media_type,
+        headers={**base_headers, "Content-Length": str(size)},
+    )
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles that marks every response as long-lived and immutable."""
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
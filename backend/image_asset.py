@@ -0,0 +1,184 @@
+from __future__ import annotations
+"""In-memory image asset shared by every agent in a job.
+
+An ``ImageAsset`` is created once — from the ingest step, a downloaded
+reference, or a generated candidate — and passed around instead of a path or
+raw bytes. It holds the encoded bytes and lazily derives, at most once each,
+the decoded pixels, content hash, EXIF, downscaled renditions and the
+model-ready request part. Nothing reopens the file or decodes the image again.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+from io import BytesIO
+from PIL import Image
+from config import config
+
+# Try to import piexif for EXIF handling; optional
+try:
+    import piexif
+    HAS_PIEXIF = True
+except ImportError:
+    HAS_PIEXIF = False
+
+logger = logging.getLogger("glowup.image_asset")
+
+_MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+
+class ImageAsset:
+    """Encoded image bytes plus memoized decodes and conversions.
+
+    Derived values are computed on first use and reused for the lifetime of
+    the asset; the asset is safe to share between concurrent tasks and
+    worker threads. Treat ``image`` and renditions as read-only — copy
+    before modifying pixels.
+    """
+
+    def __init__(self, data: bytes, path: str | None = None, image: Image.Image | None = None):
+        self.data = data
+        self.path = path
+        self._memo: dict = {}
+        # Re-entrant: derived values are built from other derived values
+        self._lock = threading.RLock()
+        if image is not None:
+            self._memo["image"] = image
+
+    @classmethod
+    def from_path(cls, path: str) -> ImageAsset:
+        """Read a file once into an asset (blocking)."""
+        with open(path, "rb") as f:
+            return cls(f.read(), path=path)
+
+    def __repr__(self) -> str:
+        return f"ImageAsset(path={self.path!r}, bytes={len(self.data)})"
+
+    def derived(self, key, compute):
+        """Return ``compute()`` for ``key``, computing it only once per asset."""
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        with self._lock:
+            if key not in self._memo:
+                self._memo[key] = compute()
+            return self._memo[key]
+
+    # ── Encoded form ───────────────────────────────────────────────
+
+    @property
+    def content_hash(self) -> str:
+        """SHA-256 of the encoded bytes."""
+        return self.derived("sha256", lambda: hashlib.sha256(self.data).hexdigest())
+
+    @property
+    def format(self) -> str | None:
+        """PIL format name of the encoded bytes ("JPEG", "PNG", ...)."""
+        return self.derived("format", lambda: Image.open(BytesIO(self.data)).format)
+
+    @property
+    def mime_type(self) -> str:
+        return _MIME_TYPES.get(self.format or "", "image/jpeg")
+
+    # ── Decoded form ───────────────────────────────────────────────
+
+    def _decode(self) -> Image.Image:
+        img = Image.open(BytesIO(self.data))
+        img.load()
+        return img
+
+    @property
+    def image(self) -> Image.Image:
+        """Decoded image (read-only)."""
+        return self.derived("image", self._decode)
+
+    @property
+    def rgb(self) -> Image.Image:
+        """Decoded image in RGB mode (read-only)."""
+        return self.derived(
+            "rgb", lambda: self.image if self.image.mode == "RGB" else self.image.convert("RGB")
+        )
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.image.size
+
+    def rendition(self, max_side: int) -> Image.Image:
+        """RGB copy with its longest side capped at ``max_side`` (read-only)."""
+        def compute():
+            if max(self.rgb.size) <= max_side:
+                return self.rgb
+            small = self.rgb.copy()
+            small.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+            return small
+        return self.derived(("rendition", max_side), compute)
+
+    # ── Metadata ───────────────────────────────────────────────────
+
+    @property
+    def exif(self) -> dict | None:
+        """Parsed EXIF (piexif layout), or None if absent or piexif is missing."""
+        def compute():
+            if not HAS_PIEXIF:
+                return None
+            try:
+                return piexif.load(self.data)
+            except Exception:
+                return None
+        return self.derived("exif", compute)
+
+    @property
+    def exif_without_gps(self) -> bytes | None:
+        """EXIF re-serialized with location data removed, for copying onto outputs."""
+        def compute():
+            exif = self.exif
+            if not exif or not any(exif.get(ifd) for ifd in ("0th", "Exif", "1st", "Interop")):
+                return None
+            exif = {**exif, "GPS": {}}
+            try:
+                return piexif.dump(exif)
+            except Exception:
+                return None
+        return self.derived("exif_without_gps", compute)
+
+    # ── Model input ────────────────────────────────────────────────
+
+    def model_part(self, max_side: int | None = None):
+        """The image as a request part, encoded at most once per size.
+
+        JPEG/PNG/WebP bytes already within ``max_side`` are sent as-is; other
+        images are downscaled and JPEG-encoded once, so the SDK never
+        re-encodes pixels on each call.
+        """
+        # The model SDK is imported on first use, so ingest and the server stay light
+        import google.genai as genai
+
+        def compute():
+            if (max_side is None or max(self.size) <= max_side) and self.format in _MIME_TYPES:
+                return genai.types.Part.from_bytes(data=self.data, mime_type=self.mime_type)
+            buffer = BytesIO()
+            self.rendition(max_side or max(self.size)).save(
+                buffer, format="JPEG", quality=config.MODEL_IMAGE_JPEG_QUALITY
+            )
+            return genai.types.Part.from_bytes(data=buffer.getvalue(), mime_type="image/jpeg")
+        return self.derived(("model_part", max_side), compute)
+
+
+def _load_reference(path: str) -> ImageAsset | None:
+    try:
+        asset = ImageAsset.from_path(path)
+        # Decode and downscale now, so broken downloads are dropped here and
+        # every later model call reuses the same encoded rendition
+        asset.model_part(config.MODEL_REFERENCE_MAX_DIMENSION)
+        return asset
+    except Exception as e:
+        logger.warning("image_asset.unreadable path=%s error=%s", path, str(e))
+        return None
+
+
+async def load_assets(paths: list[str]) -> list[ImageAsset]:
+    """Read image files into assets off the event loop, skipping unreadable ones."""
+    assets = await asyncio.gather(*(asyncio.to_thread(_load_reference, p) for p in paths))
+    return [asset for asset in assets if asset is not None]
@@ -0,0 +1,108 @@
+from __future__ import annotations
+"""Upload ingest stage — decodes the raw upload once into a right-sized working copy."""
+
+import asyncio
+import logging
+from io import BytesIO
+from PIL import Image, ImageOps
+from config import config
+from image_asset import ImageAsset
+from mcp_servers.storage import StorageMCP, job_key
+from tracing import traced
+
+logger = logging.getLogger("glowup.ingest")
+
+# Magic byte signature -> file extension for the raw original
+_FORMAT_EXTENSIONS = {
+    "jpeg": "jpg",
+    "png": "png",
+    "webp": "webp",
+}
+
+
+def detect_image_format(header: bytes) -> str | None:
+    """Identify a supported image format from its leading magic bytes.
+
+    Returns "jpeg", "png", "webp", or None if unrecognized.
+    """
+    # JPEG: FF D8 FF
+    # PNG: 89 50 4E 47
+    # WEBP: 52 49 46 46 ... 57 45 42 50
+    if header[:3] == b"\xff\xd8\xff":
+        return "jpeg"
+    if header[:4] == b"\x89PNG":
+        return "png"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def original_filename(job_id: str, image_format: str) -> str:
+    """Filename for the raw upload, keeping its real extension."""
+    return f"{job_id}_original.{_FORMAT_EXTENSIONS[image_format]}"
+
+
+def working_filename(job_id: str) -> str:
+    """Filename for the canonical working copy every agent reads."""
+    return f"{job_id}_working.jpg"
+
+
+def batch_photo_id(job_id: str, index: int) -> str:
+    """Per-photo identifier used for the files of photo ``index`` in a batch job."""
+    return f"{job_id}-{index + 1}"
+
+
+def _normalize(raw_path: str, max_dimension: int) -> ImageAsset:
+    """Decode, orient, downscale and re-encode the upload (blocking)."""
+    with Image.open(raw_path) as img:
+        # Let the JPEG decoder scale down during decode when the image is huge
+        if img.format == "JPEG":
+            img.draft("RGB", (max_dimension, max_dimension))
+
+        # Bake in EXIF orientation; the returned image's EXIF no longer carries it
+        oriented = ImageOps.exif_transpose(img)
+        exif = oriented.info.get("exif", b"")
+
+        working = oriented.convert("RGB")
+        working.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        buffer = BytesIO()
+        working.save(
+            buffer,
+            format="JPEG",
+            quality=config.WORKING_JPEG_QUALITY,
+            exif=exif,
+        )
+        # The decoded pixels travel with the bytes, so no agent decodes the working copy again
+        return ImageAsset(buffer.getvalue(), image=working)
+
+
+@traced("ingest.normalize_upload")
+async def normalize_upload(
+    raw_path: str,
+    job_id: str,
+    storage: StorageMCP,
+    max_dimension: int | None = None,
+) -> ImageAsset:
+    """Create the canonical working copy of a raw upload.
+
+    The raw original is left untouched next to it. The working copy is an
+    RGB JPEG with EXIF orientation applied and its longest side capped at
+    WORKING_MAX_DIMENSION, so downstream agents never handle full-resolution
+    pixels or sideways photos.
+
+    Args:
+        raw_path: Path to the raw uploaded file (JPEG, PNG or WebP)
+        job_id: Unique job identifier
+        storage: Where the working copy is stored, under ``job_key(working_filename(job_id))``
+        max_dimension: Longest-side cap in pixels (defaults to config)
+
+    Returns:
+        The working copy as an in-memory asset (also stored)
+    """
+    max_dimension = max_dimension or config.WORKING_MAX_DIMENSION
+
+    asset = await asyncio.to_thread(_normalize, raw_path, max_dimension)
+    key = await storage.save(asset.data, job_key(working_filename(job_id)))
+    width, height = asset.size
+    logger.info("ingest.normalized job=%s size=%dx%d key=%s", job_id, width, height, key)
+    return asset
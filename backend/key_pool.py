@@ -0,0 +1,196 @@
+from __future__ import annotations
+"""Health-aware Gemini API key pool.
+
+Replaces blind round-robin rotation: each key tracks its recent rate-limit
+errors, in-flight requests and a token-bucket request budget. Every call is
+routed to the healthiest key, and a key that just returned a 429 is put in
+cooldown instead of being handed out again on the next call.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+import google.genai as genai
+from config import config
+from tracing import span
+
+logger = logging.getLogger("glowup.key_pool")
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """True if an exception from the Gemini SDK signals quota exhaustion (HTTP 429)."""
+    return (
+        getattr(exc, "code", None) == 429
+        or getattr(exc, "status_code", None) == 429
+        or getattr(exc, "status", None) == "RESOURCE_EXHAUSTED"
+    )
+
+
+def _mask(key: str) -> str:
+    return f"...{key[-4:]}" if key else "(none)"
+
+
+class _KeyState:
+    """Health bookkeeping for a single API key."""
+
+    __slots__ = ("key", "client", "tokens", "refilled_at", "in_flight", "rate_limits", "cooldown_until")
+
+    def __init__(self, key: str, capacity: float):
+        self.key = key
+        self.client = None
+        self.tokens = capacity
+        self.refilled_at = time.monotonic()
+        self.in_flight = 0
+        self.rate_limits: deque[float] = deque()
+        self.cooldown_until = 0.0
+
+
+class KeyLease:
+    """A key checked out of the pool for one API call.
+
+    Use as a context manager: exceptions raised inside the block are reported
+    back to the pool, so rate-limited keys go into cooldown automatically.
+    """
+
+    def __init__(self, pool: GeminiKeyPool, state: _KeyState):
+        self._pool = pool
+        self._state = state
+        self._released = False
+
+    @property
+    def key(self) -> str:
+        return self._state.key
+
+    @property
+    def client(self):
+        return self._pool._client_for(self._state)
+
+    def release(self, error: BaseException | None = None) -> None:
+        if not self._released:
+            self._released = True
+            self._pool._release(self._state, error)
+
+    def __enter__(self) -> KeyLease:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.release(exc)
+        return False
+
+
+class GeminiKeyPool:
+    """Routes each Gemini call to the healthiest configured API key."""
+
+    def __init__(self, keys: list[str]):
+        # With no keys configured, behave like before: one client with an empty key
+        self._capacity = float(config.GEMINI_KEY_BURST)
+        self._rate_per_s = config.GEMINI_KEY_RPM / 60.0
+        self._states = [_KeyState(k, self._capacity) for k in (keys or [""])]
+        self._lock = threading.Lock()
+
+    # ── Selection ──────────────────────────────────────────────────
+
+    def _refill(self, state: _KeyState, now: float) -> None:
+        elapsed = now - state.refilled_at
+        state.tokens = min(self._capacity, state.tokens + elapsed * self._rate_per_s)
+        state.refilled_at = now
+        window_start = now - config.GEMINI_KEY_ERROR_WINDOW_S
+        while state.rate_limits and state.rate_limits[0] < window_start:
+            state.rate_limits.popleft()
+
+    def try_acquire(self) -> tuple[KeyLease | None, float]:
+        """Check out the healthiest available key without blocking.
+
+        Returns:
+            (lease, 0.0) on success, or (None, seconds until a key frees up)
+        """
+        with self._lock:
+            now = time.monotonic()
+            best = None
+            wait = float("inf")
+            for state in self._states:
+                self._refill(state, now)
+                if state.cooldown_until > now:
+                    wait = min(wait, state.cooldown_until - now)
+                    continue
+                if state.tokens < 1.0:
+                    wait = min(wait, (1.0 - state.tokens) / self._rate_per_s)
+                    continue
+                # Fewest recent 429s, then least loaded, then most remaining budget
+                rank = (len(state.rate_limits), state.in_flight, -state.tokens)
+                if best is None or rank < best[0]:
+                    best = (rank, state)
+
+            if best is None:
+                return None, max(wait, 0.05)
+
+            state = best[1]
+            state.tokens -= 1.0
+            state.in_flight += 1
+            return KeyLease(self, state), 0.0
+
+    async def acquire_async(self) -> KeyLease:
+        """Check out a key, yielding to the event loop until one is available."""
+        lease, wait = self.try_acquire()
+        if lease is not None:
+            return lease
+        with span("key_pool.wait") as wait_span:
+            while lease is None:
+                await asyncio.sleep(wait)
+                lease, wait = self.try_acquire()
+            wait_span.set_attribute("key_pool.waited_ms", round(wait_span.duration_ms))
+        return lease
+
+    # ── Feedback ───────────────────────────────────────────────────
+
+    def _release(self, state: _KeyState, error: BaseException | None) -> None:
+        with self._lock:
+            state.in_flight = max(0, state.in_flight - 1)
+            if error is None or not is_rate_limit_error(error):
+                return
+            now = time.monotonic()
+            state.rate_limits.append(now)
+            state.tokens = 0.0
+            cooldown = min(
+                config.GEMINI_KEY_COOLDOWN_MAX_S,
+                config.GEMINI_KEY_COOLDOWN_S * 2 ** (len(state.rate_limits) - 1),
+            )
+            state.cooldown_until = max(state.cooldown_until, now + cooldown)
+        logger.warning(
+            "key_pool.cooldown key=%s seconds=%.0f recent_429=%d",
+            _mask(state.key), cooldown, len(state.rate_limits),
+        )
+
+    def _client_for(self, state: _KeyState):
+        # One client per key, created on first use and reused across calls
+        if state.client is None:
+            with self._lock:
+                if state.client is None:
+                    state.client = genai.Client(api_key=state.key)
+        return state.client
+
+    def warm_clients(self) -> None:
+        """Create every key's client up front, so no request pays for SDK client setup."""
+        for state in self._states:
+            self._client_for(state)
+
+    def snapshot(self) -> list[dict]:
+        """Per-key health, for logs and debugging (keys are masked)."""
+        with self._lock:
+            now = time.monotonic()
+            result = []
+            for state in self._states:
+                self._refill(state, now)
+                result.append({
+                    "key": _mask(state.key),
+                    "tokens": round(state.tokens, 2),
+                    "in_flight": state.in_flight,
+                    "recent_rate_limits": len(state.rate_limits),
+                    "cooldown_s": round(max(0.0, state.cooldown_until - now), 1),
+                })
+            return result
+
+
+key_pool = GeminiKeyPool(config.GEMINI_API_KEYS)
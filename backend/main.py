@@ -2,27 +2,54 @@ from __future__ import annotations
 """GlowUp AI Demo — FastAPI Backend Server."""
 
 import asyncio
+import hashlib
 import logging
 import os
 import uuid
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
-from fastapi.responses import FileResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from pipeline import run_enhancement_pipeline
 from config import config
+from agents.post_production import rendition_keys
+from mcp_servers.storage import StorageMCP, job_key, job_prefix
+from http_cache import ImmutableStaticFiles, cached_file_response
+from ingest import batch_photo_id, detect_image_format, original_filename, working_filename
+from retention import run_retention, stats as retention_stats
+from tracing import span
+from upload_limit import UploadSizeLimitMiddleware, too_large
+from warmup import readiness, wait_until_ready, warm_up
 
 logger = logging.getLogger("glowup.server")
 
-# Ensure output directory exists
+# Ensure output directory exists (uploads are staged there on every backend)
 os.makedirs(config.OUTPUT_DIR, exist_ok=True)
 
+# Generated files go through the configured storage backend
+storage = StorageMCP()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm-up runs in the background: the server accepts connections (and
+    # answers liveness) at once, and reports ready when warm-up completes
+    tasks = [asyncio.create_task(warm_up())]
+    if config.RETENTION_ENABLED:
+        tasks.append(asyncio.create_task(run_retention(_job_pins, _forget_jobs)))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
 app = FastAPI(
     title="GlowUp AI Demo",
     description="AI-powered photo enhancement — 5 agents make your photos stunning",
     version="0.2.0",
+    lifespan=lifespan,
 )
 
 # ── CORS — restricted to configured origins ────────────────────────
@@ -34,6 +61,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ── Upload size — oversized bodies are refused before they are spooled ──
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # ── Rate Limiting ──────────────────────────────────────────────────
 try:
     from slowapi import Limiter, _rate_limit_exceeded_handler
@@ -57,26 +87,160 @@ except ImportError:
             return decorator
     limiter = _NoOpLimiter()
 
-# Serve generated images
-app.mount("/outputs", StaticFiles(directory=config.OUTPUT_DIR), name="outputs")
+# Serve generated images — files are write-once, so they are cached as immutable
+app.mount("/outputs", ImmutableStaticFiles(directory=config.OUTPUT_DIR), name="outputs")
 
 
 # ── In-memory job store (async pipeline) ───────────────────────────
 _jobs: dict[str, dict] = {}
+# Synchronous requests in flight (they have no job record)
+_sync_jobs: set[str] = set()
+
+
+def _job_pins() -> tuple[set[str], set[str]]:
+    """(running jobs, finished jobs still served) — retention keeps their files."""
+    live = {job_id for job_id, job in _jobs.items() if job["status"] == "processing"}
+    return live | _sync_jobs, set(_jobs) - live
+
+
+def _forget_jobs(job_ids: list[str]) -> None:
+    """Drop the records of finished jobs whose files retention has expired."""
+    for job_id in job_ids:
+        job = _jobs.get(job_id)
+        if job is not None and job["status"] != "processing":
+            del _jobs[job_id]
+
+
+async def _stream_upload_to_disk(file: UploadFile, job_id: str) -> tuple[str, int, str]:
+    """Stream an upload to disk in fixed-size chunks.
+
+    Magic bytes are checked on the first chunk, the upload is aborted as soon
+    as it crosses MAX_UPLOAD_SIZE_BYTES, and the content is hashed on the way
+    through. Disk writes run in a worker thread so the event loop never blocks,
+    and memory per upload stays at one chunk regardless of file size.
+
+    The raw file keeps the extension of its detected format.
+
+    Returns:
+        (path, size_bytes, sha256_hex)
+    """
+    # Oversized request bodies are already refused by UploadSizeLimitMiddleware;
+    # this is the per-file limit within an accepted request
+    if file.size is not None and file.size > config.MAX_UPLOAD_SIZE_BYTES:
+        raise too_large()
+
+    hasher = hashlib.sha256()
+    size = 0
+    out = None
+    try:
+        chunk = await file.read(config.UPLOAD_CHUNK_SIZE_BYTES)
+        if not chunk:
+            raise HTTPException(status_code=400, detail="Empty file")
+
+        # ── Magic byte validation ──────────────────────────────────
+        image_format = detect_image_format(chunk)
+        if image_format is None:
+            raise HTTPException(
+                status_code=400,
+                detail="File content does not match a supported image format",
+            )
+
+        dest_path = _staging_path(original_filename(job_id, image_format))
+        await asyncio.to_thread(os.makedirs, os.path.dirname(dest_path), exist_ok=True)
+        out = await asyncio.to_thread(open, dest_path, "wb")
+        while chunk:
+            size += len(chunk)
+            if size > config.MAX_UPLOAD_SIZE_BYTES:
+                raise too_large()
+            hasher.update(chunk)
+            await asyncio.to_thread(out.write, chunk)
+            chunk = await file.read(config.UPLOAD_CHUNK_SIZE_BYTES)
+
+        await asyncio.to_thread(out.close)
+        return dest_path, size, hasher.hexdigest()
+
+    except BaseException:
+        # Never leave a partial upload behind
+        if out is not None:
+            await asyncio.to_thread(out.close)
+            await asyncio.to_thread(_remove_quietly, dest_path)
+        raise
+
+
+def _staging_path(filename: str) -> str:
+    """Local path of a raw upload, in its job's directory under OUTPUT_DIR."""
+    return os.path.join(config.OUTPUT_DIR, *job_key(filename).split("/"))
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+async def _pipeline():
+    """The pipeline module, once warm-up has imported it off the event loop.
+
+    Raises 503 if warm-up failed or has not finished within WARMUP_WAIT_TIMEOUT_S.
+    """
+    if not await wait_until_ready(config.WARMUP_WAIT_TIMEOUT_S):
+        logger.warning("job.not_ready warmup=%s", readiness()["status"])
+        raise HTTPException(
+            status_code=503,
+            detail="Server is starting up. Please try again shortly.",
+            headers={"Retry-After": "10"},
+        )
+    import pipeline
+    return pipeline
+
+
+def _rendition_urls(key: str) -> dict[str, dict[str, str]]:
+    """URLs of the thumbnail/preview renditions stored next to an output."""
+    return {
+        name: {fmt: storage.url(rkey) for fmt, rkey in formats.items()}
+        for name, formats in rendition_keys(key).items()
+    }
+
+
+def _image_urls(keys: list[str]) -> dict:
+    return {
+        "images": [storage.url(k) for k in keys],
+        "renditions": [_rendition_urls(k) for k in keys],
+    }
 
 
-def _validate_image_bytes(content: bytes) -> bool:
-    """Validate that file content starts with a recognized image magic byte sequence."""
-    # JPEG: FF D8 FF
-    # PNG: 89 50 4E 47
-    # WEBP: 52 49 46 46 ... 57 45 42 50
-    if content[:3] == b"\xff\xd8\xff":
-        return True
-    if content[:4] == b"\x89PNG":
-        return True
-    if content[:4] == b"RIFF" and content[8:12] == b"WEBP":
-        return True
-    return False
+def _done_record(job_id: str, photo_ids: list[str], per_photo: list[list[str]]) -> dict:
+    """Job record of a finished job; batch jobs also list their results per photo."""
+    all_keys = [k for keys in per_photo for k in keys]
+    record: dict = {"status": "done", "stage": 5}
+    if photo_ids == [job_id]:
+        record["original"] = storage.url(job_key(working_filename(job_id)))
+    else:
+        record["photos"] = [
+            {"original": storage.url(job_key(working_filename(pid))), **_image_urls(keys)}
+            for pid, keys in zip(photo_ids, per_photo)
+        ]
+    record.update(_image_urls(all_keys))
+    record.update(count=len(all_keys), error=None, keys=all_keys)
+    return record
+
+
+async def _find_job(job_id: str) -> dict | None:
+    """The job's record — rebuilt from its manifest once the server no longer holds it."""
+    job = _jobs.get(job_id)
+    if job is not None:
+        return job
+    manifest = await storage.read_manifest(job_id)
+    if manifest is None:
+        return None
+    prefix = job_prefix(job_id)
+    photos = manifest["photos"]
+    return _done_record(
+        job_id,
+        [photo["photo_id"] for photo in photos],
+        [[prefix + image["image"] for image in photo["images"]] for photo in photos],
+    )
 
 
 @app.get("/")
@@ -86,12 +250,34 @@ async def root():
         "docs": "/docs",
         "endpoints": {
             "POST /api/enhance": "Upload a photo and start enhancement (returns job_id)",
+            "POST /api/enhance/batch": "Upload several photos as one enhancement job (returns job_id)",
             "GET /api/status/{job_id}": "Check enhancement job status",
-            "GET /api/download/{filename}": "Download an enhanced image",
+            "GET /api/download/{filename}": "Download an enhanced image or rendition",
+            "GET /api/zip/{job_id}": "Download all of a finished job's images as one ZIP",
+            "GET /api/health": "Liveness — the process is up",
+            "GET /api/ready": "Readiness — warm-up is done and jobs start without cold-start delay",
+            "GET /api/storage": "Output storage usage and what retention has reclaimed",
         },
     }
 
 
+@app.get("/api/health")
+async def health():
+    return {"status": "ok"}
+
+
+@app.get("/api/ready")
+async def ready():
+    state = readiness()
+    status_code = 200 if state["status"] == "ready" else 503
+    return JSONResponse(state, status_code=status_code)
+
+
+@app.get("/api/storage")
+async def storage_stats():
+    return retention_stats()
+
+
 @app.post("/api/enhance")
 @limiter.limit(config.RATE_LIMIT)
 async def enhance_photo(
@@ -111,40 +297,23 @@ async def enhance_photo(
             detail=f"Unsupported file type. Allowed: {', '.join(config.ALLOWED_IMAGE_TYPES)}",
         )
 
-    # ── Read and validate file size ────────────────────────────────
-    content = await file.read()
-
-    if len(content) > config.MAX_UPLOAD_SIZE_BYTES:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large. Maximum size: {config.MAX_UPLOAD_SIZE_MB}MB",
-        )
-
-    if len(content) == 0:
-        raise HTTPException(status_code=400, detail="Empty file")
-
-    # ── Magic byte validation ──────────────────────────────────────
-    if not _validate_image_bytes(content):
-        raise HTTPException(
-            status_code=400,
-            detail="File content does not match a supported image format",
-        )
-
     # Clamp variations
     num_variations = max(1, min(4, num_variations))
+    await _pipeline()  # 503 before any upload is staged
 
-    # Save uploaded file
+    # ── Stream upload to disk (size, magic bytes, hash) ────────────
     job_id = str(uuid.uuid4())[:8]
-    upload_path = os.path.join(config.OUTPUT_DIR, f"{job_id}_original.jpg")
-    with open(upload_path, "wb") as f:
-        f.write(content)
+    with span("upload.ingest", **{"job.id": job_id}) as ingest_span:
+        upload_path, size, sha256 = await _stream_upload_to_disk(file, job_id)
+        ingest_span.set_attribute("upload.bytes", size)
 
     logger.info(
-        "job.created job_id=%s mode=%s variations=%d size_kb=%d",
+        "job.created job_id=%s mode=%s variations=%d size_kb=%d sha256=%s",
         job_id,
         f"vibe({vibe})" if vibe else "enhance",
         num_variations,
-        len(content) // 1024,
+        size // 1024,
+        sha256[:16],
     )
 
     # ── Launch pipeline as background task ─────────────────────────
@@ -162,27 +331,119 @@ async def enhance_photo(
 async def _run_job(job_id: str, upload_path: str, vibe: str | None, num_variations: int):
     """Run the pipeline in the background and update job status."""
     try:
-        result_paths = await run_enhancement_pipeline(
+        pipeline = await _pipeline()
+        result_keys = await pipeline.run_enhancement_pipeline(
             original_path=upload_path,
             mode="vibe" if vibe else "enhance",
             vibe=vibe,
-            output_dir=config.OUTPUT_DIR,
             job_id=job_id,
             num_variations=num_variations,
         )
 
+        _jobs[job_id] = _done_record(job_id, [job_id], [result_keys])
+        logger.info("job.done job_id=%s images=%d", job_id, len(result_keys))
+
+    except Exception as e:
+        logger.error("job.failed job_id=%s error=%s", job_id, str(e))
         _jobs[job_id] = {
-            "status": "done",
-            "stage": 5,
-            "original": f"/outputs/{job_id}_original.jpg",
-            "images": [f"/outputs/{os.path.basename(p)}" for p in result_paths],
-            "count": len(result_paths),
-            "error": None,
+            "status": "error",
+            "stage": 0,
+            "images": [],
+            "error": "Enhancement failed. Please try again.",
         }
-        logger.info("job.done job_id=%s images=%d", job_id, len(result_paths))
+
+
+@app.post("/api/enhance/batch")
+@limiter.limit(config.RATE_LIMIT)
+async def enhance_photo_batch(
+    request: Request,
+    files: list[UploadFile] = File(..., description="The photos to enhance"),
+    vibe: str = Form(default=None, description="Optional vibe: coffee_shop, outdoors, formal, etc."),
+    num_variations: int = Form(default=2, description="Number of variations per photo (1-4)"),
+):
+    """Upload several photos and enhance them as one job.
+
+    Reference searches, prompt library reads and agent setup are shared
+    across the photos, and per-photo work runs concurrently. Returns a
+    job_id immediately. Poll /api/status/{job_id} for progress.
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+    if len(files) > config.MAX_PHOTOS_PER_REQUEST:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many photos. Maximum per request: {config.MAX_PHOTOS_PER_REQUEST}",
+        )
+
+    # ── Content-type validation (before touching any bytes) ───────
+    for file in files:
+        if not file.content_type or file.content_type not in config.ALLOWED_IMAGE_TYPES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported file type. Allowed: {', '.join(config.ALLOWED_IMAGE_TYPES)}",
+            )
+
+    num_variations = max(1, min(4, num_variations))
+    await _pipeline()  # 503 before any upload is staged
+
+    # ── Stream each upload to disk; drop the whole batch if one is rejected ─
+    job_id = str(uuid.uuid4())[:8]
+    upload_paths: list[str] = []
+    total_size = 0
+    try:
+        with span("upload.ingest", **{"job.id": job_id, "upload.files": len(files)}) as ingest_span:
+            for i, file in enumerate(files):
+                upload_path, size, _ = await _stream_upload_to_disk(file, batch_photo_id(job_id, i))
+                upload_paths.append(upload_path)
+                total_size += size
+            ingest_span.set_attribute("upload.bytes", total_size)
+    except BaseException:
+        for path in upload_paths:
+            await asyncio.to_thread(_remove_quietly, path)
+        raise
+
+    logger.info(
+        "job.batch.created job_id=%s mode=%s photos=%d variations=%d size_kb=%d",
+        job_id,
+        f"vibe({vibe})" if vibe else "enhance",
+        len(upload_paths),
+        num_variations,
+        total_size // 1024,
+    )
+
+    _jobs[job_id] = {"status": "processing", "stage": 0, "images": [], "error": None}
+
+    asyncio.create_task(_run_batch_job(job_id, upload_paths, vibe, num_variations))
+
+    return {
+        "job_id": job_id,
+        "status": "processing",
+        "photos": len(upload_paths),
+        "poll_url": f"/api/status/{job_id}",
+    }
+
+
+async def _run_batch_job(job_id: str, upload_paths: list[str], vibe: str | None, num_variations: int):
+    """Run the batch pipeline in the background and update job status."""
+    try:
+        pipeline = await _pipeline()
+        per_photo = await pipeline.run_batch_enhancement_pipeline(
+            original_paths=upload_paths,
+            mode="vibe" if vibe else "enhance",
+            vibe=vibe,
+            job_id=job_id,
+            num_variations=num_variations,
+        )
+
+        photo_ids = [batch_photo_id(job_id, i) for i in range(len(per_photo))]
+        _jobs[job_id] = _done_record(job_id, photo_ids, per_photo)
+        logger.info(
+            "job.batch.done job_id=%s photos=%d images=%d",
+            job_id, len(per_photo), _jobs[job_id]["count"],
+        )
 
     except Exception as e:
-        logger.error("job.failed job_id=%s error=%s", job_id, str(e))
+        logger.error("job.batch.failed job_id=%s error=%s", job_id, str(e))
         _jobs[job_id] = {
             "status": "error",
             "stage": 0,
@@ -194,28 +455,69 @@ async def _run_job(job_id: str, upload_path: str, vibe: str | None, num_variatio
 @app.get("/api/status/{job_id}")
 async def job_status(job_id: str):
     """Check the status of an enhancement job."""
-    job = _jobs.get(job_id)
+    job = await _find_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
-    return {"job_id": job_id, **job}
+    # Storage keys are internal; clients get URLs
+    return {"job_id": job_id, **{k: v for k, v in job.items() if k != "keys"}}
 
 
 @app.get("/api/download/{filename}")
-async def download_image(filename: str):
-    """Download a single enhanced image as JPEG."""
+async def download_image(request: Request, filename: str):
+    """Download a single enhanced image or rendition.
+
+    Responses carry a strong ETag and immutable Cache-Control, and honour
+    If-None-Match and single-range Range requests.
+    """
     # Prevent path traversal
     safe_name = os.path.basename(filename)
-    path = os.path.join(config.OUTPUT_DIR, safe_name)
-    if not os.path.exists(path):
+    try:
+        # The filename names its job, and so its directory — no scan of the outputs
+        key = job_key(safe_name)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Image not found")
+    path = storage.store.local_path(key)
+    if path is None:
+        # Remote backend: hand the client a presigned URL instead of proxying bytes
+        if not await storage.store.exists(key):
+            raise HTTPException(status_code=404, detail="Image not found")
+        return RedirectResponse(storage.url(key), status_code=307)
+    if not os.path.isfile(path):
         raise HTTPException(status_code=404, detail="Image not found")
-    return FileResponse(
+    return await cached_file_response(
+        request,
         path,
-        media_type="image/jpeg",
-        filename=safe_name,
         headers={"Content-Disposition": f'attachment; filename="glowup_{safe_name}"'},
     )
 
 
+@app.get("/api/zip/{job_id}")
+async def download_job_zip(job_id: str):
+    """Stream all of a finished job's images as a single ZIP.
+
+    The archive is built while it is sent: JPEGs are stored without
+    recompression, memory stays constant and no temporary file is written.
+    """
+    job = await _find_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail="Job is not finished yet")
+
+    keys = job.get("keys", [])
+    exists = await asyncio.gather(*(storage.store.exists(k) for k in keys))
+    keys = [k for k, ok in zip(keys, exists) if ok]
+    if not keys:
+        raise HTTPException(status_code=404, detail="No images found for this job")
+
+    logger.info("job.zip job_id=%s files=%d", job_id, len(keys))
+    return StreamingResponse(
+        storage.iter_zip(keys),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="glowup_{job_id}.zip"'},
+    )
+
+
 # ── Backwards-compatible synchronous endpoint ─────────────────────
 @app.post("/api/enhance/sync")
 @limiter.limit(config.RATE_LIMIT)
@@ -233,43 +535,37 @@ async def enhance_photo_sync(
             detail=f"Unsupported file type. Allowed: {', '.join(config.ALLOWED_IMAGE_TYPES)}",
         )
 
-    content = await file.read()
-
-    if len(content) > config.MAX_UPLOAD_SIZE_BYTES:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large. Maximum size: {config.MAX_UPLOAD_SIZE_MB}MB",
-        )
-
-    if len(content) == 0:
-        raise HTTPException(status_code=400, detail="Empty file")
-
-    if not _validate_image_bytes(content):
-        raise HTTPException(
-            status_code=400,
-            detail="File content does not match a supported image format",
-        )
-
     num_variations = max(1, min(4, num_variations))
+    await _pipeline()  # 503 before any upload is staged
 
     job_id = str(uuid.uuid4())[:8]
-    upload_path = os.path.join(config.OUTPUT_DIR, f"{job_id}_original.jpg")
-    with open(upload_path, "wb") as f:
-        f.write(content)
+    _sync_jobs.add(job_id)
+    try:
+        return await _run_sync_job(file, job_id, vibe, num_variations)
+    finally:
+        _sync_jobs.discard(job_id)
+
+
+async def _run_sync_job(file: UploadFile, job_id: str, vibe: str | None, num_variations: int) -> dict:
+    with span("upload.ingest", **{"job.id": job_id}) as ingest_span:
+        upload_path, size, sha256 = await _stream_upload_to_disk(file, job_id)
+        ingest_span.set_attribute("upload.bytes", size)
 
     logger.info(
-        "job.sync job_id=%s mode=%s variations=%d",
+        "job.sync job_id=%s mode=%s variations=%d size_kb=%d sha256=%s",
         job_id,
         f"vibe({vibe})" if vibe else "enhance",
         num_variations,
+        size // 1024,
+        sha256[:16],
     )
 
     try:
-        result_paths = await run_enhancement_pipeline(
+        pipeline = await _pipeline()
+        result_keys = await pipeline.run_enhancement_pipeline(
             original_path=upload_path,
             mode="vibe" if vibe else "enhance",
             vibe=vibe,
-            output_dir=config.OUTPUT_DIR,
             job_id=job_id,
             num_variations=num_variations,
         )
@@ -277,9 +573,9 @@ async def enhance_photo_sync(
         return {
             "job_id": job_id,
             "status": "done",
-            "original": f"/outputs/{job_id}_original.jpg",
-            "images": [f"/outputs/{os.path.basename(p)}" for p in result_paths],
-            "count": len(result_paths),
+            "original": storage.url(job_key(working_filename(job_id))),
+            **_image_urls(result_keys),
+            "count": len(result_keys),
         }
 
     except Exception as e:
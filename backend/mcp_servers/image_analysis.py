@@ -1,44 +1,85 @@
 from __future__ import annotations
 """Image Analysis MCP Server — uses Gemini for deep photo analysis."""
 
+import asyncio
 import json
 import logging
-from io import BytesIO
-from PIL import Image
-import google.genai as genai
-from tenacity import retry, stop_after_attempt, wait_exponential
 from config import config
+from image_asset import ImageAsset
+from mcp_servers.style_library import STYLE_INSTRUCTIONS
+from model_calls import generate_content
+from prompt_templates import PromptSection, PromptTemplate
+from tracing import traced
 
 logger = logging.getLogger("glowup.image_analysis")
 
-
-class ImageAnalysisMCP:
-    """MCP-style tool server for analyzing photos using Gemini vision."""
-
-    @retry(
-        stop=stop_after_attempt(config.RETRY_MAX_ATTEMPTS),
-        wait=wait_exponential(
-            multiplier=config.RETRY_MULTIPLIER,
-            min=config.RETRY_MIN_WAIT,
-            max=config.RETRY_MAX_WAIT,
-        ),
-    )
-    def _call_api(self, model: str, contents: list):
-        client = genai.Client(api_key=config.GEMINI_API_KEY)
-        return client.models.generate_content(
-            model=model,
-            contents=contents,
-        )
-
-    async def analyze_photo(self, image_path: str) -> dict:
-        """Deep analysis of a photo: face, pose, lighting, setting, clothing, issues."""
-        img = Image.open(image_path)
-
-        from mcp_servers.style_library import StyleLibraryMCP
-        library = StyleLibraryMCP()
-        style_instructions = await library.get_style_instructions()
-
-        prompt_text = f"""Analyze this photo in detail. Return ONLY valid JSON with these fields:
+# Scoring rubric and response shape shared by single and batched comparisons
+_CRITERIA_SECTION = PromptSection("criteria", """
+    1. REALISM: Does it look like a real phone photo?
+    2. IDENTITY_MATCH: Same person as the original? (face, features, skin tone)
+    3. NATURALNESS: Does the pose/expression feel candid and natural?
+    4. ATTRACTIVENESS: Is it dating-app worthy?
+    5. AI_DETECTION_RISK: How likely would someone suspect AI?
+       (1 = definitely looks real, 10 = obviously AI)
+    6. ENHANCEMENT_QUALITY: Is it clearly better than the original?
+
+    Also list SPECIFIC issues if any (e.g., "left hand has 6 fingers",
+    "skin too smooth on forehead", "eyes lack reflections").
+    """, required=True)
+
+_SCHEMA_SECTION = PromptSection("schema", """
+    {{
+        "realism": X,
+        "identity_match": X,
+        "naturalness": X,
+        "attractiveness": X,
+        "ai_detection_risk": X,
+        "enhancement_quality": X,
+        "overall": X,
+        "issues": ["issue1", "issue2"],
+        "verdict": "PASS" or "FAIL",
+        "fix_suggestions": ["suggestion1", "suggestion2"]
+    }}
+
+    PASS requires: overall >= 7 AND ai_detection_risk <= 3
+    """, required=True)
+
+_COMPARE_PROMPT = PromptTemplate(
+    "image_analysis.compare",
+    PromptSection("task", """
+        You are an expert photo forensics analyst. Image 1 is potentially
+        AI-generated. Image 2 is the original real photo of the same person.
+
+        Evaluate Image 1 on these criteria (1-10 each):
+        """, required=True),
+    _CRITERIA_SECTION,
+    PromptSection("format", "Return ONLY valid JSON:", required=True),
+    _SCHEMA_SECTION,
+).render()
+
+_COMPARE_BATCH_TEMPLATE = PromptTemplate(
+    "image_analysis.compare_batch",
+    PromptSection("task", """
+        You are an expert photo forensics analyst. Image 1 is the original
+        real photo of a person. Images 2-{last_image} are {count} potentially AI-generated
+        candidates of the same person. Score EACH candidate independently.
+
+        Evaluate each candidate on these criteria (1-10 each):
+        """, required=True),
+    _CRITERIA_SECTION,
+    PromptSection("format", """
+        Return ONLY valid JSON: an array with exactly {count} objects, one per
+        candidate in image order (Image 2 first), each shaped like:
+        """, required=True),
+    _SCHEMA_SECTION,
+)
+
+
+# analyze_photo instructions; the style menu is static, so this is rendered once
+_ANALYZE_PROMPT = PromptTemplate(
+    "image_analysis.analyze",
+    PromptSection("task", """
+        Analyze this photo in detail. Return ONLY valid JSON with these fields:
 
         {{
             "gender": "male/female/unknown",
@@ -68,18 +109,34 @@ class ImageAnalysisMCP:
         Choose the ONE style ID that best matches the natural vibe, setting, or potential
         of this photo. (e.g., if it's a mirror selfie, choose '2000s_mirror_selfie'. If
         it has strong flash, choose '1990s_camera_flash').
-        """
+        """, required=True),
+).render(style_instructions=STYLE_INSTRUCTIONS)
 
-        response = self._call_api(
+
+def _parse_json(text: str | None):
+    # A blocked or empty response has no text; that is a parse failure like any other
+    text = (text or "").strip()
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1].rsplit("```", 1)[0].strip()
+    return json.loads(text)
+
+
+class ImageAnalysisMCP:
+    """MCP-style tool server for analyzing photos using Gemini vision."""
+
+    async def _call_api(self, model: str, contents: list):
+        return await generate_content(model, contents)
+
+    @traced("mcp.image_analysis.analyze_photo")
+    async def analyze_photo(self, photo: ImageAsset) -> dict:
+        """Deep analysis of a photo: face, pose, lighting, setting, clothing, issues."""
+        response = await self._call_api(
             model=config.PROMPT_MODEL,
-            contents=[img, prompt_text],
+            contents=[photo.model_part(), _ANALYZE_PROMPT],
         )
 
         try:
-            text = response.text.strip()
-            if text.startswith("```"):
-                text = text.split("\n", 1)[1].rsplit("```", 1)[0].strip()
-            return json.loads(text)
+            return _parse_json(response.text)
         except (json.JSONDecodeError, IndexError) as e:
             logger.warning(
                 "analyze_photo JSON parse failed: %s | raw_response: %.300s",
@@ -100,58 +157,22 @@ class ImageAnalysisMCP:
                 "style_category": "casual_iphone",
             }
 
+    @traced("mcp.image_analysis.compare_photos")
     async def compare_photos(
-        self, original_path: str, generated_bytes: bytes
+        self, original: ImageAsset, generated: ImageAsset
     ) -> dict:
         """Compare original and generated photo for identity match & quality."""
-        original = Image.open(original_path)
-        generated = Image.open(BytesIO(generated_bytes))
-
-        response = self._call_api(
+        response = await self._call_api(
             model=config.QUALITY_MODEL,
             contents=[
-                generated,
-                original,
-                """You are an expert photo forensics analyst. Image 1 is potentially
-                AI-generated. Image 2 is the original real photo of the same person.
-
-                Evaluate Image 1 on these criteria (1-10 each):
-
-                1. REALISM: Does it look like a real phone photo?
-                2. IDENTITY_MATCH: Same person as Image 2? (face, features, skin tone)
-                3. NATURALNESS: Does the pose/expression feel candid and natural?
-                4. ATTRACTIVENESS: Is it dating-app worthy?
-                5. AI_DETECTION_RISK: How likely would someone suspect AI?
-                   (1 = definitely looks real, 10 = obviously AI)
-                6. ENHANCEMENT_QUALITY: Is it clearly better than the original?
-
-                Also list SPECIFIC issues if any (e.g., "left hand has 6 fingers",
-                "skin too smooth on forehead", "eyes lack reflections").
-
-                Return ONLY valid JSON:
-                {
-                    "realism": X,
-                    "identity_match": X,
-                    "naturalness": X,
-                    "attractiveness": X,
-                    "ai_detection_risk": X,
-                    "enhancement_quality": X,
-                    "overall": X,
-                    "issues": ["issue1", "issue2"],
-                    "verdict": "PASS" or "FAIL",
-                    "fix_suggestions": ["suggestion1", "suggestion2"]
-                }
-
-                PASS requires: overall >= 7 AND ai_detection_risk <= 3
-                """,
+                generated.model_part(),
+                original.model_part(),
+                _COMPARE_PROMPT,
             ],
         )
 
         try:
-            text = response.text.strip()
-            if text.startswith("```"):
-                text = text.split("\n", 1)[1].rsplit("```", 1)[0].strip()
-            return json.loads(text)
+            return _parse_json(response.text)
         except (json.JSONDecodeError, IndexError) as e:
             logger.warning(
                 "compare_photos JSON parse failed: %s | raw_response: %.300s",
@@ -166,3 +187,55 @@ class ImageAnalysisMCP:
                 "verdict": "FAIL",
                 "fix_suggestions": ["Re-generate with stronger realism instructions"],
             }
+
+    @traced("mcp.image_analysis.compare_photos_batch")
+    async def compare_photos_batch(
+        self, original: ImageAsset, candidates: list[ImageAsset]
+    ) -> list[dict]:
+        """Score several generated candidates against the original in one call.
+
+        The original is sent once, followed by every candidate, and the model
+        returns one score object per candidate. Candidates whose score is
+        missing or malformed in the response fall back to ``compare_photos``.
+
+        Returns:
+            One score dict per candidate, in input order
+        """
+        if len(candidates) == 1:
+            return [await self.compare_photos(original, candidates[0])]
+
+        n = len(candidates)
+
+        response = await self._call_api(
+            model=config.QUALITY_MODEL,
+            contents=[
+                original.model_part(),
+                *(candidate.model_part() for candidate in candidates),
+                _COMPARE_BATCH_TEMPLATE.render(last_image=n + 1, count=n),
+            ],
+        )
+
+        scores: list[dict | None] = [None] * n
+        try:
+            parsed = _parse_json(response.text)
+            if isinstance(parsed, dict):
+                parsed = parsed.get("candidates", [])
+            for i, item in enumerate(parsed[:n] if isinstance(parsed, list) else []):
+                if isinstance(item, dict) and "overall" in item:
+                    scores[i] = item
+        except (json.JSONDecodeError, IndexError) as e:
+            logger.warning(
+                "compare_photos_batch JSON parse failed: %s | raw_response: %.300s",
+                str(e),
+                response.text[:300] if response.text else "(empty)",
+            )
+
+        missing = [i for i, score in enumerate(scores) if score is None]
+        if missing:
+            logger.info("compare_photos_batch.fallback candidates=%d missing=%d", n, len(missing))
+            fallback = await asyncio.gather(
+                *(self.compare_photos(original, candidates[i]) for i in missing)
+            )
+            for i, score in zip(missing, fallback):
+                scores[i] = score
+        return scores
@@ -0,0 +1,520 @@
+from __future__ import annotations
+"""Object store backends for generated files.
+
+``ObjectStore`` is a small key/value interface over "/"-separated string keys
+("jobs/5e/abc/abc_enhanced_1.jpg", "_cas/3f/3f2a...jpg"): put, get, exists,
+delete, list (recursive, or one directory level), alias, URLs and chunked
+reads. Two implementations:
+
+- ``LocalObjectStore`` — a directory (OUTPUT_DIR). Writes go to a temporary
+  file that is renamed into place, so readers never see a partial file;
+  aliases are hard links, so identical content occupies disk once. All
+  filesystem work runs in worker threads.
+- ``S3ObjectStore`` — any S3-compatible service (AWS, MinIO, a local
+  stand-in) over plain HTTP with SigV4 signing; URLs are presigned GETs.
+  Path-style addressing, so an endpoint such as ``http://localhost:9000``
+  works without DNS tricks. S3 has no links: an alias is a server-side
+  copy that is billed as a second object, so ``shares_content`` is False.
+"""
+
+import abc
+import asyncio
+import datetime
+import hashlib
+import hmac
+import logging
+import os
+import shutil
+import threading
+import uuid
+from collections.abc import Iterator
+from dataclasses import dataclass
+from urllib.parse import quote
+from xml.etree import ElementTree
+from config import config
+
+logger = logging.getLogger("glowup.object_store")
+
+_CHUNK_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class ObjectInfo:
+    key: str
+    size: int
+    modified: float  # Unix time
+    # Keys sharing the same bytes (hard links), where the backend can tell
+    links: int | None = None
+
+
+class ObjectStore(abc.ABC):
+    """Interface shared by the storage backends."""
+
+    # Whether an alias shares the source's stored bytes instead of copying them
+    shares_content: bool = False
+
+    @abc.abstractmethod
+    async def put(self, key: str, data: bytes, content_type: str | None = None) -> None:
+        """Store ``data`` under ``key`` atomically, replacing any existing object."""
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> bytes:
+        """Return the object's bytes. Raises FileNotFoundError if it does not exist."""
+
+    @abc.abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Whether an object is stored under ``key``."""
+
+    @abc.abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove the object; deleting a missing key is not an error."""
+
+    @abc.abstractmethod
+    async def list(self, prefix: str = "") -> list[ObjectInfo]:
+        """Every object whose key starts with ``prefix``."""
+
+    @abc.abstractmethod
+    async def list_dir(self, prefix: str = "") -> tuple[list[ObjectInfo], list[str]]:
+        """One level of a directory-like prefix ("" or ending in "/").
+
+        Returns:
+            (objects directly under ``prefix``, prefixes of its subdirectories)
+        """
+
+    @abc.abstractmethod
+    async def delete_prefix(self, prefix: str) -> None:
+        """Remove every object under ``prefix`` (a directory-like prefix ending in "/")."""
+
+    @abc.abstractmethod
+    async def alias(self, src_key: str, dst_key: str) -> None:
+        """Make ``dst_key`` hold the same content as ``src_key`` without re-uploading it.
+
+        Raises FileNotFoundError if ``src_key`` does not exist.
+        """
+
+    @abc.abstractmethod
+    def url(self, key: str, expires_s: int | None = None) -> str:
+        """A URL clients can fetch the object from (presigned where the backend needs it)."""
+
+    def local_path(self, key: str) -> str | None:
+        """Filesystem path of the object, for backends that have one."""
+        return None
+
+    @abc.abstractmethod
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        """Yield the object's bytes in chunks (blocking generator)."""
+
+
+def _check_dir_prefix(prefix: str) -> str:
+    if prefix and not prefix.endswith("/"):
+        raise ValueError(f"not a directory prefix: {prefix!r}")
+    return prefix
+
+
+def _check_key(key: str) -> str:
+    parts = key.split("/")
+    if not key or key.startswith("/") or any(p in ("", ".", "..") for p in parts) or "\\" in key:
+        raise ValueError(f"invalid storage key: {key!r}")
+    return key
+
+
+# ── Local filesystem ───────────────────────────────────────────────
+
+
+class LocalObjectStore(ObjectStore):
+    """Objects as files under ``root``, served by the app at ``base_url``."""
+
+    shares_content = True
+
+    def __init__(self, root: str, base_url: str = "/outputs"):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(root, exist_ok=True)
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.root, *_check_key(key).split("/"))
+
+    def _tmp_path(self, path: str) -> str:
+        # Same directory as the target, so the final rename never crosses filesystems
+        return os.path.join(os.path.dirname(path), f".tmp-{uuid.uuid4().hex}")
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = self._tmp_path(path)
+        try:
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            _unlink_quietly(tmp)
+            raise
+
+    def _link(self, src: str, dst: str) -> None:
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        tmp = self._tmp_path(dst)
+        try:
+            try:
+                os.link(src, tmp)
+            except OSError:
+                # Filesystem without hard links — fall back to a copy
+                with open(src, "rb") as f:
+                    data = f.read()
+                with open(tmp, "wb") as f:
+                    f.write(data)
+            os.replace(tmp, dst)
+        except BaseException:
+            _unlink_quietly(tmp)
+            raise
+
+    def _list(self, prefix: str) -> list[ObjectInfo]:
+        results = []
+        # Walk only the directory the prefix points into, not the whole tree
+        directory = prefix.rpartition("/")[0]
+        top = os.path.join(self.root, *directory.split("/")) if directory else self.root
+        for dirpath, _, filenames in os.walk(top):
+            rel_dir = os.path.relpath(dirpath, self.root)
+            for name in filenames:
+                if name.startswith(".tmp-"):
+                    continue
+                key = name if rel_dir == "." else f"{rel_dir.replace(os.sep, '/')}/{name}"
+                if not key.startswith(prefix):
+                    continue
+                try:
+                    st = os.stat(os.path.join(dirpath, name))
+                except FileNotFoundError:
+                    continue
+                results.append(ObjectInfo(key, st.st_size, st.st_mtime, st.st_nlink))
+        return results
+
+    def _list_dir(self, prefix: str) -> tuple[list[ObjectInfo], list[str]]:
+        path = self.local_path(prefix.rstrip("/")) if prefix else self.root
+        files, dirs = [], []
+        try:
+            entries = os.scandir(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return files, dirs
+        with entries:
+            for entry in entries:
+                if entry.name.startswith(".tmp-"):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(f"{prefix}{entry.name}/")
+                    elif entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        files.append(ObjectInfo(prefix + entry.name, st.st_size, st.st_mtime, st.st_nlink))
+                except FileNotFoundError:
+                    continue
+        return files, dirs
+
+    async def put(self, key: str, data: bytes, content_type: str | None = None) -> None:
+        await asyncio.to_thread(self._write, self.local_path(key), data)
+
+    async def get(self, key: str) -> bytes:
+        def read():
+            with open(self.local_path(key), "rb") as f:
+                return f.read()
+        return await asyncio.to_thread(read)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.isfile, self.local_path(key))
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(_unlink_quietly, self.local_path(key))
+
+    async def list(self, prefix: str = "") -> list[ObjectInfo]:
+        return await asyncio.to_thread(self._list, prefix)
+
+    async def list_dir(self, prefix: str = "") -> tuple[list[ObjectInfo], list[str]]:
+        return await asyncio.to_thread(self._list_dir, _check_dir_prefix(prefix))
+
+    async def delete_prefix(self, prefix: str) -> None:
+        if not prefix.endswith("/"):
+            raise ValueError(f"not a directory prefix: {prefix!r}")
+        path = self.local_path(prefix.rstrip("/"))
+        await asyncio.to_thread(shutil.rmtree, path, ignore_errors=True)
+
+    async def alias(self, src_key: str, dst_key: str) -> None:
+        await asyncio.to_thread(self._link, self.local_path(src_key), self.local_path(dst_key))
+
+    def url(self, key: str, expires_s: int | None = None) -> str:
+        # Outputs are public, immutable static files; no signature needed
+        return f"{self.base_url}/{quote(_check_key(key))}"
+
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        with open(self.local_path(key), "rb") as f:
+            while chunk := f.read(_CHUNK_SIZE):
+                yield chunk
+
+
+def _unlink_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# ── S3-compatible ──────────────────────────────────────────────────
+
+
+_EMPTY_SHA256 = hashlib.sha256(b"").hexdigest()
+_S3_NS = "{http://s3.amazonaws.com/doc/2006-03-01/}"
+
+
+def _hmac(key: bytes, msg: str) -> bytes:
+    return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
+
+
+def _uri_encode(value: str, safe: str = "-_.~") -> str:
+    return quote(value, safe=safe)
+
+
+class S3ObjectStore(ObjectStore):
+    """Objects in an S3-compatible bucket, signed with AWS Signature Version 4."""
+
+    def __init__(
+        self,
+        endpoint_url: str,
+        bucket: str,
+        access_key: str,
+        secret_key: str,
+        region: str = "us-east-1",
+        url_expires_s: int = 3600,
+    ):
+        # httpx is only needed when this backend is configured
+        import httpx
+
+        self.endpoint = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.url_expires_s = url_expires_s
+        self._host = httpx.URL(self.endpoint).netloc.decode("ascii")
+        self._client = httpx.AsyncClient(timeout=config.STORAGE_TIMEOUT_S)
+        self._sync_client: httpx.Client | None = None
+        self._sync_lock = threading.Lock()
+
+    # ── Signing ────────────────────────────────────────────────────
+
+    def _path(self, key: str | None = None) -> str:
+        path = f"/{_uri_encode(self.bucket)}"
+        if key is not None:
+            path += "/" + _uri_encode(_check_key(key), safe="-_.~/")
+        return path
+
+    def _scope(self, now: datetime.datetime) -> tuple[str, str, str]:
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date = now.strftime("%Y%m%d")
+        return amz_date, date, f"{date}/{self.region}/s3/aws4_request"
+
+    def _signature(self, date: str, string_to_sign: str) -> str:
+        key = _hmac(f"AWS4{self.secret_key}".encode("utf-8"), date)
+        for part in (self.region, "s3", "aws4_request"):
+            key = _hmac(key, part)
+        return hmac.new(key, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def _canonical_query(params: dict[str, str]) -> str:
+        return "&".join(
+            f"{_uri_encode(k)}={_uri_encode(v)}" for k, v in sorted(params.items())
+        )
+
+    def _signed_headers(
+        self,
+        method: str,
+        path: str,
+        params: dict[str, str] | None = None,
+        payload_sha256: str = _EMPTY_SHA256,
+        extra: dict[str, str] | None = None,
+        now: datetime.datetime | None = None,
+    ) -> dict[str, str]:
+        """Headers (including Authorization) for a header-signed request."""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        amz_date, date, scope = self._scope(now)
+        headers = {
+            "host": self._host,
+            "x-amz-content-sha256": payload_sha256,
+            "x-amz-date": amz_date,
+            **{k.lower(): v for k, v in (extra or {}).items()},
+        }
+        names = sorted(headers)
+        canonical_request = "\n".join([
+            method,
+            path,
+            self._canonical_query(params or {}),
+            "".join(f"{name}:{headers[name].strip()}\n" for name in names),
+            ";".join(names),
+            payload_sha256,
+        ])
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+        ])
+        headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={';'.join(names)}, "
+            f"Signature={self._signature(date, string_to_sign)}"
+        )
+        del headers["host"]
+        return headers
+
+    def presign(
+        self, key: str, expires_s: int | None = None, now: datetime.datetime | None = None
+    ) -> str:
+        """Presigned GET URL for ``key`` (query-string SigV4)."""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        amz_date, date, scope = self._scope(now)
+        path = self._path(key)
+        params = {
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self.access_key}/{scope}",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(expires_s or self.url_expires_s),
+            "X-Amz-SignedHeaders": "host",
+        }
+        query = self._canonical_query(params)
+        canonical_request = "\n".join(
+            ["GET", path, query, f"host:{self._host}\n", "host", "UNSIGNED-PAYLOAD"]
+        )
+        string_to_sign = "\n".join([
+            "AWS4-HMAC-SHA256",
+            amz_date,
+            scope,
+            hashlib.sha256(canonical_request.encode("utf-8")).hexdigest(),
+        ])
+        return f"{self.endpoint}{path}?{query}&X-Amz-Signature={self._signature(date, string_to_sign)}"
+
+    async def _request(
+        self,
+        method: str,
+        key: str | None = None,
+        params: dict[str, str] | None = None,
+        data: bytes = b"",
+        extra: dict[str, str] | None = None,
+    ):
+        path = self._path(key)
+        payload_sha256 = hashlib.sha256(data).hexdigest() if data else _EMPTY_SHA256
+        headers = self._signed_headers(method, path, params, payload_sha256, extra)
+        query = self._canonical_query(params or {})
+        url = f"{self.endpoint}{path}" + (f"?{query}" if query else "")
+        return await self._client.request(method, url, headers=headers, content=data or None)
+
+    # ── Operations ─────────────────────────────────────────────────
+
+    async def put(self, key: str, data: bytes, content_type: str | None = None) -> None:
+        extra = {"content-type": content_type} if content_type else None
+        response = await self._request("PUT", key, data=data, extra=extra)
+        response.raise_for_status()
+
+    async def get(self, key: str) -> bytes:
+        response = await self._request("GET", key)
+        if response.status_code == 404:
+            raise FileNotFoundError(key)
+        response.raise_for_status()
+        return response.content
+
+    async def exists(self, key: str) -> bool:
+        response = await self._request("HEAD", key)
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return True
+
+    async def delete(self, key: str) -> None:
+        response = await self._request("DELETE", key)
+        if response.status_code != 404:
+            response.raise_for_status()
+
+    async def _list_pages(self, params: dict[str, str]) -> tuple[list[ObjectInfo], list[str]]:
+        """Run a ListObjectsV2 query to the end. Returns (objects, common prefixes)."""
+        results, prefixes = [], []
+        token = None
+        while True:
+            page = {"list-type": "2", **params}
+            if token:
+                page["continuation-token"] = token
+            response = await self._request("GET", params=page)
+            response.raise_for_status()
+            root = ElementTree.fromstring(response.content)
+            for item in root.iter(f"{_S3_NS}Contents"):
+                modified = datetime.datetime.fromisoformat(
+                    item.findtext(f"{_S3_NS}LastModified", "").replace("Z", "+00:00")
+                )
+                results.append(ObjectInfo(
+                    item.findtext(f"{_S3_NS}Key", ""),
+                    int(item.findtext(f"{_S3_NS}Size", "0")),
+                    modified.timestamp(),
+                ))
+            for item in root.iter(f"{_S3_NS}CommonPrefixes"):
+                prefixes.append(item.findtext(f"{_S3_NS}Prefix", ""))
+            if root.findtext(f"{_S3_NS}IsTruncated") != "true":
+                return results, prefixes
+            token = root.findtext(f"{_S3_NS}NextContinuationToken")
+
+    async def list(self, prefix: str = "") -> list[ObjectInfo]:
+        results, _ = await self._list_pages({"prefix": prefix})
+        return results
+
+    async def list_dir(self, prefix: str = "") -> tuple[list[ObjectInfo], list[str]]:
+        return await self._list_pages({"prefix": _check_dir_prefix(prefix), "delimiter": "/"})
+
+    async def delete_prefix(self, prefix: str) -> None:
+        if not prefix.endswith("/"):
+            raise ValueError(f"not a directory prefix: {prefix!r}")
+        for info in await self.list(prefix):
+            await self.delete(info.key)
+
+    async def alias(self, src_key: str, dst_key: str) -> None:
+        # Server-side copy: not uploaded again, but stored (and billed) as a second object
+        source = quote(f"/{self.bucket}/{_check_key(src_key)}", safe="/-_.~")
+        response = await self._request("PUT", dst_key, extra={"x-amz-copy-source": source})
+        if response.status_code == 404 or b"<Code>NoSuchKey</Code>" in response.content:
+            raise FileNotFoundError(src_key)
+        response.raise_for_status()
+
+    def url(self, key: str, expires_s: int | None = None) -> str:
+        return self.presign(key, expires_s)
+
+    def iter_chunks(self, key: str) -> Iterator[bytes]:
+        import httpx
+
+        with self._sync_lock:
+            if self._sync_client is None:
+                self._sync_client = httpx.Client(timeout=config.STORAGE_TIMEOUT_S)
+        path = self._path(key)
+        headers = self._signed_headers("GET", path)
+        with self._sync_client.stream("GET", f"{self.endpoint}{path}", headers=headers) as response:
+            if response.status_code == 404:
+                raise FileNotFoundError(key)
+            response.raise_for_status()
+            yield from response.iter_bytes(_CHUNK_SIZE)
+
+
+# ── Factory ────────────────────────────────────────────────────────
+
+_store: ObjectStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_object_store() -> ObjectStore:
+    """Return the process-wide store selected by STORAGE_BACKEND."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if config.STORAGE_BACKEND == "s3":
+                    _store = S3ObjectStore(
+                        config.S3_ENDPOINT_URL,
+                        config.S3_BUCKET,
+                        config.S3_ACCESS_KEY_ID,
+                        config.S3_SECRET_ACCESS_KEY,
+                        region=config.S3_REGION,
+                        url_expires_s=config.STORAGE_URL_EXPIRES_S,
+                    )
+                else:
+                    _store = LocalObjectStore(config.OUTPUT_DIR)
+                logger.info("object_store.ready backend=%s", config.STORAGE_BACKEND)
+    return _store
@@ -0,0 +1,189 @@
+from __future__ import annotations
+"""Local feature vectors and an in-memory k-NN index for the prompt library.
+
+Vectors are built with the hashing trick: tokens from the ``analyze_photo``
+fields (namespaced by field, plus plain words) and from the prompt text are
+hashed into a fixed number of signed buckets and L2-normalized. Nothing is
+fitted or fetched, so a vector can be computed for any photo or prompt
+without an external service, and cosine similarity is a single dot product.
+"""
+
+import hashlib
+import re
+import threading
+import numpy as np
+from config import config
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+# analyze_photo fields that describe the shot, with their token weights
+_ANALYSIS_FIELDS = {
+    "setting": 2.0,
+    "pose": 1.5,
+    "style_category": 1.5,
+    "background": 1.0,
+    "clothing": 0.5,
+    "expression": 0.5,
+    "gender": 0.5,
+    "age_range": 0.5,
+}
+_LIGHTING_WEIGHT = 1.0
+_PROMPT_WORD_WEIGHT = 0.3
+
+# Words that carry no information about the scene
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in into is it its of on or "
+    "the their this to with without very more most not no unknown etc".split()
+)
+
+
+def _words(text: str) -> list[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if len(w) > 2 and w not in _STOPWORDS]
+
+
+def _add(vector: np.ndarray, token: str, weight: float) -> None:
+    digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    # Low bit picks the sign, so colliding tokens tend to cancel rather than pile up
+    sign = 1.0 if value & 1 else -1.0
+    vector[(value >> 1) % vector.shape[0]] += sign * weight
+
+
+def embed(photo_analysis: dict | None = None, prompt: str = "", dim: int | None = None) -> np.ndarray:
+    """Feature vector for a photo analysis and/or prompt text (float32, unit length).
+
+    Field values contribute both a field-scoped token ("setting=cafe") and a
+    plain word token ("cafe"); prompt words only add plain word tokens, so a
+    query built from an analysis alone still lands near prompts written for
+    similar scenes.
+    """
+    vector = np.zeros(dim or config.PROMPT_VECTOR_DIM, dtype=np.float32)
+    analysis = photo_analysis or {}
+
+    for field, weight in _ANALYSIS_FIELDS.items():
+        value = analysis.get(field)
+        if not isinstance(value, str):
+            continue
+        for word in _words(value):
+            _add(vector, f"{field}={word}", weight)
+            _add(vector, word, weight * 0.5)
+
+    lighting = analysis.get("lighting")
+    if isinstance(lighting, dict):
+        for key, value in lighting.items():
+            if isinstance(value, str):
+                for word in _words(value):
+                    _add(vector, f"lighting.{key}={word}", _LIGHTING_WEIGHT)
+
+    if prompt:
+        counts: dict[str, int] = {}
+        for word in _words(prompt):
+            counts[word] = counts.get(word, 0) + 1
+        # Sublinear term frequency: long prompts should not drown out the analysis
+        for word, n in counts.items():
+            _add(vector, word, _PROMPT_WORD_WEIGHT * (1.0 + np.log(n)))
+
+    norm = float(np.linalg.norm(vector))
+    if norm > 0:
+        vector /= norm
+    return vector
+
+
+def to_blob(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def from_blob(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=np.float32)
+
+
+class PromptVectorIndex:
+    """Brute-force cosine k-NN over a contiguous float32 matrix.
+
+    Rows live in one preallocated array that doubles when full, and removals
+    swap the last row into the gap, so a search is one matrix-vector product
+    plus ``argpartition`` — a few milliseconds at 100k entries, with no
+    per-row Python work. Each row also carries the caller's record (prompt
+    text, score, scenario), so a hit can be served without a database read.
+    """
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self.dim = dim
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._scores = np.zeros(capacity, dtype=np.float32)
+        self._records: list[dict | None] = [None] * capacity
+        self._row_of: dict[int, int] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _grow(self) -> None:
+        capacity = self._vectors.shape[0] * 2
+        vectors = np.zeros((capacity, self.dim), dtype=np.float32)
+        vectors[: self._count] = self._vectors[: self._count]
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[: self._count] = self._ids[: self._count]
+        scores = np.zeros(capacity, dtype=np.float32)
+        scores[: self._count] = self._scores[: self._count]
+        self._vectors, self._ids, self._scores = vectors, ids, scores
+        self._records.extend([None] * (capacity - len(self._records)))
+
+    def upsert(self, entries: list[tuple[int, float, np.ndarray, dict]]) -> None:
+        """Add or replace (row id, score, vector, record) entries."""
+        with self._lock:
+            for row_id, score, vector, record in entries:
+                if vector.shape[0] != self.dim:
+                    continue
+                row = self._row_of.get(row_id)
+                if row is None:
+                    if self._count == self._vectors.shape[0]:
+                        self._grow()
+                    row = self._count
+                    self._count += 1
+                    self._row_of[row_id] = row
+                    self._ids[row] = row_id
+                self._vectors[row] = vector
+                self._scores[row] = score
+                self._records[row] = record
+
+    def remove(self, row_ids: list[int]) -> None:
+        with self._lock:
+            for row_id in row_ids:
+                row = self._row_of.pop(row_id, None)
+                if row is None:
+                    continue
+                last = self._count - 1
+                if row != last:
+                    self._vectors[row] = self._vectors[last]
+                    self._scores[row] = self._scores[last]
+                    self._ids[row] = self._ids[last]
+                    self._records[row] = self._records[last]
+                    self._row_of[int(self._ids[row])] = row
+                self._records[last] = None
+                self._count = last
+
+    def search(
+        self, query: np.ndarray, k: int, min_score: float = 0.0, min_similarity: float = 0.0
+    ) -> list[tuple[int, float, dict]]:
+        """The ``k`` most similar entries scoring at least ``min_score``.
+
+        Returns:
+            (row id, cosine similarity, record) triples, most similar first
+        """
+        with self._lock:
+            n = self._count
+            if n == 0 or k <= 0:
+                return []
+            sims = self._vectors[:n] @ query
+            sims[self._scores[:n] < min_score] = -np.inf
+            k = min(k, n)
+            top = np.argpartition(-sims, k - 1)[:k] if k < n else np.arange(n)
+            top = top[np.argsort(-sims[top])]
+            return [
+                (int(self._ids[i]), float(sims[i]), self._records[i])
+                for i in top
+                if sims[i] >= min_similarity
+            ]
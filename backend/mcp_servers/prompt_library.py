@@ -1,127 +1,660 @@
 from __future__ import annotations
 """Prompt Library MCP Server — stores and retrieves successful prompt patterns.
 
-Uses SQLite for thread-safe, ACID-compliant storage.
+Uses SQLite for thread-safe, ACID-compliant storage. One long-lived store per
+database file owns the connections: reads run on a small reader pool off the
+event loop, and writes are queued and applied in batches by a single writer
+thread, so saving a result never sits on the request path. The best prompts
+per scenario are also held in memory and refreshed by the writer, so prompt
+assembly does not touch the database in steady state. Each row also carries a
+locally computed feature vector, so past winners can be retrieved by photo
+similarity as well as by scenario. The same store keeps per-scenario
+counts of retry attempts and their outcomes, which the retry policy learns from.
 """
 
+import asyncio
+import atexit
 import hashlib
 import logging
+import queue
+import re
 import sqlite3
 import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from config import config
+from mcp_servers.prompt_index import PromptVectorIndex, embed, from_blob, to_blob
+from tracing import traced
 
 logger = logging.getLogger("glowup.prompt_library")
 
+_STOP = object()
 
-class PromptLibraryMCP:
-    """MCP-style tool server for managing prompt patterns.
+DEFAULT_SCENARIO = "default_enhance"
 
-    Uses a local SQLite database for thread-safe storage.
-    Stores prompts that produced PASS results so the pipeline improves over time.
+
+def normalize_scenario(name: str) -> str:
+    """Canonical scenario key: lowercase words joined by single underscores.
+
+    e.g. "Coffee Shop_vibe" -> "coffee_shop_vibe"
     """
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
 
-    _lock = threading.Lock()
 
-    def __init__(self):
-        self.db_path = config.PROMPT_LIBRARY_PATH
+def scenario_chain(vibe: str | None = None, style: str | None = None) -> list[str]:
+    """Scenario keys from most to least specific: vibe -> style -> default."""
+    chain = []
+    if vibe and normalize_scenario(vibe):
+        chain.append(f"{normalize_scenario(vibe)}_vibe")
+    if style and normalize_scenario(style):
+        chain.append(f"{normalize_scenario(style)}_style")
+    chain.append(DEFAULT_SCENARIO)
+    return chain
+
+
+def scenario_for(vibe: str | None = None, style: str | None = None) -> str:
+    """The most specific scenario key a result should be saved under."""
+    return scenario_chain(vibe, style)[0]
+
+
+@dataclass(frozen=True)
+class AttemptOutcome:
+    """One inspected generation attempt, counted into ``attempt_stats``."""
+
+    scenario: str
+    style: str
+    attempt: int  # 0 = first attempt, 1.. = retries
+    issue: str  # issue type of the failure that led to this attempt ("" for the first)
+    temperature: float
+    passed: bool
+
+
+def _prompt_hash(prompt: str) -> str:
+    """Dedup key for a prompt (full-length; short hashes collide at library scale)."""
+    return hashlib.md5(prompt.encode()).hexdigest()
+
+
+def _select_top(conn: sqlite3.Connection, scenario: str, limit: int) -> list[dict]:
+    """Highest-scoring passing prompts for one exact scenario key (or all, if empty).
+
+    The exact-match form is served by the (scenario, score) composite index.
+    """
+    if scenario:
+        rows = conn.execute(
+            """SELECT prompt, score, scenario, photo_description
+               FROM prompts
+               WHERE scenario = ? AND score >= ?
+               ORDER BY score DESC
+               LIMIT ?""",
+            (scenario, config.QUALITY_THRESHOLD, limit),
+        ).fetchall()
+    else:
+        rows = conn.execute(
+            """SELECT prompt, score, scenario, photo_description
+               FROM prompts
+               WHERE score >= ?
+               ORDER BY score DESC
+               LIMIT ?""",
+            (config.QUALITY_THRESHOLD, limit),
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+# Columns mirrored into the k-NN index, so similarity hits need no table read
+_INDEX_COLUMNS = "id, prompt, score, scenario, photo_description, embedding"
+
+
+def _index_entry(row: sqlite3.Row) -> tuple:
+    record = {
+        "prompt": row["prompt"],
+        "score": row["score"],
+        "scenario": row["scenario"],
+        "photo_description": row["photo_description"],
+    }
+    return row["id"], row["score"], from_blob(row["embedding"]), record
+
+
+class _LibraryStore:
+    """Process-wide owner of one prompt library database.
+
+    Created once per database path: the schema DDL runs once, reader threads
+    keep persistent connections, and a writer thread drains a write-behind
+    queue in batched transactions. Every row's feature vector and display
+    fields are mirrored in an in-memory k-NN index that the writer keeps in
+    step with the table.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._readers = ThreadPoolExecutor(
+            max_workers=config.PROMPT_LIBRARY_READERS,
+            thread_name_prefix="prompt-library-read",
+        )
+        self._writes: queue.Queue = queue.Queue()
+        # scenario key -> top PROMPT_CACHE_PER_SCENARIO rows, in LRU order
+        self._top_cache: OrderedDict[str, list[dict]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_generation = 0
+        self._index = PromptVectorIndex(config.PROMPT_VECTOR_DIM)
         self._ensure_db()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="prompt-library-write", daemon=True
+        )
+        self._writer.start()
 
-    def _get_conn(self) -> sqlite3.Connection:
-        conn = sqlite3.connect(self.db_path, timeout=10)
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
         conn.row_factory = sqlite3.Row
         conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
         return conn
 
     def _ensure_db(self):
-        with self._lock:
-            conn = self._get_conn()
-            try:
-                conn.execute("""
-                    CREATE TABLE IF NOT EXISTS prompts (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        prompt TEXT NOT NULL,
-                        score REAL NOT NULL,
-                        scenario TEXT DEFAULT '',
-                        photo_description TEXT DEFAULT '',
-                        prompt_hash TEXT NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                conn.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_prompts_scenario ON prompts(scenario)
-                """)
-                conn.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_prompts_score ON prompts(score DESC)
-                """)
-                conn.commit()
-            finally:
-                conn.close()
+        conn = self._connect()
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS prompts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    prompt TEXT NOT NULL,
+                    score REAL NOT NULL,
+                    scenario TEXT DEFAULT '',
+                    photo_description TEXT DEFAULT '',
+                    prompt_hash TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    embedding BLOB
+                )
+            """)
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:
+                self._migrate_unique_hashes(conn)
+            if version < 2:
+                self._migrate_normalized_scenarios(conn)
+            if version < 3:
+                self._migrate_embeddings(conn)
+            if version < 4:
+                self._migrate_attempt_stats(conn)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_prompts_scenario_score ON prompts(scenario, score DESC)
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_prompts_score ON prompts(score DESC)
+            """)
+            conn.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS idx_prompts_hash ON prompts(prompt_hash)
+            """)
+            conn.commit()
+
+            # Row counts drive amortized pruning; the writer keeps them current
+            self._scenario_counts: dict[str, int] = {
+                row["scenario"]: row["n"]
+                for row in conn.execute(
+                    "SELECT scenario, COUNT(*) AS n FROM prompts GROUP BY scenario"
+                )
+            }
+
+            cursor = conn.execute(
+                f"SELECT {_INDEX_COLUMNS} FROM prompts WHERE embedding IS NOT NULL"
+            )
+            while rows := cursor.fetchmany(5000):
+                self._index.upsert([_index_entry(row) for row in rows])
+            logger.info("prompt_library.index_loaded rows=%d", len(self._index))
+        finally:
+            conn.close()
+
+    def _migrate_unique_hashes(self, conn: sqlite3.Connection):
+        """Schema v1: full-length prompt hashes, one row per distinct prompt."""
+        with conn:
+            rows = conn.execute("SELECT id, prompt FROM prompts").fetchall()
+            conn.executemany(
+                "UPDATE prompts SET prompt_hash = ? WHERE id = ?",
+                [(_prompt_hash(row["prompt"]), row["id"]) for row in rows],
+            )
+            # Keep the best-scoring copy of each duplicated prompt
+            removed = conn.execute("""
+                DELETE FROM prompts WHERE id NOT IN (
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                            PARTITION BY prompt_hash ORDER BY score DESC, id ASC
+                        ) AS rank
+                        FROM prompts
+                    ) WHERE rank = 1
+                )
+            """).rowcount
+            conn.execute("PRAGMA user_version = 1")
+        logger.info("prompt_library.migrated version=1 rows=%d duplicates_removed=%d", len(rows), removed)
+
+    def _migrate_normalized_scenarios(self, conn: sqlite3.Connection):
+        """Schema v2: canonical scenario keys and a (scenario, score) index.
+
+        The old single-column scenario index only served LIKE '%...%' lookups,
+        which can never use it; exact matches on normalized keys use the
+        composite index instead.
+        """
+        with conn:
+            rows = conn.execute("SELECT DISTINCT scenario FROM prompts").fetchall()
+            conn.executemany(
+                "UPDATE prompts SET scenario = ? WHERE scenario = ?",
+                [
+                    (normalize_scenario(row["scenario"] or "") or DEFAULT_SCENARIO, row["scenario"])
+                    for row in rows
+                ],
+            )
+            conn.execute("DROP INDEX IF EXISTS idx_prompts_scenario")
+            conn.execute("PRAGMA user_version = 2")
+        logger.info("prompt_library.migrated version=2 scenarios=%d", len(rows))
+
+    def _migrate_embeddings(self, conn: sqlite3.Connection):
+        """Schema v3: a feature vector per row for similarity retrieval.
+
+        Rows saved before v3 have no photo analysis, so their vectors are
+        built from the prompt and photo description text.
+        """
+        with conn:
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(prompts)")}
+            if "embedding" not in columns:
+                conn.execute("ALTER TABLE prompts ADD COLUMN embedding BLOB")
+            rows = conn.execute(
+                "SELECT id, prompt, photo_description FROM prompts WHERE embedding IS NULL"
+            ).fetchall()
+            conn.executemany(
+                "UPDATE prompts SET embedding = ? WHERE id = ?",
+                [
+                    (to_blob(embed(prompt=f"{row['prompt']} {row['photo_description'] or ''}")), row["id"])
+                    for row in rows
+                ],
+            )
+            conn.execute("PRAGMA user_version = 3")
+        logger.info("prompt_library.migrated version=3 embedded=%d", len(rows))
+
+    def _migrate_attempt_stats(self, conn: sqlite3.Connection):
+        """Schema v4: aggregated outcomes of generation attempts for the retry policy."""
+        with conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS attempt_stats (
+                    scenario TEXT NOT NULL,
+                    style TEXT NOT NULL,
+                    attempt INTEGER NOT NULL,
+                    issue TEXT NOT NULL,
+                    temperature REAL NOT NULL,
+                    trials INTEGER NOT NULL DEFAULT 0,
+                    passes INTEGER NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (scenario, style, attempt, issue, temperature)
+                )
+            """)
+            conn.execute("PRAGMA user_version = 4")
+        logger.info("prompt_library.migrated version=4")
+
+    # ── Reads ──────────────────────────────────────────────────────
+
+    def _reader_conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+
+    async def read(self, fn, *args):
+        """Run ``fn(conn, *args)`` on the reader pool without blocking the event loop."""
+        return await asyncio.get_running_loop().run_in_executor(
+            self._readers, lambda: fn(self._reader_conn(), *args)
+        )
+
+    # ── Top-prompts cache ──────────────────────────────────────────
+
+    async def top_prompts(self, key: str, limit: int) -> list[dict]:
+        """Best passing prompts for a normalized scenario key, from memory when possible."""
+        if limit > config.PROMPT_CACHE_PER_SCENARIO:
+            return await self.read(_select_top, key, limit)
+
+        with self._cache_lock:
+            rows = self._top_cache.get(key)
+            if rows is not None:
+                self._top_cache.move_to_end(key)
+                return [dict(row) for row in rows[:limit]]
+            generation = self._cache_generation
+
+        rows = await self.read(_select_top, key, config.PROMPT_CACHE_PER_SCENARIO)
+
+        with self._cache_lock:
+            # Only cache if no write landed while we were reading
+            if generation == self._cache_generation:
+                self._cache_put(key, rows)
+        return [dict(row) for row in rows[:limit]]
+
+    # ── Similarity search ──────────────────────────────────────────
+
+    async def similar_prompts(self, vector, limit: int) -> list[dict]:
+        """Nearest passing prompts to a feature vector, most similar first.
+
+        Served entirely from the in-memory index; SQLite is only read when
+        the index is rebuilt at startup.
+        """
+        hits = await asyncio.get_running_loop().run_in_executor(
+            self._readers,
+            lambda: self._index.search(
+                vector, limit,
+                min_score=config.QUALITY_THRESHOLD,
+                min_similarity=config.PROMPT_SIMILARITY_MIN,
+            ),
+        )
+        return [
+            {**record, "similarity": round(similarity, 3)}
+            for _, similarity, record in hits
+        ]
 
+    def _cache_put(self, key: str, rows: list[dict]) -> None:
+        self._top_cache[key] = rows
+        self._top_cache.move_to_end(key)
+        while len(self._top_cache) > config.PROMPT_CACHE_MAX_SCENARIOS:
+            self._top_cache.popitem(last=False)
+
+    def _refresh_cache(self, conn: sqlite3.Connection, scenarios: set[str], pruned_global: bool):
+        """Re-read cached scenarios affected by a committed batch (writer thread)."""
+        with self._cache_lock:
+            self._cache_generation += 1
+            cached = list(self._top_cache)
+        # "" caches the all-scenario view; a global prune can touch any key
+        stale = [key for key in cached if pruned_global or key == "" or key in scenarios]
+        fresh = {key: _select_top(conn, key, config.PROMPT_CACHE_PER_SCENARIO) for key in stale}
+        with self._cache_lock:
+            self._cache_generation += 1
+            for key, rows in fresh.items():
+                if key in self._top_cache:
+                    self._top_cache[key] = rows
+
+    # ── Write-behind queue ─────────────────────────────────────────
+
+    def enqueue(self, row: tuple | AttemptOutcome) -> None:
+        """Queue a prompt row (prompt, score, scenario, photo_description, prompt_hash,
+        embedding) or an ``AttemptOutcome``."""
+        self._writes.put(row)
+
+    def flush(self) -> None:
+        """Block until every queued write has been committed."""
+        self._writes.join()
+
+    def close(self) -> None:
+        """Commit pending writes and stop the writer thread."""
+        if self._writer.is_alive():
+            self._writes.put(_STOP)
+            self._writer.join(timeout=10)
+        self._readers.shutdown(wait=False)
+
+    def _write_loop(self):
+        conn = self._connect()
+        try:
+            while True:
+                item = self._writes.get()
+                batch = [item]
+                # Gather whatever else arrives within the flush window into one transaction
+                while item is not _STOP and len(batch) < config.PROMPT_LIBRARY_WRITE_BATCH:
+                    try:
+                        item = self._writes.get(timeout=config.PROMPT_LIBRARY_FLUSH_INTERVAL_S)
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+
+                rows = [row for row in batch if row is not _STOP and not isinstance(row, AttemptOutcome)]
+                outcomes = [row for row in batch if isinstance(row, AttemptOutcome)]
+                # A bad batch is dropped and logged; the writer must outlive it, or
+                # every later write would queue forever and flush() would hang
+                try:
+                    if rows:
+                        self._apply_batch(conn, rows)
+                except Exception:
+                    logger.exception("prompt_library.write_failed rows=%d", len(rows))
+                try:
+                    if outcomes:
+                        self._apply_outcomes(conn, outcomes)
+                except Exception:
+                    logger.exception("prompt_library.write_failed outcomes=%d", len(outcomes))
+                finally:
+                    for _ in batch:
+                        self._writes.task_done()
+
+                if any(row is _STOP for row in batch):
+                    return
+        finally:
+            conn.close()
+
+    def _apply_batch(self, conn: sqlite3.Connection, rows: list[tuple]):
+        hashes = list({row[4] for row in rows})
+        placeholders = ",".join("?" * len(hashes))
+
+        def scenarios_by_hash() -> dict[str, str]:
+            return {
+                r["prompt_hash"]: r["scenario"]
+                for r in conn.execute(
+                    f"SELECT prompt_hash, scenario FROM prompts WHERE prompt_hash IN ({placeholders})",
+                    hashes,
+                )
+            }
+
+        with conn:
+            before = scenarios_by_hash()
+            # Re-saving a known prompt updates it in place, keeping its best score
+            conn.executemany(
+                """INSERT INTO prompts (prompt, score, scenario, photo_description, prompt_hash, embedding)
+                   VALUES (?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(prompt_hash) DO UPDATE SET
+                       score = MAX(score, excluded.score),
+                       scenario = CASE WHEN excluded.score > score
+                                       THEN excluded.scenario ELSE scenario END,
+                       embedding = CASE WHEN excluded.score > score OR embedding IS NULL
+                                        THEN excluded.embedding ELSE embedding END,
+                       created_at = CURRENT_TIMESTAMP""",
+                rows,
+            )
+            # A better score can move a known prompt to another scenario
+            after = scenarios_by_hash()
+            delta: dict[str, int] = {}
+            for prompt_hash, scenario in after.items():
+                if prompt_hash in before:
+                    delta[before[prompt_hash]] = delta.get(before[prompt_hash], 0) - 1
+                delta[scenario] = delta.get(scenario, 0) + 1
+            for scenario, n in delta.items():
+                self._scenario_counts[scenario] = self._scenario_counts.get(scenario, 0) + n
+
+            pruned, pruned_global = self._prune(conn, {s for s, n in delta.items() if n > 0})
+            upserted = conn.execute(
+                f"""SELECT {_INDEX_COLUMNS} FROM prompts
+                    WHERE prompt_hash IN ({placeholders}) AND embedding IS NOT NULL""",
+                hashes,
+            ).fetchall()
+
+        self._index.remove(pruned)
+        self._index.upsert([_index_entry(row) for row in upserted])
+        self._refresh_cache(conn, {row[2] for row in rows} | set(before.values()), pruned_global)
+        logger.info(
+            "prompt_library.flushed rows=%d new=%d pruned=%d",
+            len(rows), len(after) - len(before), len(pruned),
+        )
+
+    def _apply_outcomes(self, conn: sqlite3.Connection, outcomes: list[AttemptOutcome]):
+        counts: dict[tuple, list[int]] = {}
+        for o in outcomes:
+            cell = counts.setdefault((o.scenario, o.style, o.attempt, o.issue, o.temperature), [0, 0])
+            cell[0] += 1
+            cell[1] += int(o.passed)
+        with conn:
+            conn.executemany(
+                """INSERT INTO attempt_stats (scenario, style, attempt, issue, temperature, trials, passes)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(scenario, style, attempt, issue, temperature) DO UPDATE SET
+                       trials = trials + excluded.trials,
+                       passes = passes + excluded.passes,
+                       updated_at = CURRENT_TIMESTAMP""",
+                [(*key, trials, passes) for key, (trials, passes) in counts.items()],
+            )
+        logger.info("prompt_library.outcomes_flushed outcomes=%d cells=%d", len(outcomes), len(counts))
+
+    def _prune(self, conn: sqlite3.Connection, scenarios: set[str]) -> tuple[list[int], bool]:
+        """Enforce per-scenario quotas and the global row cap, amortized.
+
+        A scenario is only trimmed once it exceeds its quota by
+        PROMPT_LIBRARY_PRUNE_SLACK rows, so the cost of a prune is spread over
+        many inserts and one busy scenario never evicts another's prompts.
+
+        Returns:
+            (ids of deleted rows, whether the global cap forced a cross-scenario prune)
+        """
+        quota = config.PROMPT_LIBRARY_SCENARIO_QUOTA
+        slack = config.PROMPT_LIBRARY_PRUNE_SLACK
+        pruned: list[int] = []
+        for scenario in scenarios:
+            if self._scenario_counts.get(scenario, 0) <= quota + slack:
+                continue
+            pruned += [
+                row["id"]
+                for row in conn.execute(
+                    """DELETE FROM prompts WHERE id IN (
+                           SELECT id FROM prompts WHERE scenario = ?
+                           ORDER BY score DESC, id DESC
+                           LIMIT -1 OFFSET ?
+                       )
+                       RETURNING id""",
+                    (scenario, quota),
+                )
+            ]
+            self._scenario_counts[scenario] = quota
+
+        # Safety net for many distinct scenarios: trim the globally weakest rows
+        max_rows = config.PROMPT_LIBRARY_MAX_ROWS
+        if sum(self._scenario_counts.values()) <= max_rows + slack:
+            return pruned, False
+        pruned += [
+            row["id"]
+            for row in conn.execute(
+                """DELETE FROM prompts WHERE id IN (
+                       SELECT id FROM prompts ORDER BY score DESC, id DESC LIMIT -1 OFFSET ?
+                   )
+                   RETURNING id""",
+                (max_rows,),
+            )
+        ]
+        self._scenario_counts = {
+            row["scenario"]: row["n"]
+            for row in conn.execute("SELECT scenario, COUNT(*) AS n FROM prompts GROUP BY scenario")
+        }
+        return pruned, True
+
+
+_stores: dict[str, _LibraryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def _get_store(db_path: str) -> _LibraryStore:
+    with _stores_lock:
+        store = _stores.get(db_path)
+        if store is None:
+            store = _LibraryStore(db_path)
+            _stores[db_path] = store
+            atexit.register(store.close)
+        return store
+
+
+class PromptLibraryMCP:
+    """MCP-style tool server for managing prompt patterns.
+
+    Uses a local SQLite database for thread-safe storage.
+    Stores prompts that produced PASS results so the pipeline improves over time.
+    Instances are cheap: they all share the process-wide store for their path.
+    """
+
+    def __init__(self):
+        self.db_path = config.PROMPT_LIBRARY_PATH
+        self._store = _get_store(self.db_path)
+
+    @traced("mcp.prompt_library.get_successful_prompts")
     async def get_successful_prompts(
         self, scenario: str = "", limit: int = 3
     ) -> list[dict]:
         """Retrieve prompts that previously produced PASS results.
 
+        Served from the store's in-memory top-prompts cache, which the
+        writer refreshes whenever new results are committed.
+
         Args:
-            scenario: e.g. "outdoor_enhance", "coffee_shop_vibe"
+            scenario: e.g. "outdoor_enhance", "coffee_shop_vibe" (exact match
+                after normalization; empty for all scenarios)
             limit: max number to return
         """
-        with self._lock:
-            conn = self._get_conn()
-            try:
-                if scenario:
-                    rows = conn.execute(
-                        """SELECT prompt, score, scenario, photo_description
-                           FROM prompts
-                           WHERE score >= ? AND scenario LIKE ?
-                           ORDER BY score DESC
-                           LIMIT ?""",
-                        (config.QUALITY_THRESHOLD, f"%{scenario.lower()}%", limit),
-                    ).fetchall()
-                else:
-                    rows = conn.execute(
-                        """SELECT prompt, score, scenario, photo_description
-                           FROM prompts
-                           WHERE score >= ?
-                           ORDER BY score DESC
-                           LIMIT ?""",
-                        (config.QUALITY_THRESHOLD, limit),
-                    ).fetchall()
-                return [dict(row) for row in rows]
-            finally:
-                conn.close()
+        return await self._store.top_prompts(normalize_scenario(scenario), limit)
 
+    @traced("mcp.prompt_library.get_prompts_for")
+    async def get_prompts_for(
+        self, vibe: str | None = None, style: str | None = None, limit: int = 3
+    ) -> list[dict]:
+        """Retrieve past winners walking the vibe -> style -> default hierarchy.
+
+        Each level is an exact-match lookup; more specific levels fill the
+        result first and broader levels only top it up.
+        """
+        results: list[dict] = []
+        for scenario in scenario_chain(vibe, style):
+            if len(results) >= limit:
+                break
+            results.extend(await self._store.top_prompts(scenario, limit - len(results)))
+        return results
+
+    @traced("mcp.prompt_library.get_similar_prompts")
+    async def get_similar_prompts(self, photo_analysis: dict, limit: int = 3) -> list[dict]:
+        """Retrieve the past winners whose photos look most like this one.
+
+        The analysis is turned into a feature vector locally and matched
+        against the in-memory index, regardless of scenario. Each result
+        carries a cosine ``similarity`` alongside the usual fields.
+        """
+        return await self._store.similar_prompts(embed(photo_analysis), limit)
+
+    @traced("mcp.prompt_library.save_prompt_result")
     async def save_prompt_result(
         self,
         prompt: str,
         score: float,
         scenario: str = "",
         photo_description: str = "",
+        photo_analysis: dict | None = None,
     ):
-        """Save a prompt and its quality score for future learning."""
-        prompt_hash = hashlib.md5(prompt.encode()).hexdigest()[:8]
-
-        with self._lock:
-            conn = self._get_conn()
-            try:
-                conn.execute(
-                    """INSERT INTO prompts (prompt, score, scenario, photo_description, prompt_hash)
-                       VALUES (?, ?, ?, ?, ?)""",
-                    (prompt, score, scenario, photo_description, prompt_hash),
-                )
+        """Queue a prompt and its quality score for future learning.
+
+        The write is committed in the background by the store's writer thread.
+        Saving a prompt that is already in the library keeps a single row with
+        the better of the two scores. ``photo_analysis`` (from analyze_photo)
+        and the prompt text make up the row's feature vector.
+        """
+        prompt_hash = _prompt_hash(prompt)
+        scenario = normalize_scenario(scenario) or DEFAULT_SCENARIO
+        embedding = to_blob(embed(photo_analysis, prompt))
+        self._store.enqueue((prompt, score, scenario, photo_description, prompt_hash, embedding))
+        logger.info("prompt_library.queued hash=%s score=%.1f scenario=%s", prompt_hash[:8], score, scenario)
 
-                # Keep only the top 100 prompts
-                conn.execute("""
-                    DELETE FROM prompts WHERE id NOT IN (
-                        SELECT id FROM prompts ORDER BY score DESC LIMIT 100
-                    )
-                """)
+    def flush(self) -> None:
+        """Block until all queued results are committed (shutdown, tests)."""
+        self._store.flush()
+
+    @traced("mcp.prompt_library.get_attempt_stats")
+    async def get_attempt_stats(self, scenario: str) -> list[dict]:
+        """Attempt outcome counts for a scenario, one row per (style, attempt, issue, temperature)."""
+        def select(conn: sqlite3.Connection, scenario: str) -> list[dict]:
+            return [
+                dict(row)
+                for row in conn.execute(
+                    """SELECT style, attempt, issue, temperature, trials, passes
+                       FROM attempt_stats WHERE scenario = ?""",
+                    (scenario,),
+                )
+            ]
+        return await self._store.read(select, normalize_scenario(scenario) or DEFAULT_SCENARIO)
 
-                conn.commit()
-                logger.info("prompt_library.saved hash=%s score=%.1f scenario=%s", prompt_hash, score, scenario)
-            finally:
-                conn.close()
+    def record_attempt(self, outcome: AttemptOutcome) -> None:
+        """Queue an attempt outcome; counted in the background like saved prompts."""
+        self._store.enqueue(outcome)
 
+    @traced("mcp.prompt_library.get_enhancement_patterns")
     async def get_enhancement_patterns(
         self, lighting_issue: str = "", pose_type: str = ""
     ) -> list[str]:
@@ -151,6 +684,7 @@ class PromptLibraryMCP:
             ]
         return results
 
+    @traced("mcp.prompt_library.get_realism_rules")
     async def get_realism_rules(self) -> str:
         """Return the latest version of realism instructions for prompts."""
         return """CRITICAL REALISM RULES — the generated image MUST follow ALL of these:
@@ -1,51 +1,215 @@
 from __future__ import annotations
-"""Storage MCP Server — local filesystem storage for the demo."""
+"""Storage MCP Server — content-addressed storage for generated files."""
 
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import mimetypes
 import os
+import posixpath
+import time
 import zipfile
-from io import BytesIO
-from config import config
+from collections.abc import Iterator
+from mcp_servers.object_store import ObjectStore, get_object_store
+from tracing import current_span, traced
+
+logger = logging.getLogger("glowup.storage")
+
+# Formats that are already entropy-coded — DEFLATE only burns CPU on these
+_PRECOMPRESSED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".zip"}
+# Key prefix of the content-addressed blobs that named keys alias
+CAS_PREFIX = "_cas/"
+# Every job's files live in their own directory under a hashed shard:
+# jobs/<first 2 hex of sha256(job id)>/<job id>/<filename>
+JOBS_PREFIX = "jobs/"
+MANIFEST_NAME = "manifest.json"
+
+
+class _ZipStreamBuffer(io.RawIOBase):
+    """Write-only, unseekable sink that hands ZIP output back in chunks.
+
+    zipfile detects that it cannot seek and falls back to data descriptors,
+    so archives can be emitted front to back without a temporary file.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _compress_type_for(path: str) -> int:
+    ext = os.path.splitext(path)[1].lower()
+    return zipfile.ZIP_STORED if ext in _PRECOMPRESSED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+
+def job_id_of(name: str) -> str | None:
+    """Job a stored file belongs to, from its key or bare filename.
+
+    "abc12345-2_enhanced_1.jpg" and "jobs/5e/abc12345/abc12345-2_enhanced_1.jpg"
+    both give "abc12345". Files outside any job (reference cache, blobs) give None.
+    """
+    if name.startswith(JOBS_PREFIX):
+        parts = name.split("/")
+        return parts[2] if len(parts) > 3 else None
+    if "/" in name or name.startswith("_") or "_" not in name:
+        return None
+    # Batch photos are named "<job id>-<n>"
+    return name.split("_", 1)[0].split("-", 1)[0]
+
+
+def job_prefix(job_id: str) -> str:
+    """Key prefix (directory) holding all of a job's files."""
+    shard = hashlib.sha256(job_id.encode("utf-8")).hexdigest()[:2]
+    return f"{JOBS_PREFIX}{shard}/{job_id}/"
+
+
+def job_key(filename: str) -> str:
+    """Sharded key of a job file ("abc12345_enhanced_1.jpg" -> "jobs/5e/abc12345/abc12345_enhanced_1.jpg")."""
+    job_id = job_id_of(filename)
+    if job_id is None or "/" in filename:
+        raise ValueError(f"not a job filename: {filename!r}")
+    return job_prefix(job_id) + filename
+
+
+def manifest_key(job_id: str) -> str:
+    return job_prefix(job_id) + MANIFEST_NAME
+
+
+def blob_key(data: bytes, extension: str = "") -> str:
+    """Content-addressed key for ``data``: ``_cas/<2 hex>/<sha256><extension>``."""
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{CAS_PREFIX}{digest[:2]}/{digest}{extension}"
 
 
 class StorageMCP:
     """MCP-style tool server for file storage.
 
-    For the demo, this just saves to the local filesystem.
-    In production, this would use Google Cloud Storage with signed URLs.
+    Files are content-addressed: the bytes are stored once under
+    ``_cas/`` by their SHA-256, and each named key is an alias of that blob,
+    so identical outputs are written once. That needs a backend whose aliases
+    share bytes (``ObjectStore.shares_content``); on S3 an alias is a full
+    copy, so files are written straight to their key and are not
+    deduplicated. Named keys of job files live in
+    the job's own sharded directory (``job_key``), next to its manifest. The
+    backend is the local OUTPUT_DIR or an S3-compatible bucket, chosen by
+    STORAGE_BACKEND (see ``object_store``).
     """
 
-    def __init__(self):
-        os.makedirs(config.OUTPUT_DIR, exist_ok=True)
-
-    async def save(
-        self,
-        data: bytes,
-        filename: str,
-        subdir: str = "",
-    ) -> str:
-        """Save bytes to local filesystem. Returns the file path."""
-        if subdir:
-            dir_path = os.path.join(config.OUTPUT_DIR, subdir)
-            os.makedirs(dir_path, exist_ok=True)
-            path = os.path.join(dir_path, filename)
-        else:
-            path = os.path.join(config.OUTPUT_DIR, filename)
-
-        with open(path, "wb") as f:
-            f.write(data)
-        return path
-
-    async def load(self, path: str) -> bytes:
-        """Load file from filesystem."""
-        with open(path, "rb") as f:
-            return f.read()
-
-    async def create_zip(
-        self, file_paths: list[str], output_name: str
-    ) -> str:
-        """Create a ZIP of multiple files. Returns path to ZIP file."""
-        zip_path = os.path.join(config.OUTPUT_DIR, output_name)
-        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-            for path in file_paths:
-                zf.write(path, os.path.basename(path))
-        return zip_path
+    def __init__(self, store: ObjectStore | None = None):
+        self.store = store or get_object_store()
+
+    @traced("mcp.storage.save")
+    async def save(self, data: bytes, key: str) -> str:
+        """Store ``data`` under ``key``, deduplicated by content where the backend can. Returns the key."""
+        if not self.store.shares_content:
+            await self.store.put(key, data, mimetypes.guess_type(key)[0])
+            return key
+        blob = blob_key(data, posixpath.splitext(key)[1].lower())
+        content_type = mimetypes.guess_type(key)[0]
+        deduplicated = await self.store.exists(blob)
+        if not deduplicated:
+            await self.store.put(blob, data, content_type)
+        try:
+            await self.store.alias(blob, key)
+        except FileNotFoundError:
+            # The blob was collected between the check and the link — write it again
+            deduplicated = False
+            await self.store.put(blob, data, content_type)
+            await self.store.alias(blob, key)
+        save_span = current_span()
+        if save_span is not None:
+            save_span.set_attribute("storage.deduplicated", deduplicated)
+            save_span.set_attribute("storage.bytes", len(data))
+        return key
+
+    @traced("mcp.storage.write_manifest")
+    async def write_manifest(self, job_id: str, photos: list[dict]) -> dict:
+        """Record a finished job's files in ``<job dir>/manifest.json``.
+
+        ``photos`` describe the job's outputs (filenames relative to the job
+        directory); the size of every stored file is added from one listing
+        of the job directory. Readers then find a job's files without
+        scanning or probing the store. Returns the manifest.
+        """
+        prefix = job_prefix(job_id)
+        assets = {
+            info.key[len(prefix):]: info.size
+            for info in await self.store.list(prefix)
+            if info.key[len(prefix):] != MANIFEST_NAME
+        }
+        manifest = {
+            "version": 1,
+            "job_id": job_id,
+            "created": time.time(),
+            "photos": photos,
+            "assets": assets,
+            "bytes": sum(assets.values()),
+        }
+        await self.store.put(
+            manifest_key(job_id), json.dumps(manifest).encode("utf-8"), "application/json"
+        )
+        logger.info("storage.manifest job=%s files=%d bytes=%d", job_id, len(assets), manifest["bytes"])
+        return manifest
+
+    async def read_manifest(self, job_id: str) -> dict | None:
+        """A job's manifest, or None if the job is unknown or has expired."""
+        try:
+            data = await self.store.get(manifest_key(job_id))
+        except (FileNotFoundError, ValueError):
+            return None
+        return json.loads(data)
+
+    @traced("mcp.storage.load")
+    async def load(self, key: str) -> bytes:
+        """Load a stored file."""
+        return await self.store.get(key)
+
+    def url(self, key: str) -> str:
+        """URL clients use to fetch ``key`` (presigned on remote backends)."""
+        return self.store.url(key)
+
+    def iter_zip(self, keys: list[str]) -> Iterator[bytes]:
+        """Yield a ZIP archive of the stored ``keys`` chunk by chunk as it is built.
+
+        JPEG/PNG/WebP entries are stored without recompression. Memory stays
+        at roughly one read chunk and nothing is written to disk. This is a
+        blocking generator — ``StreamingResponse`` iterates it in a threadpool.
+        """
+        sink = _ZipStreamBuffer()
+        with zipfile.ZipFile(sink, "w") as zf:
+            for key in keys:
+                zinfo = zipfile.ZipInfo(posixpath.basename(key), date_time=time.localtime()[:6])
+                zinfo.compress_type = _compress_type_for(key)
+                with zf.open(zinfo, "w") as dst:
+                    for chunk in self.store.iter_chunks(key):
+                        dst.write(chunk)
+                        data = sink.drain()
+                        if data:
+                            yield data
+                data = sink.drain()
+                if data:
+                    yield data
+        # Central directory, written when the archive closes
+        data = sink.drain()
+        if data:
+            yield data
+
+    @traced("mcp.storage.create_zip")
+    async def create_zip(self, keys: list[str], output_key: str) -> str:
+        """Create a ZIP of several stored files and store it. Returns its key."""
+        data = await asyncio.to_thread(lambda: b"".join(self.iter_zip(keys)))
+        return await self.save(data, output_key)
@@ -44,21 +44,28 @@ STYLE_PRESETS = {
 }
 
 from typing import Optional
+from tracing import traced
+
+# The style menu shown to the Image Analyzer — presets are static, so build it once
+STYLE_INSTRUCTIONS = "\n".join(
+    f"- ID: {sid} | Name: {data['name']} | Desc: {data['description']}"
+    for sid, data in STYLE_PRESETS.items()
+)
 
 class StyleLibraryMCP:
     """MCP interface for retrieving specific aesthetic styles."""
 
+    @traced("mcp.style_library.get_all_styles")
     async def get_all_styles(self) -> dict:
         """Get the full mapping of available styles."""
         return STYLE_PRESETS
 
+    @traced("mcp.style_library.get_style_by_id")
     async def get_style_by_id(self, style_id: str) -> Optional[dict]:
         """Get a specific style preset by its internal ID."""
         return STYLE_PRESETS.get(style_id)
 
+    @traced("mcp.style_library.get_style_instructions")
     async def get_style_instructions(self) -> str:
         """Format the styles for the Image Analyzer to pick from."""
-        options = []
-        for sid, data in STYLE_PRESETS.items():
-            options.append(f"- ID: {sid} | Name: {data['name']} | Desc: {data['description']}")
-        return "\n".join(options)
+        return STYLE_INSTRUCTIONS
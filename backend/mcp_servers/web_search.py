@@ -6,6 +6,7 @@ import logging
 import os
 import httpx
 from config import config
+from tracing import span, traced, SPAN_KIND_CLIENT
 
 logger = logging.getLogger("glowup.web_search")
 
@@ -18,6 +19,12 @@ class WebSearchMCP:
         self.pexels_key = config.PEXELS_API_KEY
         self.cache_dir = os.path.join(config.OUTPUT_DIR, "_ref_cache")
         os.makedirs(self.cache_dir, exist_ok=True)
+        # One pooled client for every search and download (built with the agents
+        # during warm-up), so calls reuse keep-alive connections and TLS sessions
+        self._client = httpx.AsyncClient(
+            timeout=15,
+            limits=httpx.Limits(max_connections=config.REF_HTTP_MAX_CONNECTIONS),
+        )
 
     def _evict_cache_if_needed(self):
         """Remove oldest cached files when cache exceeds max entries."""
@@ -41,6 +48,7 @@ class WebSearchMCP:
         except Exception as e:
             logger.warning("cache.eviction_failed error=%s", str(e))
 
+    @traced("mcp.web_search.search_images")
     async def search_images(
         self,
         query: str,
@@ -57,8 +65,8 @@ class WebSearchMCP:
         # --- Unsplash ---
         if self.unsplash_key:
             try:
-                async with httpx.AsyncClient(timeout=15) as client:
-                    resp = await client.get(
+                with span("http.get", kind=SPAN_KIND_CLIENT, **{"http.host": "api.unsplash.com"}) as http_span:
+                    resp = await self._client.get(
                         "https://api.unsplash.com/search/photos",
                         params={
                             "query": query,
@@ -69,17 +77,18 @@ class WebSearchMCP:
                             "Authorization": f"Client-ID {self.unsplash_key}"
                         },
                     )
-                    resp.raise_for_status()
-                    data = resp.json()
-                    for photo in data.get("results", []):
-                        results.append({
-                            "url": photo["urls"]["regular"],
-                            "thumbnail": photo["urls"]["thumb"],
-                            "description": photo.get("alt_description", ""),
-                            "source": "unsplash",
-                            "photographer": photo["user"]["name"],
-                        })
-                    logger.info("unsplash.search query=%s results=%d", query[:50], len(results))
+                    http_span.set_attribute("http.status_code", resp.status_code)
+                resp.raise_for_status()
+                data = resp.json()
+                for photo in data.get("results", []):
+                    results.append({
+                        "url": photo["urls"]["regular"],
+                        "thumbnail": photo["urls"]["thumb"],
+                        "description": photo.get("alt_description", ""),
+                        "source": "unsplash",
+                        "photographer": photo["user"]["name"],
+                    })
+                logger.info("unsplash.search query=%s results=%d", query[:50], len(results))
             except Exception as e:
                 logger.warning("unsplash.search_failed query=%s error=%s", query[:50], str(e))
 
@@ -87,8 +96,8 @@ class WebSearchMCP:
         if self.pexels_key and len(results) < count:
             needed = count - len(results)
             try:
-                async with httpx.AsyncClient(timeout=15) as client:
-                    resp = await client.get(
+                with span("http.get", kind=SPAN_KIND_CLIENT, **{"http.host": "api.pexels.com"}) as http_span:
+                    resp = await self._client.get(
                         "https://api.pexels.com/v1/search",
                         params={
                             "query": query,
@@ -97,24 +106,26 @@ class WebSearchMCP:
                         },
                         headers={"Authorization": self.pexels_key},
                     )
-                    resp.raise_for_status()
-                    data = resp.json()
-                    pexels_count = 0
-                    for photo in data.get("photos", []):
-                        results.append({
-                            "url": photo["src"]["large"],
-                            "thumbnail": photo["src"]["small"],
-                            "description": photo.get("alt", ""),
-                            "source": "pexels",
-                            "photographer": photo.get("photographer", ""),
-                        })
-                        pexels_count += 1
-                    logger.info("pexels.search query=%s results=%d", query[:50], pexels_count)
+                    http_span.set_attribute("http.status_code", resp.status_code)
+                resp.raise_for_status()
+                data = resp.json()
+                pexels_count = 0
+                for photo in data.get("photos", []):
+                    results.append({
+                        "url": photo["src"]["large"],
+                        "thumbnail": photo["src"]["small"],
+                        "description": photo.get("alt", ""),
+                        "source": "pexels",
+                        "photographer": photo.get("photographer", ""),
+                    })
+                    pexels_count += 1
+                logger.info("pexels.search query=%s results=%d", query[:50], pexels_count)
             except Exception as e:
                 logger.warning("pexels.search_failed query=%s error=%s", query[:50], str(e))
 
         return results[:count]
 
+    @traced("mcp.web_search.download_image")
     async def download_image(self, url: str) -> str | None:
         """Download an image from URL to local cache. Returns local file path."""
         url_hash = hashlib.md5(url.encode()).hexdigest()[:12]
@@ -127,12 +138,14 @@ class WebSearchMCP:
         self._evict_cache_if_needed()
 
         try:
-            async with httpx.AsyncClient(timeout=30, follow_redirects=True) as client:
-                resp = await client.get(url)
-                resp.raise_for_status()
-                with open(local_path, "wb") as f:
-                    f.write(resp.content)
-                return local_path
+            with span("http.get", kind=SPAN_KIND_CLIENT, **{"http.host": httpx.URL(url).host}) as http_span:
+                resp = await self._client.get(url, timeout=30, follow_redirects=True)
+                http_span.set_attribute("http.status_code", resp.status_code)
+                http_span.set_attribute("http.response_bytes", len(resp.content))
+            resp.raise_for_status()
+            with open(local_path, "wb") as f:
+                f.write(resp.content)
+            return local_path
         except Exception as e:
             logger.warning("download_failed url=%s error=%s", url[:60], str(e))
             return None
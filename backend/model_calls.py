@@ -0,0 +1,59 @@
+from __future__ import annotations
+"""Shared entry point for every Gemini model call.
+
+Each attempt takes a key from the key pool, then a slot from the model's
+concurrency governor, and awaits the SDK's async client. Cancelling the caller
+(a losing speculative candidate, a timeout) aborts the HTTP request itself, so
+the slot and the key are given back only once the request has stopped.
+Backoff between attempts is an async sleep taken *outside* the slot, so a
+throttled call never holds capacity while it waits. Every attempt is charged
+to the active job budget, and backoff never sleeps past the job's deadline.
+"""
+
+import asyncio
+from tenacity import AsyncRetrying, retry_if_not_exception_type, stop_after_attempt, wait_exponential
+from budget import BudgetExceeded, current_budget
+from config import config
+from key_pool import key_pool
+from model_governor import governor_for
+from tracing import span, traced_async_sleep, SPAN_KIND_CLIENT
+
+
+async def generate_content(model: str, contents: list, generation_config=None):
+    """Call ``models.generate_content`` with governance, key pooling and retries.
+
+    Raises:
+        BudgetExceeded: the job's deadline or model-call budget ran out
+    """
+    governor = governor_for(model)
+    budget = current_budget()
+
+    async def sleep(seconds: float) -> None:
+        if budget is not None:
+            seconds = min(seconds, budget.remaining_s)
+        await traced_async_sleep(seconds)
+
+    async for attempt in AsyncRetrying(
+        stop=stop_after_attempt(config.RETRY_MAX_ATTEMPTS),
+        wait=wait_exponential(
+            multiplier=config.RETRY_MULTIPLIER,
+            min=config.RETRY_MIN_WAIT,
+            max=config.RETRY_MAX_WAIT,
+        ),
+        # tenacity catches BaseException, so a cancelled call must be excluded explicitly
+        retry=retry_if_not_exception_type((BudgetExceeded, asyncio.CancelledError)),
+        sleep=sleep,
+    ):
+        with attempt:
+            if budget is not None:
+                budget.charge()
+            # Waiting for a key happens before the slot, so it never counts as model latency
+            with await key_pool.acquire_async() as lease:
+                async with governor.slot():
+                    with span("model.generate_content", kind=SPAN_KIND_CLIENT, model=model) as call_span:
+                        call_span.set_attribute("governor.limit", governor.limit)
+                        return await lease.client.aio.models.generate_content(
+                            model=model,
+                            contents=contents,
+                            config=generation_config,
+                        )
@@ -0,0 +1,141 @@
+from __future__ import annotations
+"""Adaptive per-model concurrency governor for Gemini calls.
+
+Each model gets its own governor with an AIMD concurrency limit: the limit
+grows by roughly one slot per window of fast successful calls and is cut
+multiplicatively on rate-limit errors or when latency exceeds the model's
+target. Waiting callers are served strictly FIFO, and each model has its own
+slots, so a burst of image-model calls can never starve analysis calls. Calls
+go through the SDK's async client, so a slot is held exactly as long as its
+request runs — a cancelled caller aborts the request before giving the slot back.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from config import config
+from key_pool import is_rate_limit_error
+
+logger = logging.getLogger("glowup.model_governor")
+
+
+class ModelGovernor:
+    """AIMD concurrency limiter with a fair FIFO queue for one model."""
+
+    def __init__(
+        self,
+        model: str,
+        initial_limit: int,
+        max_limit: int,
+        target_latency_s: float,
+        min_limit: int = 1,
+    ):
+        self.model = model
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency_s = target_latency_s
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._last_decrease = 0.0
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    # ── Slots ──────────────────────────────────────────────────────
+
+    async def _acquire(self) -> None:
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed to us just before cancellation — pass it on
+                self._release()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            raise
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self._in_flight += 1
+            waiter.set_result(None)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one concurrency slot for the duration of a single model call."""
+        await self._acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            if is_rate_limit_error(e):
+                self._decrease(config.GOVERNOR_RATE_LIMIT_BACKOFF, "rate_limit")
+            raise
+        else:
+            latency = time.monotonic() - started
+            if latency > self.target_latency_s:
+                self._decrease(config.GOVERNOR_LATENCY_BACKOFF, "latency")
+            else:
+                self._increase()
+        finally:
+            self._release()
+
+    # ── AIMD ───────────────────────────────────────────────────────
+
+    def _increase(self) -> None:
+        before = self.limit
+        self._limit = min(float(self.max_limit), self._limit + 1.0 / max(self._limit, 1.0))
+        if self.limit != before:
+            logger.debug("governor.increase model=%s limit=%d", self.model, self.limit)
+            self._wake()
+
+    def _decrease(self, factor: float, reason: str) -> None:
+        # A storm of 429s from calls started together counts as one congestion signal
+        now = time.monotonic()
+        if now - self._last_decrease < config.GOVERNOR_DECREASE_COOLDOWN_S:
+            return
+        self._last_decrease = now
+        self._limit = max(float(self.min_limit), self._limit * factor)
+        logger.info(
+            "governor.decrease model=%s reason=%s limit=%d in_flight=%d queued=%d",
+            self.model, reason, self.limit, self._in_flight, len(self._waiters),
+        )
+
+
+_governors: dict[str, ModelGovernor] = {}
+
+
+def governor_for(model: str) -> ModelGovernor:
+    """Return the shared governor for a model, creating it on first use."""
+    governor = _governors.get(model)
+    if governor is None:
+        settings = config.MODEL_CONCURRENCY.get(model, config.MODEL_CONCURRENCY_DEFAULT)
+        governor = ModelGovernor(model, **settings)
+        _governors[model] = governor
+    return governor
@@ -1,13 +1,18 @@
 from __future__ import annotations
 """Pipeline Orchestrator — runs the full 5-agent enhancement pipeline."""
 
+import asyncio
 import logging
-from agents.photo_scout import PhotoScoutAgent
-from agents.prompt_architect import PromptArchitectAgent
-from agents.image_enhancer import ImageEnhancerAgent
-from agents.quality_inspector import QualityInspectorAgent
-from agents.post_production import PostProductionAgent
+import posixpath
+from agents.post_production import rendition_filenames
+from agents.registry import AgentRegistry, get_agents
+from budget import BudgetExceeded, current_budget, job_budget
 from config import config
+from image_asset import ImageAsset, load_assets
+from ingest import batch_photo_id, normalize_upload, working_filename
+from mcp_servers.storage import job_key
+from retry_policy import RetryPlan, issue_type
+from tracing import span, traced
 
 logger = logging.getLogger("glowup.pipeline")
 
@@ -16,7 +21,6 @@ async def run_enhancement_pipeline(
     original_path: str,
     mode: str = "enhance",
     vibe: str | None = None,
-    output_dir: str | None = None,
     job_id: str = "demo",
     num_variations: int | None = None,
     max_retries: int | None = None,
@@ -24,40 +28,233 @@ async def run_enhancement_pipeline(
     """Run the full 5-agent enhancement pipeline.
 
     This is the Orchestrator — it coordinates all agents sequentially:
+        0. Ingest -> decodes the upload once into an oriented, right-sized working copy
         1. Photo Scout -> finds reference images from the web
         2. Prompt Architect -> writes the enhancement prompt using all inputs
         3. Image Enhancer -> generates enhanced images
         4. Quality Inspector -> evaluates each image with a SEPARATE model
+            (the first attempt of every variation is scored in one batched call)
             -> If FAIL: loops back to Prompt Architect for prompt rewrite
         5. Post-Production -> applies realism post-processing
 
     Args:
-        original_path: Path to the user's uploaded photo
+        original_path: Path to the user's raw uploaded photo (JPEG, PNG or WebP)
         mode: "enhance" (default) or "vibe"
         vibe: Optional vibe name (e.g. "coffee_shop")
-        output_dir: Where to save results (defaults to config)
         job_id: Unique job identifier
         num_variations: How many variations to generate
         max_retries: Max retry attempts per variation
 
     Returns:
-        List of file paths to the final enhanced images
+        Storage keys of the final enhanced images (listed in the job's manifest)
     """
-    output_dir = output_dir or config.OUTPUT_DIR
+    # One root span per job — every agent, MCP, HTTP and model call below nests under it
+    with (
+        span("pipeline.job", **{"job.id": job_id, "job.mode": mode, "job.vibe": vibe or ""}) as root,
+        job_budget(config.JOB_DEADLINE_S, config.JOB_MAX_MODEL_CALLS) as budget,
+    ):
+        results = await _run_pipeline(
+            original_path, mode, vibe, job_id, num_variations, max_retries
+        )
+        await _write_manifest(job_id, [job_id], [results])
+        root.set_attribute("job.images", len(results))
+        root.set_attribute("job.model_calls", budget.calls)
+        return results
+
+
+async def _run_pipeline(
+    original_path: str,
+    mode: str,
+    vibe: str | None,
+    job_id: str,
+    num_variations: int | None,
+    max_retries: int | None,
+) -> list[str]:
+    """Pipeline body, run inside the job's root span."""
     num_variations = num_variations or config.NUM_VARIATIONS
     max_retries = max_retries or config.MAX_RETRIES
 
-    # Initialize all agents
-    scout = PhotoScoutAgent()
-    architect = PromptArchitectAgent()
-    enhancer = ImageEnhancerAgent()
-    inspector = QualityInspectorAgent()
-    post_prod = PostProductionAgent()
+    # ═══ STEP 0: Ingest ═══
+    # Every agent below works on the normalized working copy, never the raw upload
+    logger.info("pipeline.step0 job=%s action=ingest", job_id)
+    # App-scoped and stateless; all job state is passed explicitly below
+    agents = get_agents()
+    original = await normalize_upload(original_path, job_id, agents.post_prod.storage)
 
     # ═══ STEP 1: Photo Scout ═══
     logger.info("pipeline.step1 job=%s action=photo_scout", job_id)
-    references = await scout.find_references(original_path, vibe=vibe)
-    photo_analysis = scout.last_analysis
+    photo_analysis = await agents.scout.analyze(original)
+    references = await load_assets(
+        await agents.scout.fetch_references(agents.scout.build_query(photo_analysis, vibe))
+    )
+    _log_scout_result(job_id, references, photo_analysis)
+
+    library_context = await agents.architect.load_library_context(
+        vibe, photo_analysis.get("style_category"), photo_analysis
+    )
+
+    results = await _enhance_photo(
+        agents, original, references, photo_analysis, library_context,
+        mode, vibe, job_id, num_variations, max_retries,
+    )
+
+    logger.info("pipeline.complete job=%s total_images=%d", job_id, len(results))
+    return results
+
+
+async def run_batch_enhancement_pipeline(
+    original_paths: list[str],
+    mode: str = "enhance",
+    vibe: str | None = None,
+    job_id: str = "demo",
+    num_variations: int | None = None,
+    max_retries: int | None = None,
+) -> list[list[str]]:
+    """Run the enhancement pipeline for several photos as one job.
+
+    Work that does not depend on the individual photo is done once for the
+    whole batch: agents (and their MCP servers) are built once, the prompt
+    library is read once per photo, and photos whose scout queries match share
+    a single reference search and download. Per-photo work — ingest, analysis, prompt
+    writing, generation and inspection — runs concurrently.
+
+    Photo ``i`` is processed under the id ``batch_photo_id(job_id, i)``, so its
+    files are named like single-photo jobs. A photo that fails yields an empty
+    list without failing the rest of the batch.
+
+    Returns:
+        One list of final image storage keys per input photo, in input order
+    """
+    with (
+        span("pipeline.batch_job", **{
+            "job.id": job_id, "job.mode": mode, "job.vibe": vibe or "", "job.photos": len(original_paths),
+        }) as root,
+        job_budget(config.JOB_DEADLINE_S, config.JOB_MAX_MODEL_CALLS * len(original_paths)) as budget,
+    ):
+        results = await _run_batch_pipeline(
+            original_paths, mode, vibe, job_id, num_variations, max_retries
+        )
+        await _write_manifest(
+            job_id, [batch_photo_id(job_id, i) for i in range(len(original_paths))], results
+        )
+        root.set_attribute("job.images", sum(len(r) for r in results))
+        root.set_attribute("job.model_calls", budget.calls)
+        return results
+
+
+async def _run_batch_pipeline(
+    original_paths: list[str],
+    mode: str,
+    vibe: str | None,
+    job_id: str,
+    num_variations: int | None,
+    max_retries: int | None,
+) -> list[list[str]]:
+    """Batch pipeline body, run inside the batch job's root span."""
+    num_variations = num_variations or config.NUM_VARIATIONS
+    max_retries = max_retries or config.MAX_RETRIES
+    photo_ids = [batch_photo_id(job_id, i) for i in range(len(original_paths))]
+
+    # ═══ STEPS 0-1: Ingest and analyze each photo (all photos at once) ═══
+    logger.info("pipeline.batch.step0 job=%s photos=%d action=ingest", job_id, len(original_paths))
+    agents = get_agents()
+
+    async def ingest_and_analyze(path: str, pid: str) -> tuple[ImageAsset, dict]:
+        photo = await normalize_upload(path, pid, agents.post_prod.storage)
+        return photo, await agents.scout.analyze(photo)
+
+    prepared = await asyncio.gather(
+        *(ingest_and_analyze(path, pid) for path, pid in zip(original_paths, photo_ids)),
+        return_exceptions=True,
+    )
+    results: list[list[str]] = [[] for _ in photo_ids]
+    # Indices of the photos that made it through ingest; a failed photo keeps []
+    ready = []
+    for i, outcome in enumerate(prepared):
+        if isinstance(outcome, BaseException):
+            logger.error(
+                "pipeline.batch.photo_failed job=%s photo=%s step=ingest error=%s",
+                job_id, photo_ids[i], str(outcome),
+            )
+        else:
+            ready.append(i)
+    originals = [prepared[i][0] for i in ready]
+    analyses = [prepared[i][1] for i in ready]
+    ready_ids = [photo_ids[i] for i in ready]
+
+    # ═══ STEP 1: Photo Scout — search once per distinct query ═══
+    logger.info("pipeline.batch.step1 job=%s action=photo_scout", job_id)
+    queries = [agents.scout.build_query(analysis, vibe) for analysis in analyses]
+    unique_queries = list(dict.fromkeys(queries))
+    pools = dict(zip(
+        unique_queries,
+        await asyncio.gather(*(_fetch_reference_assets(agents, q) for q in unique_queries)),
+    ))
+    logger.info(
+        "pipeline.batch.step1.done job=%s photos=%d searches=%d",
+        job_id, len(originals), len(unique_queries),
+    )
+    for pid, query, analysis in zip(ready_ids, queries, analyses):
+        _log_scout_result(pid, pools[query], analysis)
+
+    # Past winners are matched to each photo's own analysis
+    contexts = await asyncio.gather(
+        *(
+            agents.architect.load_library_context(vibe, analysis.get("style_category"), analysis)
+            for analysis in analyses
+        )
+    )
+
+    # ═══ STEPS 2-5 per photo, concurrently ═══
+    outcomes = await asyncio.gather(
+        *(
+            _enhance_photo(
+                agents, photo, pools[query], analysis, context,
+                mode, vibe, pid, num_variations, max_retries,
+            )
+            for photo, query, analysis, context, pid in zip(originals, queries, analyses, contexts, ready_ids)
+        ),
+        return_exceptions=True,
+    )
+
+    for i, outcome in zip(ready, outcomes):
+        if isinstance(outcome, BaseException):
+            logger.error("pipeline.batch.photo_failed job=%s photo=%s error=%s", job_id, photo_ids[i], str(outcome))
+        else:
+            results[i] = outcome
+
+    logger.info(
+        "pipeline.batch.complete job=%s photos=%d total_images=%d",
+        job_id, len(results), sum(len(r) for r in results),
+    )
+    return results
+
+
+async def _write_manifest(job_id: str, photo_ids: list[str], results: list[list[str]]) -> None:
+    """Record the job's outputs so later lookups read one small file instead of probing storage."""
+    photos = [
+        {
+            "photo_id": pid,
+            "working": working_filename(pid),
+            "images": [
+                {
+                    "image": posixpath.basename(key),
+                    "renditions": rendition_filenames(posixpath.basename(key)),
+                }
+                for key in keys
+            ],
+        }
+        for pid, keys in zip(photo_ids, results)
+    ]
+    await get_agents().post_prod.storage.write_manifest(job_id, photos)
+
+
+async def _fetch_reference_assets(agents: AgentRegistry, query: str) -> list[ImageAsset]:
+    """Search references and read each one once; photos sharing a query share the assets."""
+    return await load_assets(await agents.scout.fetch_references(query))
+
+
+def _log_scout_result(job_id: str, references: list, photo_analysis: dict):
     logger.info(
         "pipeline.step1.done job=%s refs=%d setting=%s lighting=%s",
         job_id, len(references),
@@ -65,88 +262,330 @@ async def run_enhancement_pipeline(
         photo_analysis.get("lighting", {}).get("quality", "unknown"),
     )
 
-    results = []
 
-    for i in range(num_variations):
-        logger.info("pipeline.variation job=%s variation=%d/%d", job_id, i + 1, num_variations)
-
-        # ═══ STEP 2: Prompt Architect ═══
-        logger.info("pipeline.step2 job=%s action=prompt_architect", job_id)
-        prompt = await architect.generate_prompt(
-            original_path,
-            references,
-            mode=mode,
-            vibe=vibe,
-            photo_analysis=photo_analysis,
-        )
-        logger.info("pipeline.step2.done job=%s prompt_chars=%d", job_id, len(prompt))
+@traced("pipeline.enhance_photo")
+async def _enhance_photo(
+    agents: AgentRegistry,
+    original: ImageAsset,
+    references: list[ImageAsset],
+    photo_analysis: dict,
+    library_context: dict,
+    mode: str,
+    vibe: str | None,
+    job_id: str,
+    num_variations: int,
+    max_retries: int,
+) -> list[str]:
+    """Steps 2-5 for one photo: write prompts, generate, inspect, post-process.
 
-        # ═══ STEP 3 + 4: Image Enhancer + Quality Inspector (with retries) ═══
-        enhanced_bytes = None
-        temperature = config.BASE_TEMPERATURE + (i * config.TEMPERATURE_INCREMENT)
+    The first attempt of every variation is generated concurrently and the
+    candidates are inspected in a single batched call; only variations that
+    fail go on to the per-variation retry loop. When the job budget is tight,
+    fewer variations are started. The retry policy sets the starting
+    temperature and how many retries the photo's scenario and style warrant.
+    """
+    architect = agents.architect
+    enhancer = agents.enhancer
+    post_prod = agents.post_prod
 
-        for attempt in range(max_retries + 1):
+    # Each variation's first round costs a prompt and a generation; inspection is one shared call
+    budget = current_budget()
+    if budget is not None:
+        affordable = (budget.remaining_calls - 1) // 2
+        if budget.remaining_s < config.JOB_ATTEMPT_ESTIMATE_S:
+            affordable = min(affordable, 1)
+        if affordable < 1:
+            logger.warning(
+                "pipeline.budget.exhausted job=%s calls_left=%d seconds_left=%.0f",
+                job_id, budget.remaining_calls, budget.remaining_s,
+            )
+            return []
+        if affordable < num_variations:
             logger.info(
-                "pipeline.step3 job=%s attempt=%d/%d temperature=%.2f",
-                job_id, attempt + 1, max_retries + 1, temperature,
+                "pipeline.budget.degrade job=%s action=fewer_variations variations=%d->%d",
+                job_id, num_variations, affordable,
             )
-            enhanced_bytes = await enhancer.enhance(
-                original_path,
-                prompt,
+            num_variations = affordable
+
+    # ═══ STEP 2: Prompt Architect — one prompt per variation ═══
+    logger.info("pipeline.step2 job=%s action=prompt_architect variations=%d", job_id, num_variations)
+    prompts = await asyncio.gather(
+        *(
+            architect.generate_prompt(
+                original,
                 references,
-                temperature=temperature,
+                mode=mode,
+                vibe=vibe,
+                photo_analysis=photo_analysis,
+                library_context=library_context,
             )
+            for _ in range(num_variations)
+        )
+    )
+    logger.info("pipeline.step2.done job=%s prompt_chars=%s", job_id, [len(p) for p in prompts])
 
-            if not enhanced_bytes:
-                logger.warning("pipeline.step3.empty job=%s attempt=%d", job_id, attempt + 1)
+    # ═══ STEP 3: Image Enhancer — first attempt of every variation ═══
+    plan = await agents.retry_policy.plan(vibe, photo_analysis.get("style_category"), max_retries)
+    temperatures = [
+        plan.start_temperature + (i * config.TEMPERATURE_INCREMENT) for i in range(num_variations)
+    ]
+    logger.info("pipeline.step3 job=%s attempt=1/%d variations=%d", job_id, plan.max_retries + 1, num_variations)
+    first_round = await asyncio.gather(
+        *(
+            enhancer.enhance(original, prompt, references, temperature=temperature)
+            for prompt, temperature in zip(prompts, temperatures)
+        ),
+        return_exceptions=True,
+    )
+    for i, outcome in enumerate(first_round):
+        if isinstance(outcome, BudgetExceeded):
+            logger.warning(
+                "pipeline.budget.skip_generation job=%s variation=%d reason=%s",
+                job_id, i + 1, str(outcome),
+            )
+            first_round[i] = None
+        elif isinstance(outcome, BaseException):
+            raise outcome
+
+    # ═══ STEP 4: Quality Inspector — one batched call for the first round ═══
+    generated = [i for i, image in enumerate(first_round) if image]
+    first_scores: list[dict | None] = [None] * num_variations
+    if generated:
+        logger.info("pipeline.step4 job=%s action=quality_inspector candidates=%d", job_id, len(generated))
+        try:
+            batch_scores = await agents.inspector.evaluate_batch(
+                [first_round[i] for i in generated], original
+            )
+        except BudgetExceeded as e:
+            logger.warning("pipeline.budget.skip_inspection job=%s reason=%s", job_id, str(e))
+        else:
+            for i, score in zip(generated, batch_scores):
+                first_scores[i] = score
+
+    # Variations that need retries continue independently
+    finals = await asyncio.gather(
+        *(
+            _refine_variation(
+                agents, original, references, photo_analysis, library_context,
+                vibe, job_id, i, prompts[i], temperatures[i], first_round[i], first_scores[i],
+                plan,
+            )
+            for i in range(num_variations)
+        )
+    )
+
+    results = []
+    for i, enhanced in enumerate(finals):
+        if not enhanced:
+            logger.warning("pipeline.variation.failed job=%s variation=%d", job_id, i + 1)
+            continue
+
+        # ═══ STEP 5: Post-Production ═══
+        logger.info("pipeline.step5 job=%s action=post_production variation=%d", job_id, i + 1)
+        key = await post_prod.process_and_save(
+            enhanced, job_key(f"{job_id}_enhanced_{i + 1}.jpg"), original=original
+        )
+        results.append(key)
+        logger.info("pipeline.step5.done job=%s saved=%s", job_id, key)
+
+    return results
+
+
+async def _refine_variation(
+    agents: AgentRegistry,
+    original: ImageAsset,
+    references: list[ImageAsset],
+    photo_analysis: dict,
+    library_context: dict,
+    vibe: str | None,
+    job_id: str,
+    index: int,
+    prompt: str,
+    temperature: float,
+    enhanced: ImageAsset | None,
+    score: dict | None,
+    plan: RetryPlan,
+) -> ImageAsset | None:
+    """Steps 3-4 retry loop for one variation, starting from its inspected first attempt.
+
+    Retry attempts are speculative: ``SPECULATIVE_CANDIDATES`` candidates are
+    generated at once and the first to pass inspection wins. The job budget
+    caps the candidates per attempt, skips the prompt rewrite when only a
+    generation is affordable, and stops retrying when calls or time run out.
+    The retry plan bounds the attempts and stops early when retries after
+    this kind of failure rarely pass; every inspected attempt is recorded
+    back into it.
+
+    Returns:
+        The passing image, else the best-scoring failed one, or None if
+        generation failed
+    """
+    architect = agents.architect
+    inspector = agents.inspector
+    budget = current_budget()
+    max_retries = plan.max_retries
+    best_image, best_score = None, None
+    # Failure type that led to the current attempt ("" for the first)
+    retry_issue = ""
+
+    def affords(calls: int, seconds: float = 0.0) -> bool:
+        return budget is None or budget.affords(calls, seconds)
+
+    try:
+        for attempt in range(max_retries + 1):
+            # Temperature of the image this attempt is judged by
+            used_temperature = temperature
+            if attempt > 0:
+                # A speculative candidate costs one generation and one inspection
+                if not affords(2, config.JOB_ATTEMPT_ESTIMATE_S):
+                    logger.info(
+                        "pipeline.budget.degrade job=%s variation=%d action=stop_retries attempt=%d",
+                        job_id, index + 1, attempt + 1,
+                    )
+                    break
+                candidates = config.SPECULATIVE_CANDIDATES
+                if budget is not None:
+                    candidates = max(1, min(candidates, budget.remaining_calls // 2))
+                logger.info(
+                    "pipeline.step3 job=%s variation=%d attempt=%d/%d temperature=%.2f",
+                    job_id, index + 1, attempt + 1, max_retries + 1, temperature,
+                )
+                enhanced, score, used_temperature = await _speculate(
+                    agents, original, prompt, references, temperature, candidates, job_id,
+                )
+
+            if not enhanced:
+                logger.warning("pipeline.step3.empty job=%s variation=%d attempt=%d", job_id, index + 1, attempt + 1)
                 continue
 
-            logger.info("pipeline.step3.done job=%s size_bytes=%d", job_id, len(enhanced_bytes))
+            logger.info("pipeline.step3.done job=%s size_bytes=%d", job_id, len(enhanced.data))
 
-            # --- Step 4: Quality Check ---
-            logger.info("pipeline.step4 job=%s action=quality_inspector", job_id)
-            score = await inspector.evaluate(enhanced_bytes, original_path)
+            # --- Step 4: Quality Check (already done for batched and speculative attempts) ---
+            if score is None:
+                logger.info("pipeline.step4 job=%s action=quality_inspector", job_id)
+                score = await inspector.evaluate(enhanced, original)
 
             overall = score.get("overall", 0)
             ai_risk = score.get("ai_detection_risk", 10)
             verdict = score.get("verdict", "FAIL")
             issues = score.get("issues", [])
+            plan.record(attempt, retry_issue, used_temperature, verdict == "PASS")
 
             logger.info(
-                "pipeline.step4.done job=%s overall=%s ai_risk=%s verdict=%s",
-                job_id, overall, ai_risk, verdict,
+                "pipeline.step4.done job=%s variation=%d overall=%s ai_risk=%s verdict=%s",
+                job_id, index + 1, overall, ai_risk, verdict,
             )
 
             if verdict == "PASS":
-                scenario = f"{vibe}_vibe" if vibe else "default_enhance"
-                await inspector.save_result(prompt, score, scenario)
-                logger.info("pipeline.prompt_saved job=%s scenario=%s", job_id, scenario)
-                break
+                await inspector.save_result(prompt, score, plan.scenario, photo_analysis=photo_analysis)
+                logger.info("pipeline.prompt_saved job=%s scenario=%s", job_id, plan.scenario)
+                return enhanced
+
+            if best_score is None or overall > best_score.get("overall", 0):
+                best_image, best_score = enhanced, score
 
             if issues:
                 logger.info("pipeline.step4.issues job=%s issues=%s", job_id, ", ".join(issues[:3]))
 
-            # Retry: ask Prompt Architect to fix the prompt
+            # Retry: ask Prompt Architect to fix the prompt, if history and the budget back it
             if attempt < max_retries:
+                retry_issue = issue_type(issues)
+                if not plan.allows_retry(attempt + 1, retry_issue):
+                    logger.info(
+                        "pipeline.retry_policy.stop job=%s variation=%d attempt=%d issue=%s",
+                        job_id, index + 1, attempt + 1, retry_issue,
+                    )
+                    break
+                if not affords(3):
+                    logger.info(
+                        "pipeline.budget.degrade job=%s variation=%d action=skip_rewrite",
+                        job_id, index + 1,
+                    )
+                    continue
                 logger.info("pipeline.retry job=%s attempt=%d", job_id, attempt + 1)
                 fix_inputs = score.get("fix_suggestions", []) + issues
                 prompt = await architect.fix_prompt(
-                    original_path, prompt, fix_inputs, vibe
+                    original, prompt, fix_inputs, vibe,
+                    realism_rules=library_context["realism_rules"],
                 )
                 logger.info("pipeline.retry.rewritten job=%s prompt_chars=%d", job_id, len(prompt))
+    except BudgetExceeded as e:
+        logger.warning("pipeline.budget.stop job=%s variation=%d reason=%s", job_id, index + 1, str(e))
+        if best_image is None:
+            # Out of budget before anything was scored — keep the unscored image
+            return enhanced
 
-        if not enhanced_bytes:
-            logger.warning("pipeline.variation.failed job=%s variation=%d", job_id, i + 1)
-            continue
+    if best_image is not None:
+        logger.info(
+            "pipeline.variation.best_fail job=%s variation=%d overall=%s",
+            job_id, index + 1, best_score.get("overall", 0),
+        )
+    return best_image
 
-        # ═══ STEP 5: Post-Production ═══
-        logger.info("pipeline.step5 job=%s action=post_production", job_id)
-        final_path = f"{output_dir}/{job_id}_enhanced_{i + 1}.jpg"
-        saved_path = await post_prod.process_and_save(
-            enhanced_bytes, final_path, original_path=original_path
+
+async def _speculate(
+    agents: AgentRegistry,
+    original: ImageAsset,
+    prompt: str,
+    references: list[ImageAsset],
+    temperature: float,
+    candidates: int,
+    job_id: str,
+) -> tuple[ImageAsset | None, dict | None, float]:
+    """Generate several candidates at once and inspect each as it arrives.
+
+    Candidates use temperatures stepped up from ``temperature``. The first
+    candidate to PASS is returned and the ones still in flight are cancelled,
+    which aborts their model requests; if none passes, the best-scoring FAIL is returned so its issues drive the
+    next prompt rewrite. A candidate that runs out of job budget does not
+    stop the others already in flight, but if none of them produced a
+    scored image the ``BudgetExceeded`` is raised.
+
+    Returns:
+        (image, inspector score, temperature the image was generated at), or
+        (None, None, ``temperature``) if nothing was generated
+    """
+    async def generate_and_inspect(candidate_temperature: float):
+        image = await agents.enhancer.enhance(
+            original, prompt, references, temperature=candidate_temperature
         )
-        results.append(saved_path)
-        logger.info("pipeline.step5.done job=%s saved=%s", job_id, saved_path)
+        if not image:
+            return None, None, candidate_temperature
+        return image, await agents.inspector.evaluate(image, original), candidate_temperature
 
-    logger.info("pipeline.complete job=%s total_images=%d", job_id, len(results))
-    return results
+    temperatures = [
+        temperature + j * config.SPECULATIVE_TEMPERATURE_STEP for j in range(max(1, candidates))
+    ]
+    best: tuple[ImageAsset | None, dict | None, float] = (None, None, temperature)
+    exhausted: BudgetExceeded | None = None
+    with span("pipeline.speculate", candidates=len(temperatures)) as spec_span:
+        tasks = [asyncio.create_task(generate_and_inspect(t)) for t in temperatures]
+        try:
+            for arrived, next_done in enumerate(asyncio.as_completed(tasks), start=1):
+                try:
+                    image, score, candidate_temperature = await next_done
+                except BudgetExceeded as e:
+                    exhausted = e
+                    continue
+                except Exception as e:
+                    logger.warning("pipeline.speculate.candidate_failed job=%s error=%s", job_id, str(e))
+                    continue
+                if score is None:
+                    continue
+                if score.get("verdict") == "PASS":
+                    spec_span.set_attribute("speculate.accepted_after", arrived)
+                    return image, score, candidate_temperature
+                if best[1] is None or score.get("overall", 0) > best[1].get("overall", 0):
+                    best = (image, score, candidate_temperature)
+        finally:
+            # Losers still in flight give their model slots back immediately
+            pending = [task for task in tasks if not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            if pending:
+                logger.info("pipeline.speculate.cancelled job=%s candidates=%d", job_id, len(pending))
+            spec_span.set_attribute("speculate.cancelled", len(pending))
+    if best[1] is None and exhausted is not None:
+        raise exhausted
+    return best
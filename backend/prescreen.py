@@ -0,0 +1,169 @@
+from __future__ import annotations
+"""Local pre-screen for generated images — catches obvious failures without a model call.
+
+Runs a handful of cheap NumPy checks on a downscaled copy of the generated
+image and the original: resolution relative to the original, contrast (blank or near-uniform
+output), sharpness, colour cast, and histogram + structural similarity to
+the original (the model returned the input unchanged). Any hit is a certain
+FAIL, so the Quality Inspector can skip the vision call.
+
+Aspect ratio is only a warning: image models render a fixed set of output
+aspects, so a reframed result can still be a good photo. The warning goes to
+the inspector with the score instead of rejecting the image.
+"""
+
+import logging
+import numpy as np
+from PIL import Image
+from config import config
+from image_asset import ImageAsset
+
+logger = logging.getLogger("glowup.prescreen")
+
+# Longest side of the copies the checks run on
+_ANALYSIS_SIZE = 256
+_SSIM_BLOCK = 8
+# SSIM stabilizers for 8-bit images
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+
+def _load(asset: ImageAsset) -> tuple[np.ndarray, np.ndarray, tuple[int, int]]:
+    """(RGB float array, grayscale float array, full size) at analysis size, memoized per asset."""
+    def compute():
+        rgb = np.asarray(asset.rendition(_ANALYSIS_SIZE), dtype=np.float32)
+        gray = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+        return rgb, gray, asset.size
+    return asset.derived("prescreen", compute)
+
+
+def _sharpness(gray: np.ndarray) -> float:
+    """Variance of the 4-neighbour Laplacian — low for blurry or smeared images."""
+    lap = (
+        gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:]
+        - 4.0 * gray[1:-1, 1:-1]
+    )
+    return float(lap.var())
+
+
+def _color_cast(rgb: np.ndarray) -> float:
+    """Spread of the channel means relative to overall brightness (0 = neutral)."""
+    means = rgb.reshape(-1, 3).mean(axis=0)
+    return float((means.max() - means.min()) / (means.mean() + 1e-6))
+
+
+def _histogram_correlation(a: np.ndarray, b: np.ndarray) -> float:
+    ha = np.histogram(a, bins=64, range=(0, 255))[0].astype(np.float64)
+    hb = np.histogram(b, bins=64, range=(0, 255))[0].astype(np.float64)
+    ha -= ha.mean()
+    hb -= hb.mean()
+    denom = np.sqrt((ha * ha).sum() * (hb * hb).sum())
+    return float((ha * hb).sum() / denom) if denom else 1.0
+
+
+def _block_ssim(a: np.ndarray, b: np.ndarray) -> float:
+    """Mean SSIM over non-overlapping blocks of two same-sized grayscale arrays."""
+    h = (a.shape[0] // _SSIM_BLOCK) * _SSIM_BLOCK
+    w = (a.shape[1] // _SSIM_BLOCK) * _SSIM_BLOCK
+    shape = (h // _SSIM_BLOCK, _SSIM_BLOCK, w // _SSIM_BLOCK, _SSIM_BLOCK)
+    a = a[:h, :w].reshape(shape)
+    b = b[:h, :w].reshape(shape)
+    mu_a = a.mean(axis=(1, 3))
+    mu_b = b.mean(axis=(1, 3))
+    var_a = a.var(axis=(1, 3))
+    var_b = b.var(axis=(1, 3))
+    cov = (a * b).mean(axis=(1, 3)) - mu_a * mu_b
+    ssim = ((2 * mu_a * mu_b + _C1) * (2 * cov + _C2)) / (
+        (mu_a ** 2 + mu_b ** 2 + _C1) * (var_a + var_b + _C2)
+    )
+    return float(ssim.mean())
+
+
+def prescreen(
+    generated: ImageAsset, original: ImageAsset
+) -> tuple[list[tuple[str, str]], list[tuple[str, str]]]:
+    """Run the local checks on a generated image.
+
+    Blocking (may decode the generated image) — call via ``asyncio.to_thread``.
+    The original's analysis arrays are memoized on its asset, so they are
+    computed once per job.
+
+    Returns:
+        (failures, warnings), each a list of (issue, fix suggestion) pairs;
+        failures is empty if nothing is obviously wrong
+    """
+    try:
+        gen_rgb, gen_gray, gen_size = _load(generated)
+    except Exception as e:
+        return [(
+            f"Generated image could not be decoded ({type(e).__name__})",
+            "Return a single complete photo",
+        )], []
+    orig_rgb, orig_gray, orig_size = _load(original)
+
+    failures: list[tuple[str, str]] = []
+    warnings: list[tuple[str, str]] = []
+
+    if min(gen_size) < config.PRESCREEN_MIN_SIDE_RATIO * min(orig_size):
+        failures.append((
+            f"Output resolution too low ({gen_size[0]}x{gen_size[1]} "
+            f"from a {orig_size[0]}x{orig_size[1]} original)",
+            "Generate a full-resolution photo",
+        ))
+
+    gen_aspect = gen_size[0] / gen_size[1]
+    orig_aspect = orig_size[0] / orig_size[1]
+    if abs(gen_aspect - orig_aspect) / orig_aspect > config.PRESCREEN_MAX_ASPECT_DRIFT:
+        warnings.append((
+            f"Aspect ratio {gen_aspect:.2f} does not match the original {orig_aspect:.2f}",
+            "Keep the original photo's framing and aspect ratio",
+        ))
+
+    contrast = float(gen_gray.std())
+    if contrast < config.PRESCREEN_MIN_CONTRAST:
+        failures.append((
+            "Output is blank or nearly a single flat colour",
+            "Render a complete, detailed scene with the person clearly visible",
+        ))
+    else:
+        sharpness = _sharpness(gen_gray)
+        if (
+            sharpness < config.PRESCREEN_MIN_SHARPNESS
+            and sharpness < config.PRESCREEN_SHARPNESS_RATIO * _sharpness(orig_gray)
+        ):
+            failures.append((
+                "Output is heavily blurred or smeared",
+                "Keep the subject in sharp focus with natural fine detail",
+            ))
+
+    cast = _color_cast(gen_rgb)
+    if (
+        cast > config.PRESCREEN_MAX_COLOR_CAST
+        and cast > _color_cast(orig_rgb) + config.PRESCREEN_COLOR_CAST_MARGIN
+    ):
+        failures.append((
+            "Strong colour cast across the whole image",
+            "Use natural, balanced colour with only a subtle warm grade",
+        ))
+
+    if not failures:
+        # Compare at a common size
+        shape = (orig_gray.shape[1], orig_gray.shape[0])
+        gen_cmp = np.asarray(
+            Image.fromarray(gen_gray.astype(np.uint8)).resize(shape, Image.BILINEAR),
+            dtype=np.float32,
+        )
+        if (
+            _histogram_correlation(gen_cmp, orig_gray) >= config.PRESCREEN_IDENTICAL_HISTOGRAM
+            and _block_ssim(gen_cmp, orig_gray) >= config.PRESCREEN_IDENTICAL_SSIM
+        ):
+            failures.append((
+                "Output is nearly identical to the original — no visible enhancement",
+                "Make the lighting, composition and quality improvements clearly visible",
+            ))
+
+    if failures:
+        logger.info("prescreen.reject issues=%s", "; ".join(issue for issue, _ in failures))
+    elif warnings:
+        logger.info("prescreen.warn issues=%s", "; ".join(issue for issue, _ in warnings))
+    return failures, warnings
@@ -0,0 +1,96 @@
+from __future__ import annotations
+"""Prompt assembly engine — static prompt text is compiled once, per call only fields are filled in.
+
+A ``PromptTemplate`` is an ordered list of ``PromptSection``s. Each section's
+text is dedented and split into literal chunks and field names when the module
+is imported, so rendering is a single join. Optional sections carry a
+priority: when a rendered prompt exceeds its byte budget, the lowest-priority
+sections are dropped first, and an optional section whose fields are all
+empty is left out entirely.
+"""
+
+import logging
+import textwrap
+from string import Formatter
+
+logger = logging.getLogger("glowup.prompt_templates")
+
+
+class PromptSection:
+    """One block of prompt text with ``{field}`` placeholders."""
+
+    __slots__ = ("name", "priority", "required", "_parts", "_fields", "_static")
+
+    def __init__(self, name: str, template: str, priority: int = 0, required: bool = False):
+        self.name = name
+        self.priority = priority
+        self.required = required
+        text = textwrap.dedent(template).strip()
+        parts: list[tuple[bool, str]] = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if literal:
+                parts.append((True, literal))
+            if field is not None:
+                if not field or spec or conversion:
+                    raise ValueError(f"section {name!r}: only plain {{field}} placeholders are supported")
+                parts.append((False, field))
+        self._parts = tuple(parts)
+        self._fields = frozenset(value for is_literal, value in parts if not is_literal)
+        # Sections without fields are rendered once, here
+        self._static = "".join(value for _, value in parts) if not self._fields else None
+
+    @property
+    def fields(self) -> frozenset[str]:
+        return self._fields
+
+    def render(self, values: dict) -> str:
+        if self._static is not None:
+            return self._static
+        # An optional section with nothing to say is omitted
+        if not self.required and not any(values.get(field) for field in self._fields):
+            return ""
+        return "".join(
+            value if is_literal else str(values.get(value) or "")
+            for is_literal, value in self._parts
+        )
+
+
+class PromptTemplate:
+    """Ordered sections rendered into one prompt under an optional byte budget."""
+
+    def __init__(self, name: str, *sections: PromptSection, separator: str = "\n\n"):
+        self.name = name
+        self.sections = sections
+        self.separator = separator
+        self.fields = frozenset().union(*(section.fields for section in sections))
+
+    def render(self, max_bytes: int | None = None, **values) -> str:
+        """Fill in ``values`` and join the sections, trimming to ``max_bytes`` (UTF-8).
+
+        Required sections are always kept, so the result can still exceed
+        the budget if they alone do.
+        """
+        rendered = [(section, section.render(values)) for section in self.sections]
+        rendered = [(section, text) for section, text in rendered if text]
+        sizes = {section.name: len(text.encode("utf-8")) for section, text in rendered}
+        sep = len(self.separator.encode("utf-8"))
+        total = sum(sizes.values()) + sep * max(0, len(rendered) - 1)
+
+        if max_bytes and total > max_bytes:
+            before = total
+            dropped = []
+            for section, _ in sorted(
+                (item for item in rendered if not item[0].required),
+                key=lambda item: item[0].priority,
+            ):
+                if total <= max_bytes:
+                    break
+                dropped.append(section.name)
+                total -= sizes[section.name] + sep
+            rendered = [(section, text) for section, text in rendered if section.name not in dropped]
+            logger.info(
+                "prompt_template.trimmed template=%s dropped=%s bytes=%d->%d budget=%d",
+                self.name, ",".join(dropped), before, total, max_bytes,
+            )
+
+        return self.separator.join(text for _, text in rendered)
@@ -0,0 +1,321 @@
+from __future__ import annotations
+"""Output retention — expires old job files so OUTPUT_DIR and the bucket stop growing forever.
+
+A background sweep runs every RETENTION_INTERVAL_S. Stored files are grouped
+by the job they belong to (each job has its own directory holding the raw
+upload, working copy, variations, renditions and manifest); each
+reference-cache file and each remote content blob is a group of its own. A
+group is deleted once its newest file is older than RETENTION_MAX_AGE_S. If
+the outputs are still over RETENTION_MAX_BYTES after that, the oldest groups
+go next. A job is removed as a whole directory.
+
+A sweep costs O(jobs), not O(files): job directories are found by listing
+the shard level of ``jobs/``, and a finished job's age and size come from its
+``manifest.json`` (``created`` and ``bytes``). Only a job without a manifest
+(still running, or interrupted) has its directory listed. The quota counts
+each job's logical bytes, so content shared by several jobs counts once per
+job. The content blobs under ``_cas/`` are walked only to find orphans.
+
+Jobs that are still running are never touched. Finished jobs whose results
+the server still holds are skipped by the quota pass, but they still expire
+by age. Local content blobs are hard-linked by every key that holds their
+bytes, so they are collected once no key links to them any more.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from config import config
+from mcp_servers.object_store import LocalObjectStore, ObjectInfo, ObjectStore, get_object_store
+from mcp_servers.storage import CAS_PREFIX, JOBS_PREFIX, MANIFEST_NAME, job_id_of, job_prefix
+from tracing import span
+
+logger = logging.getLogger("glowup.retention")
+
+# Written by the web search server straight into OUTPUT_DIR
+REF_CACHE_PREFIX = "_ref_cache/"
+
+# Returns (ids of running jobs, ids of finished jobs whose results are still served)
+JobPins = Callable[[], tuple[set[str], set[str]]]
+
+
+@dataclass
+class _Group:
+    """Files that are kept or deleted together."""
+
+    job_id: str | None
+    # Job directories, one per store that has one: (store, files, bytes)
+    dirs: list[tuple[ObjectStore, int, float]] = field(default_factory=list)
+    # Files deleted one at a time (reference cache, pre-shard outputs, blobs)
+    entries: list[tuple[ObjectStore, ObjectInfo]] = field(default_factory=list)
+    newest: float = 0.0
+    # Hard-linked files count their share of the bytes, so usage is not double counted
+    bytes: float = 0.0
+
+    def add(self, store: ObjectStore, info: ObjectInfo) -> None:
+        self.entries.append((store, info))
+        self.newest = max(self.newest, info.modified)
+        self.bytes += info.size / (info.links or 1)
+
+    def add_dir(self, store: ObjectStore, newest: float, files: int, size: float) -> None:
+        self.dirs.append((store, files, size))
+        self.newest = max(self.newest, newest)
+        self.bytes += size
+
+
+@dataclass
+class SweepReport:
+    files_deleted: int = 0
+    bytes_reclaimed: int = 0
+    expired_groups: int = 0
+    evicted_groups: int = 0
+    orphan_blobs: int = 0
+    usage_bytes: int = 0
+    jobs_scanned: int = 0
+    duration_ms: int = 0
+    expired_jobs: list[str] = field(default_factory=list)
+
+
+class _Totals:
+    def __init__(self):
+        self.sweeps = 0
+        self.failures = 0
+        self.files_deleted = 0
+        self.bytes_reclaimed = 0
+        self.last: SweepReport | None = None
+        self.last_sweep_at: float | None = None
+
+
+_totals = _Totals()
+
+
+def _stores() -> list[ObjectStore]:
+    store = get_object_store()
+    if isinstance(store, LocalObjectStore):
+        return [store]
+    # With a remote backend, raw uploads and the reference cache still land on local disk
+    return [store, LocalObjectStore(config.OUTPUT_DIR)]
+
+
+async def _job_summary(store: ObjectStore, prefix: str) -> tuple[float, int, float] | None:
+    """(newest, files, bytes) of a job directory; None if it is empty."""
+    try:
+        data = await store.get(prefix + MANIFEST_NAME)
+        manifest = json.loads(data)
+        return float(manifest["created"]), len(manifest["assets"]) + 1, manifest["bytes"] + len(data)
+    except (FileNotFoundError, ValueError, KeyError, TypeError):
+        pass
+    # No usable manifest: the job is still running or never finished
+    infos = await store.list(prefix)
+    if not infos:
+        return None
+    return (
+        max(info.modified for info in infos),
+        len(infos),
+        sum(info.size / (info.links or 1) for info in infos),
+    )
+
+
+async def _scan_jobs(
+    store: ObjectStore, live: set[str], semaphore: asyncio.Semaphore
+) -> list[tuple[str, float, int, float]]:
+    """(job id, newest, files, bytes) of every job directory in the store that is not running."""
+    async def list_shard(shard: str) -> list[str]:
+        async with semaphore:
+            return (await store.list_dir(shard))[1]
+
+    async def summarize(prefix: str):
+        async with semaphore:
+            return prefix, await _job_summary(store, prefix)
+
+    _, shards = await store.list_dir(JOBS_PREFIX)
+    prefixes = [
+        prefix
+        for job_dirs in await asyncio.gather(*(list_shard(shard) for shard in shards))
+        for prefix in job_dirs
+        if job_id_of(prefix + MANIFEST_NAME) not in live
+    ]
+    jobs = []
+    for prefix, summary in await asyncio.gather(*(summarize(prefix) for prefix in prefixes)):
+        if summary is not None:
+            jobs.append((job_id_of(prefix + MANIFEST_NAME), *summary))
+    return jobs
+
+
+async def _delete_group(group: _Group) -> tuple[int, int]:
+    """Delete a group's files in every store. Returns (files, bytes) reclaimed."""
+    files = 0
+    size = 0.0
+    for store, dir_files, dir_bytes in group.dirs:
+        try:
+            await store.delete_prefix(job_prefix(group.job_id))
+            files += dir_files
+            size += dir_bytes
+        except Exception as e:
+            logger.warning("retention.delete_failed job=%s error=%s", group.job_id, str(e))
+    for store, info in group.entries:
+        try:
+            await store.delete(info.key)
+            files += 1
+            size += info.size / (info.links or 1)
+        except Exception as e:
+            logger.warning("retention.delete_failed key=%s error=%s", info.key, str(e))
+    return files, int(size)
+
+
+async def _delete(groups: list[_Group]) -> tuple[int, int]:
+    """Delete the groups, a bounded number at a time. Returns (files, bytes) reclaimed."""
+    semaphore = asyncio.Semaphore(config.RETENTION_DELETE_CONCURRENCY)
+
+    async def delete(group: _Group) -> tuple[int, int]:
+        async with semaphore:
+            return await _delete_group(group)
+
+    results = await asyncio.gather(*(delete(group) for group in groups))
+    return sum(files for files, _ in results), sum(size for _, size in results)
+
+
+async def sweep(pins: JobPins | None = None) -> SweepReport:
+    """Run one retention pass over every store and delete what has expired."""
+    started = time.perf_counter()
+    now = time.time()
+    live, cached = pins() if pins else (set(), set())
+    report = SweepReport()
+    semaphore = asyncio.Semaphore(config.RETENTION_SCAN_CONCURRENCY)
+
+    with span("retention.sweep") as sweep_span:
+        groups: dict[str, _Group] = {}
+        orphans: list[_Group] = []
+
+        def group_for(job_id: str | None, key: str) -> _Group:
+            return groups.setdefault(job_id or key, _Group(job_id))
+
+        for store in _stores():
+            for job_id, newest, files, size in await _scan_jobs(store, live, semaphore):
+                group_for(job_id, job_id).add_dir(store, newest, files, size)
+                report.jobs_scanned += 1
+
+            # Files from before the sharded layout sit at the top level
+            top_level, _ = await store.list_dir()
+            for info in top_level:
+                job_id = job_id_of(info.key)
+                if job_id not in live:
+                    group_for(job_id, info.key).add(store, info)
+
+            for info in await store.list(REF_CACHE_PREFIX):
+                group_for(None, info.key).add(store, info)
+
+            for info in await store.list(CAS_PREFIX):
+                if info.links is None:
+                    # No links on this backend: blobs left from before it stopped using them
+                    group_for(None, info.key).add(store, info)
+                elif info.links <= 1 and now - info.modified > config.RETENTION_ORPHAN_GRACE_S:
+                    # Only the blob itself links to these bytes: nothing references it
+                    orphan = _Group(None)
+                    orphan.add(store, info)
+                    orphans.append(orphan)
+
+        usage = sum(group.bytes for group in groups.values())
+        doomed: list[_Group] = []
+        for group in groups.values():
+            if now - group.newest > config.RETENTION_MAX_AGE_S:
+                doomed.append(group)
+                report.expired_groups += 1
+                usage -= group.bytes
+
+        if config.RETENTION_MAX_BYTES and usage > config.RETENTION_MAX_BYTES:
+            expired = {id(group) for group in doomed}
+            candidates = sorted(
+                (
+                    group for group in groups.values()
+                    if id(group) not in expired
+                    and group.job_id not in cached
+                    and now - group.newest > config.RETENTION_MIN_AGE_S
+                ),
+                key=lambda group: group.newest,
+            )
+            for group in candidates:
+                if usage <= config.RETENTION_MAX_BYTES:
+                    break
+                doomed.append(group)
+                report.evicted_groups += 1
+                usage -= group.bytes
+            if usage > config.RETENTION_MAX_BYTES:
+                logger.warning(
+                    "retention.over_quota usage_bytes=%d quota_bytes=%d",
+                    int(usage), config.RETENTION_MAX_BYTES,
+                )
+
+        report.files_deleted, report.bytes_reclaimed = await _delete(doomed + orphans)
+        report.orphan_blobs = len(orphans)
+        report.expired_jobs = sorted({group.job_id for group in doomed if group.job_id})
+        report.usage_bytes = max(0, int(usage))
+        report.duration_ms = int((time.perf_counter() - started) * 1000)
+
+        sweep_span.set_attribute("retention.jobs_scanned", report.jobs_scanned)
+        sweep_span.set_attribute("retention.files_deleted", report.files_deleted)
+        sweep_span.set_attribute("retention.bytes_reclaimed", report.bytes_reclaimed)
+        sweep_span.set_attribute("retention.usage_bytes", report.usage_bytes)
+
+    _totals.sweeps += 1
+    _totals.files_deleted += report.files_deleted
+    _totals.bytes_reclaimed += report.bytes_reclaimed
+    _totals.last = report
+    _totals.last_sweep_at = now
+    logger.info(
+        "retention.sweep jobs=%d files=%d reclaimed_bytes=%d expired=%d evicted=%d orphans=%d "
+        "usage_bytes=%d duration_ms=%d",
+        report.jobs_scanned, report.files_deleted, report.bytes_reclaimed, report.expired_groups,
+        report.evicted_groups, report.orphan_blobs, report.usage_bytes, report.duration_ms,
+    )
+    return report
+
+
+async def run_retention(
+    pins: JobPins | None = None,
+    on_expired: Callable[[list[str]], None] | None = None,
+) -> None:
+    """Sweep every RETENTION_INTERVAL_S until cancelled.
+
+    ``on_expired`` receives the ids of jobs whose files were deleted, so the
+    server can drop their records.
+    """
+    while True:
+        try:
+            report = await sweep(pins)
+            if on_expired and report.expired_jobs:
+                on_expired(report.expired_jobs)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _totals.failures += 1
+            logger.error("retention.failed error=%s", str(e))
+        await asyncio.sleep(config.RETENTION_INTERVAL_S)
+
+
+def stats() -> dict:
+    """Running totals and the last sweep, for the storage endpoint."""
+    last = _totals.last
+    return {
+        "enabled": config.RETENTION_ENABLED,
+        "max_age_s": config.RETENTION_MAX_AGE_S,
+        "quota_bytes": config.RETENTION_MAX_BYTES,
+        "sweeps": _totals.sweeps,
+        "failures": _totals.failures,
+        "files_deleted": _totals.files_deleted,
+        "bytes_reclaimed": _totals.bytes_reclaimed,
+        "usage_bytes": last.usage_bytes if last else None,
+        "last_sweep_at": _totals.last_sweep_at,
+        "last_sweep": {
+            "files_deleted": last.files_deleted,
+            "bytes_reclaimed": last.bytes_reclaimed,
+            "expired": last.expired_groups,
+            "evicted": last.evicted_groups,
+            "jobs_scanned": last.jobs_scanned,
+            "orphan_blobs": last.orphan_blobs,
+            "duration_ms": last.duration_ms,
+        } if last else None,
+    }
@@ -0,0 +1,197 @@
+from __future__ import annotations
+"""Learned retry policy — spends enhancer and inspector calls where history says they pay off.
+
+Every inspected attempt is counted in the prompt library by scenario, photo
+style, attempt number, the issue type of the failure that led to it, and
+temperature. Each photo then gets a ``RetryPlan`` drawn from those counts:
+
+- retry budget: retries stop at the first attempt number whose pass rate is
+  below RETRY_POLICY_MIN_PASS_RATE;
+- starting temperature: the first-attempt temperature that passes most often;
+- early stop: before each rewrite, if retries after this issue type rarely pass
+  at this point, the variation keeps its best result instead.
+
+A count is trusted only after RETRY_POLICY_MIN_SAMPLES trials. Below that, the
+counts for the whole scenario are used instead of the scenario and style, and
+without enough data either way the configured defaults apply. A share of
+photos (RETRY_POLICY_EXPLORE_RATE) keeps the full retry budget so that retries
+the policy skips are still measured.
+"""
+
+import asyncio
+import logging
+import random
+from collections import OrderedDict
+from config import config
+from mcp_servers.prompt_library import (
+    AttemptOutcome,
+    PromptLibraryMCP,
+    normalize_scenario,
+    scenario_for,
+)
+
+logger = logging.getLogger("glowup.retry_policy")
+
+# Issue type -> phrases seen in inspector and pre-screen issues; first match wins
+_ISSUE_TYPES = (
+    ("unchanged", ("identical", "no visible enhancement", "unchanged")),
+    ("blank", ("blank", "flat colour", "flat color")),
+    ("identity", ("identity", "likeness", "different person", "face shape", "facial features")),
+    ("skin", ("skin", "plastic", "waxy", "airbrush", "pores")),
+    ("artifacts", ("artifact", "distort", "warp", "hand", "finger", "blur", "smear")),
+    ("lighting", ("light", "shadow", "exposure", "contrast")),
+    ("color", ("colour", "color", "cast", "saturat")),
+    ("framing", ("aspect", "framing", "crop", "resolution", "composition")),
+)
+
+
+def issue_type(issues: list[str]) -> str:
+    """Coarse type of a failed attempt, from its first recognizable issue."""
+    for issue in issues:
+        text = issue.lower()
+        for name, phrases in _ISSUE_TYPES:
+            if any(phrase in text for phrase in phrases):
+                return name
+    return "other"
+
+
+def _bucket(temperature: float) -> float:
+    step = config.RETRY_POLICY_TEMPERATURE_BUCKET
+    return round(round(temperature / step) * step, 2)
+
+
+class _ScenarioStats:
+    """In-memory attempt counts for one scenario, kept in step with what is recorded."""
+
+    def __init__(self, rows: list[dict]):
+        # (style, attempt, issue, temperature) -> [trials, passes]
+        self.cells: dict[tuple, list[int]] = {
+            (row["style"], row["attempt"], row["issue"], row["temperature"]): [row["trials"], row["passes"]]
+            for row in rows
+        }
+
+    def add(self, style: str, attempt: int, issue: str, temperature: float, passed: bool) -> None:
+        cell = self.cells.setdefault((style, attempt, issue, temperature), [0, 0])
+        cell[0] += 1
+        cell[1] += int(passed)
+
+    def _count(self, style, attempt, issue, temperature) -> tuple[int, int]:
+        trials = passes = 0
+        for (s, a, i, t), (n, p) in self.cells.items():
+            if (
+                (style is None or s == style)
+                and (attempt is None or a == attempt)
+                and (issue is None or i == issue)
+                and (temperature is None or t == temperature)
+            ):
+                trials += n
+                passes += p
+        return trials, passes
+
+    def pass_rate(
+        self, style: str, attempt: int | None = None, issue: str | None = None, temperature: float | None = None
+    ) -> float | None:
+        """Smoothed pass rate for the style, else the whole scenario; None without enough trials."""
+        for scope in (style, None):
+            trials, passes = self._count(scope, attempt, issue, temperature)
+            if trials >= config.RETRY_POLICY_MIN_SAMPLES:
+                return (passes + 1) / (trials + 2)
+        return None
+
+    def temperatures(self, attempt: int) -> set[float]:
+        return {t for (_, a, _, t) in self.cells if a == attempt}
+
+
+class RetryPlan:
+    """Retry decisions for one photo, and the sink for its attempt outcomes."""
+
+    def __init__(
+        self,
+        scenario: str,
+        style: str,
+        max_retries: int,
+        start_temperature: float,
+        explore: bool = False,
+        stats: _ScenarioStats | None = None,
+        library: PromptLibraryMCP | None = None,
+    ):
+        self.scenario = scenario
+        self.style = style
+        self.max_retries = max_retries
+        self.start_temperature = start_temperature
+        self.explore = explore
+        self._stats = stats
+        self._library = library
+
+    def allows_retry(self, attempt: int, issue: str) -> bool:
+        """Whether retry number ``attempt`` after a failure of type ``issue`` is worth its calls."""
+        if self._stats is None or self.explore:
+            return True
+        rate = self._stats.pass_rate(self.style, attempt=attempt, issue=issue)
+        return rate is None or rate >= config.RETRY_POLICY_MIN_PASS_RATE
+
+    def record(self, attempt: int, issue: str, temperature: float, passed: bool) -> None:
+        """Count an inspected attempt (``issue`` is the failure type that led to it, "" for the first)."""
+        if self._stats is None:
+            return
+        temperature = _bucket(temperature)
+        self._stats.add(self.style, attempt, issue, temperature, passed)
+        self._library.record_attempt(
+            AttemptOutcome(self.scenario, self.style, attempt, issue, temperature, passed)
+        )
+
+
+class RetryPolicy:
+    """Builds ``RetryPlan``s from the attempt counts in the prompt library."""
+
+    def __init__(self, library: PromptLibraryMCP | None = None):
+        self.library = library or PromptLibraryMCP()
+        # scenario -> counts, in LRU order
+        self._stats: OrderedDict[str, _ScenarioStats] = OrderedDict()
+        self._lock = asyncio.Lock()
+
+    async def _scenario_stats(self, scenario: str) -> _ScenarioStats:
+        async with self._lock:
+            stats = self._stats.get(scenario)
+            if stats is None:
+                stats = _ScenarioStats(await self.library.get_attempt_stats(scenario))
+                self._stats[scenario] = stats
+                while len(self._stats) > config.RETRY_POLICY_CACHE_SCENARIOS:
+                    self._stats.popitem(last=False)
+            else:
+                self._stats.move_to_end(scenario)
+            return stats
+
+    async def plan(self, vibe: str | None, style: str | None, max_retries: int) -> RetryPlan:
+        """Retry budget and starting temperature for a photo of this vibe and style."""
+        scenario = scenario_for(vibe, style)
+        style_key = normalize_scenario(style or "")
+        if not config.RETRY_POLICY_ENABLED:
+            return RetryPlan(scenario, style_key, max_retries, config.BASE_TEMPERATURE)
+
+        stats = await self._scenario_stats(scenario)
+        explore = random.random() < config.RETRY_POLICY_EXPLORE_RATE
+
+        # Best first-attempt temperature, once at least two have enough trials to compare
+        rated = {
+            t: rate
+            for t in stats.temperatures(0)
+            if (rate := stats.pass_rate(style_key, attempt=0, temperature=t)) is not None
+        }
+        start_temperature = max(rated, key=rated.get) if len(rated) > 1 else config.BASE_TEMPERATURE
+
+        allowed = max_retries
+        if not explore:
+            for attempt in range(1, max_retries + 1):
+                rate = stats.pass_rate(style_key, attempt=attempt)
+                if rate is not None and rate < config.RETRY_POLICY_MIN_PASS_RATE:
+                    allowed = attempt - 1
+                    break
+
+        logger.info(
+            "retry_policy.plan scenario=%s style=%s retries=%d/%d temperature=%.2f explore=%s",
+            scenario, style_key or "-", allowed, max_retries, start_temperature, explore,
+        )
+        return RetryPlan(
+            scenario, style_key, allowed, start_temperature, explore, stats, self.library
+        )
@@ -0,0 +1,83 @@
+"""Strong ETags, conditional GET and byte ranges for immutable files."""
+
+import hashlib
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from http_cache import IMMUTABLE_CACHE_CONTROL, cached_file_response
+
+_DATA = bytes(range(256)) * 1024
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "photo.jpg"
+    path.write_bytes(_DATA)
+    app = FastAPI()
+
+    @app.get("/file")
+    async def serve(request: Request):
+        return await cached_file_response(request, str(path))
+
+    return TestClient(app)
+
+
+def test_full_response_carries_a_content_etag(client):
+    response = client.get("/file")
+    assert response.status_code == 200
+    assert response.content == _DATA
+    assert response.headers["etag"] == f'"{hashlib.sha256(_DATA).hexdigest()[:32]}"'
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-type"] == "image/jpeg"
+
+
+def test_matching_etag_is_not_modified(client):
+    etag = client.get("/file").headers["etag"]
+    response = client.get("/file", headers={"If-None-Match": f'"other", {etag}'})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    assert client.get("/file", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+@pytest.mark.parametrize(
+    ("header", "start", "end"),
+    [
+        ("bytes=0-99", 0, 99),
+        ("bytes=200000-", 200000, len(_DATA) - 1),
+        ("bytes=-10", len(_DATA) - 10, len(_DATA) - 1),
+        ("bytes=100-999999999", 100, len(_DATA) - 1),
+    ],
+)
+def test_single_range_is_partial_content(client, header, start, end):
+    response = client.get("/file", headers={"Range": header})
+    assert response.status_code == 206
+    assert response.content == _DATA[start:end + 1]
+    assert response.headers["content-range"] == f"bytes {start}-{end}/{len(_DATA)}"
+    assert response.headers["content-length"] == str(end - start + 1)
+
+
+@pytest.mark.parametrize("header", [f"bytes={len(_DATA)}-", "bytes=50-10", "bytes=-0"])
+def test_unsatisfiable_range(client, header):
+    response = client.get("/file", headers={"Range": header})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(_DATA)}"
+
+
+def test_multi_range_and_stale_if_range_serve_the_whole_file(client):
+    response = client.get("/file", headers={"Range": "bytes=0-1,5-6"})
+    assert response.status_code == 200
+    assert response.content == _DATA
+
+    response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert len(response.content) == len(_DATA)
+
+    etag = response.headers["etag"]
+    response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": etag})
+    assert response.status_code == 206
+    assert response.content == _DATA[:10]
@@ -0,0 +1,47 @@
+"""Model responses that cannot be parsed fall back instead of raising."""
+
+import asyncio
+import io
+from types import SimpleNamespace
+
+from PIL import Image
+
+from image_asset import ImageAsset
+from mcp_servers.image_analysis import ImageAnalysisMCP
+
+
+def _asset() -> ImageAsset:
+    buf = io.BytesIO()
+    Image.new("RGB", (32, 32), (90, 120, 150)).save(buf, format="PNG")
+    return ImageAsset(buf.getvalue())
+
+
+class _Scripted(ImageAnalysisMCP):
+    """Answers each model call with the next scripted response text."""
+
+    def __init__(self, texts):
+        self.texts = list(texts)
+        self.calls = 0
+
+    async def _call_api(self, model, contents):
+        self.calls += 1
+        return SimpleNamespace(text=self.texts.pop(0))
+
+
+def test_empty_analysis_response_uses_the_default_analysis():
+    analysis = asyncio.run(_Scripted([None]).analyze_photo(_asset()))
+    assert analysis["style_category"] == "casual_iphone"
+
+
+def test_empty_comparison_response_is_a_fail():
+    score = asyncio.run(_Scripted([None]).compare_photos(_asset(), _asset()))
+    assert score["verdict"] == "FAIL"
+    assert score["overall"] == 0
+
+
+def test_empty_batch_response_falls_back_to_single_comparisons():
+    good = '```json\n{"overall": 8, "verdict": "PASS"}\n```'
+    analysis = _Scripted([None, good, good])
+    scores = asyncio.run(analysis.compare_photos_batch(_asset(), [_asset(), _asset()]))
+    assert [s["overall"] for s in scores] == [8, 8]
+    assert analysis.calls == 3
@@ -0,0 +1,60 @@
+"""Upload ingest: format sniffing and the oriented, downscaled working copy."""
+
+import asyncio
+import io
+
+from PIL import Image
+
+from ingest import detect_image_format, normalize_upload, working_filename
+from mcp_servers.object_store import LocalObjectStore
+from mcp_servers.storage import StorageMCP, job_key
+
+_ORIENTATION = 0x0112
+
+
+def _sideways_jpeg(path) -> None:
+    """A 400x200 JPEG whose EXIF says "rotate 90° clockwise to display"."""
+    image = Image.new("RGB", (400, 200), (200, 40, 40))
+    # Mark the top edge so the rotation direction is checkable
+    image.paste((40, 40, 200), (0, 0, 400, 20))
+    exif = Image.Exif()
+    exif[_ORIENTATION] = 6
+    image.save(path, format="JPEG", exif=exif.tobytes(), quality=95)
+
+
+def test_detect_image_format():
+    assert detect_image_format(b"\xff\xd8\xff\xe0rest") == "jpeg"
+    assert detect_image_format(b"\x89PNG\r\n\x1a\n") == "png"
+    assert detect_image_format(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "webp"
+    assert detect_image_format(b"GIF89a") is None
+
+
+def test_working_copy_is_upright_and_downscaled(tmp_path):
+    raw = tmp_path / "raw.jpg"
+    _sideways_jpeg(raw)
+    storage = StorageMCP(LocalObjectStore(str(tmp_path / "out")))
+
+    asset = asyncio.run(normalize_upload(str(raw), "job1", storage, max_dimension=100))
+
+    assert asset.size == (50, 100)
+    stored = Image.open(io.BytesIO(asyncio.run(storage.load(job_key(working_filename("job1"))))))
+    assert stored.format == "JPEG"
+    assert stored.size == (50, 100)
+    # The orientation is baked into the pixels, not left in the metadata
+    assert stored.getexif().get(_ORIENTATION) in (None, 1)
+    # Rotated clockwise, the marked top edge ends up on the right
+    right = stored.getpixel((47, 50))
+    left = stored.getpixel((2, 50))
+    assert right[2] > right[0] and left[0] > left[2]
+
+
+def test_png_with_alpha_becomes_an_rgb_jpeg(tmp_path):
+    raw = tmp_path / "raw.png"
+    Image.new("RGBA", (64, 48), (10, 200, 10, 128)).save(raw)
+    storage = StorageMCP(LocalObjectStore(str(tmp_path / "out")))
+
+    asset = asyncio.run(normalize_upload(str(raw), "job2", storage, max_dimension=2048))
+
+    assert asset.size == (64, 48)
+    assert asset.format == "JPEG"
+    assert asset.image.mode == "RGB"
@@ -0,0 +1,93 @@
+"""Health-aware routing and 429 cooldowns in the Gemini key pool."""
+
+import pytest
+
+import key_pool as key_pool_module
+from config import config
+from key_pool import GeminiKeyPool, is_rate_limit_error
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class _RateLimited(Exception):
+    code = 429
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(key_pool_module.time, "monotonic", clock)
+    monkeypatch.setattr(config, "GEMINI_KEY_BURST", 10)
+    monkeypatch.setattr(config, "GEMINI_KEY_RPM", 600)
+    monkeypatch.setattr(config, "GEMINI_KEY_COOLDOWN_S", 10.0)
+    monkeypatch.setattr(config, "GEMINI_KEY_COOLDOWN_MAX_S", 35.0)
+    monkeypatch.setattr(config, "GEMINI_KEY_ERROR_WINDOW_S", 300.0)
+    return clock
+
+
+def _acquire(pool):
+    lease, wait = pool.try_acquire()
+    assert lease is not None, f"no key available, wait={wait}"
+    return lease
+
+
+def test_rate_limit_signals():
+    assert is_rate_limit_error(_RateLimited())
+    status = Exception()
+    status.status = "RESOURCE_EXHAUSTED"
+    assert is_rate_limit_error(status)
+    assert not is_rate_limit_error(ValueError("bad request"))
+
+
+def test_calls_spread_to_the_least_loaded_key(clock):
+    pool = GeminiKeyPool(["key-a", "key-b"])
+    first, second = _acquire(pool), _acquire(pool)
+    assert {first.key, second.key} == {"key-a", "key-b"}
+    first.release()
+    assert _acquire(pool).key == first.key
+
+
+def test_rate_limited_key_cools_down_and_is_skipped(clock):
+    pool = GeminiKeyPool(["key-a", "key-b"])
+    with pytest.raises(_RateLimited):
+        with _acquire(pool) as lease:
+            limited = lease.key
+            raise _RateLimited()
+
+    # Every call goes to the healthy key while the other cools down
+    for _ in range(3):
+        lease = _acquire(pool)
+        assert lease.key != limited
+        lease.release()
+
+    clock.now += 10.5
+    # Back in rotation, but only once the key with no recent 429s runs out of budget
+    keys = [_acquire(pool).key for _ in range(11)]
+    assert limited not in keys[:10]
+    assert keys[10] == limited
+
+
+def test_repeated_rate_limits_back_off_exponentially(clock):
+    pool = GeminiKeyPool(["only"])
+    cooldowns = []
+    for _ in range(4):
+        lease = _acquire(pool)
+        lease.release(_RateLimited())
+        lease, wait = pool.try_acquire()
+        assert lease is None
+        cooldowns.append(round(wait, 1))
+        clock.now += wait + 0.01
+    assert cooldowns == [10.0, 20.0, 35.0, 35.0]
+
+
+def test_other_errors_do_not_cool_a_key_down(clock):
+    pool = GeminiKeyPool(["only"])
+    _acquire(pool).release(ValueError("bad prompt"))
+    assert _acquire(pool).key == "only"
+    assert pool.snapshot()[0]["cooldown_s"] == 0.0
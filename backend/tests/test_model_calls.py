@@ -0,0 +1,57 @@
+"""Model calls hold their slot and key exactly as long as the request runs."""
+
+import asyncio
+import contextlib
+from types import SimpleNamespace
+
+import model_calls
+from model_governor import governor_for
+
+
+class _Models:
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.cancelled = False
+
+    async def generate_content(self, model, contents, config=None):
+        self.started.set()
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def _fake_pool(models: _Models, leases: list):
+    @contextlib.contextmanager
+    def lease():
+        leases.append(1)
+        try:
+            yield SimpleNamespace(client=SimpleNamespace(aio=SimpleNamespace(models=models)))
+        finally:
+            leases.pop()
+
+    async def acquire_async():
+        return lease()
+
+    return SimpleNamespace(acquire_async=acquire_async)
+
+
+def test_cancelling_a_call_aborts_the_request_and_frees_its_slot(monkeypatch):
+    models = _Models()
+    leases: list = []
+    monkeypatch.setattr(model_calls, "key_pool", _fake_pool(models, leases))
+    governor = governor_for("test-cancel-model")
+
+    async def run():
+        task = asyncio.create_task(model_calls.generate_content("test-cancel-model", ["hi"]))
+        await models.started.wait()
+        assert governor.in_flight == 1 and leases
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+
+    assert models.cancelled
+    assert governor.in_flight == 0
+    assert not leases
@@ -0,0 +1,84 @@
+"""AIMD limit and FIFO slot handling of the per-model governor."""
+
+import asyncio
+
+import pytest
+
+from model_governor import ModelGovernor
+
+
+class _RateLimited(Exception):
+    code = 429
+
+
+def _governor(**kwargs) -> ModelGovernor:
+    settings = {"initial_limit": 4, "max_limit": 8, "target_latency_s": 10.0, **kwargs}
+    return ModelGovernor("test-model", **settings)
+
+
+async def _call(governor: ModelGovernor, error: Exception | None = None) -> None:
+    async with governor.slot():
+        if error is not None:
+            raise error
+
+
+def test_fast_successes_grow_the_limit_additively():
+    governor = _governor()
+
+    async def run():
+        # +1/limit per success: about one slot per window of `limit` calls
+        for _ in range(5):
+            await _call(governor)
+
+    asyncio.run(run())
+    assert governor.limit == 5
+
+
+def test_rate_limit_cuts_the_limit_once_per_cooldown():
+    governor = _governor()
+
+    async def run():
+        for _ in range(3):
+            with pytest.raises(_RateLimited):
+                await _call(governor, _RateLimited())
+
+    asyncio.run(run())
+    assert governor.limit == 2
+    assert governor.in_flight == 0
+
+
+def test_slow_calls_shrink_the_limit():
+    governor = _governor(target_latency_s=0.0)
+
+    async def run():
+        async with governor.slot():
+            await asyncio.sleep(0.01)
+
+    asyncio.run(run())
+    assert governor.limit == 3
+
+
+def test_waiters_are_served_in_order_and_cancelled_waiters_leave_the_queue():
+    governor = _governor(initial_limit=1, max_limit=1)
+    order = []
+
+    async def worker(name: str, release: asyncio.Event):
+        async with governor.slot():
+            order.append(name)
+            await release.wait()
+
+    async def run():
+        release = asyncio.Event()
+        first = asyncio.create_task(worker("first", release))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(worker(name, release)) for name in ("a", "b", "c")]
+        await asyncio.sleep(0)
+        assert governor.queued == 3
+        waiters[1].cancel()
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, *waiters, return_exceptions=True)
+
+    asyncio.run(run())
+    assert order == ["first", "a", "c"]
+    assert governor.in_flight == 0 and governor.queued == 0
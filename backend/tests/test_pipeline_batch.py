@@ -0,0 +1,63 @@
+"""A batch job keeps going when one of its photos cannot be used."""
+
+import asyncio
+
+from PIL import Image
+
+import pipeline
+from mcp_servers.object_store import LocalObjectStore
+from mcp_servers.storage import StorageMCP
+
+
+class _Scout:
+    async def analyze(self, photo):
+        return {"style_category": "casual"}
+
+    def build_query(self, analysis, vibe=None):
+        return "portrait"
+
+    async def fetch_references(self, query):
+        return []
+
+
+class _Architect:
+    async def load_library_context(self, vibe, style, analysis):
+        return {}
+
+
+class _PostProduction:
+    def __init__(self, storage):
+        self.storage = storage
+
+
+class _Agents:
+    def __init__(self, storage):
+        self.scout = _Scout()
+        self.architect = _Architect()
+        self.post_prod = _PostProduction(storage)
+
+
+def test_corrupt_upload_fails_only_its_photo(tmp_path, monkeypatch):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"upload_{i}.png"
+        Image.new("RGB", (64, 48), (40 * i, 90, 60)).save(path)
+        paths.append(str(path))
+    # Cut the middle upload short
+    data = open(paths[1], "rb").read()
+    with open(paths[1], "wb") as f:
+        f.write(data[: len(data) // 2])
+
+    agents = _Agents(StorageMCP(LocalObjectStore(str(tmp_path / "out"))))
+    monkeypatch.setattr(pipeline, "get_agents", lambda: agents)
+
+    async def enhance_photo(agents, photo, references, analysis, context, mode, vibe, pid, *args):
+        return [f"{pid}_enhanced_1.jpg"]
+
+    monkeypatch.setattr(pipeline, "_enhance_photo", enhance_photo)
+
+    results = asyncio.run(pipeline.run_batch_enhancement_pipeline(paths, job_id="batch"))
+
+    assert len(results) == 3
+    assert results[1] == []
+    assert len(results[0]) == 1 and len(results[2]) == 1
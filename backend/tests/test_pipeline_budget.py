@@ -0,0 +1,128 @@
+"""The pipeline stops at an exhausted job budget and keeps what it already has."""
+
+import asyncio
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+import pipeline
+from agents.image_enhancer import ImageEnhancerAgent
+from budget import BudgetExceeded, current_budget, job_budget
+from config import config
+from image_asset import ImageAsset
+from retry_policy import RetryPlan
+
+
+def _jpeg() -> ImageAsset:
+    buffer = BytesIO()
+    Image.new("RGB", (64, 48), (120, 90, 60)).save(buffer, format="JPEG")
+    return ImageAsset(buffer.getvalue())
+
+
+class _Enhancer(ImageEnhancerAgent):
+    """The real agent; each API call charges the budget ``tries`` times, like tenacity retries."""
+
+    def __init__(self, tries: int):
+        self.tries = tries
+
+    async def _call_api(self, contents, temperature):
+        for _ in range(self.tries):
+            current_budget().charge()
+        raise AssertionError("budget should have run out")
+
+
+class _RespondingEnhancer(_Enhancer):
+    async def enhance(self, original, prompt, references=None, temperature=0.75):
+        budget = current_budget()
+        if budget.remaining_calls < self.tries:
+            # Spend what is left, then fail inside the real agent
+            return await super().enhance(original, prompt, references, temperature)
+        for _ in range(self.tries):
+            budget.charge()
+        return ImageAsset(f"{prompt}@{temperature:.2f}".encode())
+
+
+class _Architect:
+    async def generate_prompt(self, *args, **kwargs):
+        current_budget().charge()
+        return "prompt"
+
+    async def fix_prompt(self, original, prompt, *args, **kwargs):
+        current_budget().charge()
+        return prompt + "!"
+
+
+class _Inspector:
+    async def evaluate_batch(self, candidates, original):
+        current_budget().charge()
+        return [{"verdict": "FAIL", "overall": 5, "issues": ["Skin looks plastic"]} for _ in candidates]
+
+    async def evaluate(self, image, original):
+        current_budget().charge()
+        return {"verdict": "FAIL", "overall": 4, "issues": ["Skin looks plastic"]}
+
+    async def save_result(self, *args, **kwargs):
+        pass
+
+
+class _PostProduction:
+    def __init__(self):
+        self.saved: list[ImageAsset] = []
+
+    async def process_and_save(self, image, key, original=None):
+        self.saved.append(image)
+        return key
+
+
+class _RetryPolicy:
+    async def plan(self, vibe, style, max_retries):
+        return RetryPlan("default_enhance", "", max_retries, config.BASE_TEMPERATURE)
+
+
+class _Agents:
+    def __init__(self, tries: int):
+        self.architect = _Architect()
+        self.enhancer = _RespondingEnhancer(tries)
+        self.inspector = _Inspector()
+        self.post_prod = _PostProduction()
+        self.retry_policy = _RetryPolicy()
+
+
+async def _enhance(agents: _Agents, max_calls: int) -> list[str]:
+    with job_budget(600, max_calls):
+        return await pipeline._enhance_photo(
+            agents, _jpeg(), [], {}, {"realism_rules": ""}, "enhance", None, "job", 1, 3,
+        )
+
+
+def test_enhancer_raises_budget_exceeded():
+    async def run():
+        with job_budget(600, 0):
+            await _Enhancer(tries=1).enhance(_jpeg(), "prompt")
+
+    with pytest.raises(BudgetExceeded):
+        asyncio.run(run())
+
+
+def test_retry_out_of_budget_keeps_best_scored_image():
+    # prompt 1 + generation 3 + batch inspection 1; the retry's generation runs out
+    agents = _Agents(tries=3)
+    keys = asyncio.run(_enhance(agents, max_calls=7))
+
+    assert len(keys) == 1 and keys[0].endswith("/job_enhanced_1.jpg")
+    assert agents.post_prod.saved[0].data == f"prompt@{config.BASE_TEMPERATURE:.2f}".encode()
+
+
+def test_inspection_out_of_budget_keeps_unscored_image():
+    # prompt 1 + generation 3 leaves nothing for the inspector
+    agents = _Agents(tries=3)
+    keys = asyncio.run(_enhance(agents, max_calls=4))
+
+    assert len(keys) == 1
+    assert agents.post_prod.saved[0].data == f"prompt@{config.BASE_TEMPERATURE:.2f}".encode()
+
+
+def test_first_generation_out_of_budget_yields_nothing():
+    agents = _Agents(tries=3)
+    assert asyncio.run(_enhance(agents, max_calls=3)) == []
@@ -0,0 +1,104 @@
+"""Local pre-screen thresholds on synthetic images."""
+
+import io
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+from image_asset import ImageAsset
+from prescreen import prescreen
+
+
+def _asset(image: Image.Image) -> ImageAsset:
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return ImageAsset(buf.getvalue())
+
+
+def _scene(width: int = 640, height: int = 480, seed: int = 0) -> Image.Image:
+    """Neutral-toned gradient with fine texture, roughly like a photo."""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(40, 200, width, dtype=np.float32)
+    y = np.linspace(0, 40, height, dtype=np.float32)[:, None]
+    base = x[None, :] + y + rng.normal(0, 25, (height, width)).astype(np.float32)
+    rgb = np.stack([base, base * 0.97, base * 0.94], axis=-1)
+    return Image.fromarray(np.clip(rgb, 0, 255).astype(np.uint8), "RGB")
+
+
+def _enhanced(original: Image.Image) -> Image.Image:
+    """A clearly different but healthy result: brighter, new texture."""
+    arr = np.asarray(_scene(*original.size, seed=1), dtype=np.float32)
+    return Image.fromarray(np.clip(arr * 1.1 + 10, 0, 255).astype(np.uint8), "RGB")
+
+
+def _issues(pairs):
+    return [issue for issue, _ in pairs]
+
+
+def test_healthy_output_passes():
+    original = _scene()
+    failures, warnings = prescreen(_asset(_enhanced(original)), _asset(original))
+    assert failures == []
+    assert warnings == []
+
+
+def test_unchanged_output_fails_as_identical():
+    original = _scene()
+    failures, _ = prescreen(_asset(original.copy()), _asset(original))
+    assert any("nearly identical" in issue for issue in _issues(failures))
+
+
+def test_blank_output_fails():
+    original = _scene()
+    blank = Image.new("RGB", original.size, (128, 128, 128))
+    failures, _ = prescreen(_asset(blank), _asset(original))
+    assert any("blank" in issue for issue in _issues(failures))
+
+
+def test_blurred_output_fails_but_soft_original_excuses_it():
+    original = _scene()
+    blurred = _enhanced(original).filter(ImageFilter.GaussianBlur(8))
+    failures, _ = prescreen(_asset(blurred), _asset(original))
+    assert any("blurred" in issue for issue in _issues(failures))
+
+    # Measured against an equally soft original the blur is not the model's doing
+    soft_original = original.filter(ImageFilter.GaussianBlur(8))
+    failures, _ = prescreen(_asset(blurred), _asset(soft_original))
+    assert not any("blurred" in issue for issue in _issues(failures))
+
+
+def test_colour_cast_fails_only_beyond_the_original():
+    original = _scene()
+    arr = np.asarray(_enhanced(original), dtype=np.float32)
+    arr[..., 1:] *= 0.3
+    tinted = Image.fromarray(arr.astype(np.uint8), "RGB")
+    failures, _ = prescreen(_asset(tinted), _asset(original))
+    assert any("colour cast" in issue for issue in _issues(failures))
+
+    # An original with the same cast makes the output consistent, not broken
+    orig_arr = np.asarray(original, dtype=np.float32)
+    orig_arr[..., 1:] *= 0.3
+    tinted_original = Image.fromarray(orig_arr.astype(np.uint8), "RGB")
+    failures, _ = prescreen(_asset(tinted), _asset(tinted_original))
+    assert not any("colour cast" in issue for issue in _issues(failures))
+
+
+def test_resolution_is_judged_against_the_original():
+    # A small upload rendered at its own size is fine
+    small = _scene(400, 300)
+    failures, _ = prescreen(_asset(_enhanced(small)), _asset(small))
+    assert not any("resolution" in issue for issue in _issues(failures))
+
+    # A render far below the original's size is not
+    original = _scene(1200, 900)
+    thumbnail = _enhanced(original).resize((400, 300))
+    failures, _ = prescreen(_asset(thumbnail), _asset(original))
+    assert any("resolution" in issue for issue in _issues(failures))
+
+
+def test_aspect_drift_is_a_warning():
+    original = _scene(800, 450)
+    square = _enhanced(_scene(480, 480))
+    failures, warnings = prescreen(_asset(square), _asset(original))
+    assert failures == []
+    assert any("Aspect ratio" in issue for issue in _issues(warnings))
@@ -0,0 +1,90 @@
+"""Hashed feature vectors and the in-memory prompt k-NN index."""
+
+import asyncio
+
+import numpy as np
+
+from config import config
+from mcp_servers.prompt_index import PromptVectorIndex, embed
+from mcp_servers.prompt_library import PromptLibraryMCP
+
+_CAFE = {"setting": "cosy cafe by a window", "pose": "seated", "lighting": {"type": "window light"}}
+_BEACH = {"setting": "sunny beach at noon", "pose": "standing", "lighting": {"type": "harsh sun"}}
+
+
+def _record(row_id: int) -> dict:
+    return {"prompt": f"prompt {row_id}"}
+
+
+def test_embed_is_deterministic_and_unit_length():
+    a = embed(_CAFE, "warm window light")
+    b = embed(_CAFE, "warm window light")
+    assert a.dtype == np.float32
+    assert a.shape == (config.PROMPT_VECTOR_DIM,)
+    np.testing.assert_array_equal(a, b)
+    assert abs(float(np.linalg.norm(a)) - 1.0) < 1e-5
+    assert not embed({}, "").any()
+
+
+def test_embed_places_similar_scenes_closer():
+    query = embed(_CAFE)
+    cafe_prompt = embed(_CAFE, "soft window light in a cosy cafe")
+    beach_prompt = embed(_BEACH, "bright beach sun")
+    assert float(query @ cafe_prompt) > float(query @ beach_prompt)
+
+
+def test_search_ranks_by_similarity_and_filters_score():
+    index = PromptVectorIndex(3)
+    index.upsert([
+        (1, 9.0, np.array([1, 0, 0], np.float32), _record(1)),
+        (2, 9.0, np.array([0.6, 0.8, 0], np.float32), _record(2)),
+        (3, 5.0, np.array([1, 0, 0], np.float32), _record(3)),
+        (4, 9.0, np.array([0, 0, 1], np.float32), _record(4)),
+    ])
+    hits = index.search(np.array([1, 0, 0], np.float32), 3, min_score=7.0, min_similarity=0.1)
+    assert [(row_id, record) for row_id, _, record in hits] == [(1, _record(1)), (2, _record(2))]
+
+
+def test_remove_swaps_the_last_row_into_the_gap():
+    index = PromptVectorIndex(4, capacity=2)
+    vectors = {i: np.eye(4, dtype=np.float32)[i] for i in range(4)}
+    index.upsert([(i, 9.0, vectors[i], _record(i)) for i in range(4)])
+    assert len(index) == 4
+
+    # Remove a middle row (the last one moves into it) and then the new last
+    index.remove([1, 3, 99])
+    assert len(index) == 2
+    for i in (0, 2):
+        hits = index.search(vectors[i], 1)
+        assert hits[0][0] == i
+        assert hits[0][2] == _record(i)
+        assert abs(hits[0][1] - 1.0) < 1e-6
+    for i in (1, 3):
+        assert index.search(vectors[i], 4, min_similarity=0.5) == []
+
+    # Re-adding reuses the freed rows without disturbing the survivors
+    index.upsert([(5, 9.0, vectors[1], _record(5)), (2, 8.0, vectors[2], {"prompt": "updated"})])
+    assert len(index) == 3
+    assert index.search(vectors[1], 1)[0][0] == 5
+    assert index.search(vectors[2], 1)[0][2] == {"prompt": "updated"}
+
+
+def test_similar_prompts_are_served_from_the_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PROMPT_LIBRARY_PATH", str(tmp_path / "prompts.db"))
+    library = PromptLibraryMCP()
+
+    async def run():
+        await library.save_prompt_result("soft window light in a cosy cafe", 9.0, "cafe", photo_analysis=_CAFE)
+        await library.save_prompt_result("bright beach sun", 9.0, "beach", photo_analysis=_BEACH)
+        library.flush()
+
+        # No reader connection is needed to answer a similarity query
+        def no_db():
+            raise AssertionError("similarity search read the database")
+        monkeypatch.setattr(library._store, "_reader_conn", no_db)
+        return await library.get_similar_prompts(_CAFE, limit=1)
+
+    hits = asyncio.run(run())
+    assert [hit["prompt"] for hit in hits] == ["soft window light in a cosy cafe"]
+    assert hits[0]["scenario"] == "cafe"
+    assert hits[0]["score"] == 9.0
@@ -0,0 +1,47 @@
+"""Prompt library bookkeeping kept by the write-behind writer."""
+
+import asyncio
+import threading
+
+from config import config
+from mcp_servers.prompt_library import AttemptOutcome, PromptLibraryMCP
+
+
+def test_upsert_moving_scenario_updates_counts(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PROMPT_LIBRARY_PATH", str(tmp_path / "prompts.db"))
+    library = PromptLibraryMCP()
+
+    async def save():
+        await library.save_prompt_result("warm window light", 8.0, "cafe")
+        library.flush()
+        # The same prompt scoring higher elsewhere moves its row to that scenario
+        await library.save_prompt_result("warm window light", 9.0, "outdoor")
+        library.flush()
+
+    asyncio.run(save())
+
+    counts = library._store._scenario_counts
+    assert counts.get("cafe", 0) == 0
+    assert counts["outdoor"] == 1
+
+
+def test_writer_survives_a_bad_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "PROMPT_LIBRARY_PATH", str(tmp_path / "prompts.db"))
+    library = PromptLibraryMCP()
+    store = library._store
+
+    # Malformed rows that fail with TypeError rather than sqlite3.Error
+    store.enqueue(("prompt", 9.0, "cafe", "", ["unhashable"], None))
+    store.enqueue(AttemptOutcome("cafe", "", 0, "", [0.75], True))
+    flusher = threading.Thread(target=library.flush, daemon=True)
+    flusher.start()
+    flusher.join(timeout=10)
+    assert not flusher.is_alive(), "flush() hung after a bad batch"
+
+    async def save():
+        await library.save_prompt_result("soft window light", 8.5, "cafe")
+        library.flush()
+        return await library.get_successful_prompts("cafe")
+
+    assert store._writer.is_alive()
+    assert [row["prompt"] for row in asyncio.run(save())] == ["soft window light"]
@@ -0,0 +1,71 @@
+"""Prompt sections, field rendering and byte-budget trimming."""
+
+import pytest
+
+from prompt_templates import PromptSection, PromptTemplate
+
+
+def _template() -> PromptTemplate:
+    return PromptTemplate(
+        "test",
+        PromptSection("task", "Enhance the photo of {subject}.", required=True),
+        PromptSection("style", "Style: {style}", priority=3),
+        PromptSection("history", "Past winners:\n{history}", priority=1),
+        PromptSection("tips", "Keep skin texture natural.", priority=2),
+        PromptSection("output", "Return one image.", required=True),
+    )
+
+
+def test_fields_are_filled_and_empty_optional_sections_omitted():
+    template = _template()
+    assert template.fields == {"subject", "style", "history"}
+    text = template.render(subject="a runner", style="golden hour", history="")
+    assert text == (
+        "Enhance the photo of a runner.\n\nStyle: golden hour\n\n"
+        "Keep skin texture natural.\n\nReturn one image."
+    )
+
+
+def test_sections_are_dedented_and_stripped():
+    section = PromptSection("s", """
+        line one
+            indented
+        """)
+    assert section.render({}) == "line one\n    indented"
+
+
+def test_lowest_priority_sections_are_dropped_first():
+    template = _template()
+    values = {"subject": "a runner", "style": "golden hour", "history": "x" * 200}
+    full = template.render(**values)
+
+    # Just over budget: only the lowest-priority section goes
+    trimmed = template.render(max_bytes=len(full.encode()) - 1, **values)
+    assert "Past winners" not in trimmed
+    assert "Keep skin texture" in trimmed and "Style:" in trimmed
+
+    # A tight budget keeps dropping optional sections in priority order
+    minimal = template.render(max_bytes=60, **values)
+    assert minimal == "Enhance the photo of a runner.\n\nReturn one image."
+
+
+def test_budget_counts_utf8_bytes_and_separators():
+    template = PromptTemplate(
+        "utf8",
+        PromptSection("a", "{a}", required=True),
+        PromptSection("b", "{b}", priority=1),
+    )
+    # "é" is two bytes: 4 + 2 (separator) + 4 = 10 bytes, not 8 characters
+    assert template.render(max_bytes=10, a="éé", b="éé") == "éé\n\néé"
+    assert template.render(max_bytes=9, a="éé", b="éé") == "éé"
+
+
+def test_required_sections_survive_an_impossible_budget():
+    template = _template()
+    text = template.render(max_bytes=5, subject="a runner", style="s", history="h")
+    assert text == "Enhance the photo of a runner.\n\nReturn one image."
+
+
+def test_formatted_placeholders_are_rejected():
+    with pytest.raises(ValueError):
+        PromptSection("bad", "{score:.2f}")
@@ -0,0 +1,115 @@
+"""Retention sweep: age expiry, quota eviction around pinned jobs, orphan blobs."""
+
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+import retention
+from config import config
+from mcp_servers.object_store import LocalObjectStore
+from mcp_servers.storage import StorageMCP, job_key, job_prefix, manifest_key
+
+_HOUR = 3600
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    local = LocalObjectStore(str(tmp_path))
+    monkeypatch.setattr(config, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(retention, "get_object_store", lambda: local)
+    monkeypatch.setattr(config, "RETENTION_MAX_AGE_S", 24 * _HOUR)
+    monkeypatch.setattr(config, "RETENTION_MAX_BYTES", 0)
+    monkeypatch.setattr(config, "RETENTION_MIN_AGE_S", _HOUR)
+    monkeypatch.setattr(config, "RETENTION_ORPHAN_GRACE_S", 600)
+    return local
+
+
+def _make_job(store: LocalObjectStore, job_id: str, age_s: float, size: int = 1000) -> None:
+    """A finished job with one output, whose manifest is ``age_s`` old."""
+    async def run():
+        storage = StorageMCP(store)
+        await storage.save(os.urandom(size), job_key(f"{job_id}_enhanced_1.jpg"))
+        manifest = await storage.write_manifest(job_id, [])
+        manifest["created"] = time.time() - age_s
+        await store.put(manifest_key(job_id), json.dumps(manifest).encode())
+
+    asyncio.run(run())
+
+
+def _jobs(store: LocalObjectStore) -> set[str]:
+    return {info.key.split("/")[2] for info in asyncio.run(store.list("jobs/"))}
+
+
+def test_jobs_expire_by_age(store):
+    _make_job(store, "oldjob01", age_s=48 * _HOUR)
+    _make_job(store, "newjob01", age_s=_HOUR)
+
+    report = asyncio.run(retention.sweep())
+
+    assert report.expired_jobs == ["oldjob01"]
+    assert _jobs(store) == {"newjob01"}
+    assert not os.path.exists(store.local_path(job_prefix("oldjob01").rstrip("/")))
+
+
+def test_quota_evicts_oldest_unpinned_jobs(store, monkeypatch):
+    for job_id, age in (("served01", 10), ("running1", 9), ("oldest01", 8), ("older001", 7), ("recent01", 2)):
+        _make_job(store, job_id, age_s=age * _HOUR, size=10_000)
+    # Running jobs are not counted; the other four need about 41 KB
+    monkeypatch.setattr(config, "RETENTION_MAX_BYTES", 25_000)
+
+    report = asyncio.run(retention.sweep(lambda: ({"running1"}, {"served01"})))
+
+    assert report.expired_groups == 0
+    assert report.evicted_groups == 2
+    assert report.expired_jobs == ["older001", "oldest01"]
+    assert _jobs(store) == {"served01", "running1", "recent01"}
+
+
+def test_jobs_younger_than_min_age_are_not_evicted(store, monkeypatch):
+    _make_job(store, "fresh001", age_s=60, size=10_000)
+    monkeypatch.setattr(config, "RETENTION_MAX_BYTES", 1)
+
+    report = asyncio.run(retention.sweep())
+
+    assert report.evicted_groups == 0
+    assert _jobs(store) == {"fresh001"}
+
+
+def test_orphan_blobs_are_collected_after_the_grace_period(store):
+    _make_job(store, "keeper01", age_s=_HOUR)
+
+    async def put_blobs():
+        await store.put("_cas/aa/old.jpg", b"old")
+        await store.put("_cas/bb/fresh.jpg", b"fresh")
+
+    asyncio.run(put_blobs())
+    stale = time.time() - 2 * 600
+    os.utime(store.local_path("_cas/aa/old.jpg"), (stale, stale))
+
+    report = asyncio.run(retention.sweep())
+
+    assert report.orphan_blobs == 1
+    blobs = {info.key for info in asyncio.run(store.list("_cas/"))}
+    assert "_cas/aa/old.jpg" not in blobs
+    assert "_cas/bb/fresh.jpg" in blobs
+    # The blob the job's output links to is still referenced
+    assert len(blobs) == 2
+
+
+def test_finished_jobs_are_read_from_manifests_without_listing(store, monkeypatch):
+    _make_job(store, "manifest", age_s=_HOUR)
+    listed = []
+    real_list = store.list
+
+    async def spy(prefix=""):
+        listed.append(prefix)
+        return await real_list(prefix)
+
+    monkeypatch.setattr(store, "list", spy)
+    report = asyncio.run(retention.sweep())
+
+    assert report.jobs_scanned == 1
+    assert not [prefix for prefix in listed if prefix.startswith("jobs/")]
@@ -0,0 +1,120 @@
+"""Learned retry budgets: smoothing, fallbacks and exploration."""
+
+import asyncio
+
+import pytest
+
+import retry_policy
+from config import config
+from retry_policy import RetryPolicy, _ScenarioStats, issue_type
+
+_STYLE = "casual_iphone"
+_SCENARIO = "casual_iphone_style"
+
+
+class _Library:
+    """Attempt counts served to the policy, and the outcomes it records."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.recorded = []
+
+    async def get_attempt_stats(self, scenario):
+        assert scenario == _SCENARIO
+        return self.rows
+
+    def record_attempt(self, outcome):
+        self.recorded.append(outcome)
+
+
+def _row(attempt, trials, passes, style=_STYLE, issue="", temperature=0.7):
+    return {
+        "style": style, "attempt": attempt, "issue": issue,
+        "temperature": temperature, "trials": trials, "passes": passes,
+    }
+
+
+@pytest.fixture(autouse=True)
+def policy_config(monkeypatch):
+    monkeypatch.setattr(config, "RETRY_POLICY_ENABLED", True)
+    monkeypatch.setattr(config, "RETRY_POLICY_MIN_SAMPLES", 20)
+    monkeypatch.setattr(config, "RETRY_POLICY_MIN_PASS_RATE", 0.1)
+    monkeypatch.setattr(config, "RETRY_POLICY_EXPLORE_RATE", 0.1)
+    monkeypatch.setattr(config, "BASE_TEMPERATURE", 0.7)
+    # Not exploring unless a test says so
+    monkeypatch.setattr(retry_policy.random, "random", lambda: 0.99)
+
+
+def _plan(rows, max_retries=3):
+    library = _Library(rows)
+    plan = asyncio.run(RetryPolicy(library).plan(None, "Casual iPhone", max_retries))
+    return plan, library
+
+
+def test_pass_rates_are_smoothed_and_need_enough_trials():
+    stats = _ScenarioStats([_row(1, 20, 0), _row(2, 19, 19)])
+    # Laplace smoothing: 0 of 20 is 1/22, never a flat zero
+    assert stats.pass_rate(_STYLE, attempt=1) == pytest.approx(1 / 22)
+    assert stats.pass_rate(_STYLE, attempt=2) is None
+
+
+def test_thin_style_counts_fall_back_to_the_scenario():
+    stats = _ScenarioStats([_row(1, 5, 0), _row(1, 30, 15, style="film")])
+    # Five trials for this style are too few; the whole scenario's 35 are used
+    assert stats.pass_rate(_STYLE, attempt=1) == pytest.approx(16 / 37)
+
+
+def test_retries_stop_at_the_first_attempt_that_rarely_passes():
+    plan, _ = _plan([_row(1, 40, 12), _row(2, 40, 1), _row(3, 40, 20)])
+    assert plan.max_retries == 1
+    assert not plan.explore
+
+
+def test_without_data_the_configured_defaults_apply():
+    plan, _ = _plan([_row(1, 3, 0)])
+    assert plan.max_retries == 3
+    assert plan.start_temperature == 0.7
+    assert plan.allows_retry(1, "skin")
+
+
+def test_exploring_photos_keep_the_full_budget(monkeypatch):
+    monkeypatch.setattr(retry_policy.random, "random", lambda: 0.05)
+    plan, _ = _plan([_row(1, 40, 0, issue="skin")])
+    assert plan.explore
+    assert plan.max_retries == 3
+    assert plan.allows_retry(1, "skin")
+
+
+def test_early_stop_uses_the_issue_type():
+    plan, _ = _plan([_row(2, 40, 0, issue="identity"), _row(2, 40, 20, issue="skin")])
+    assert not plan.allows_retry(2, "identity")
+    assert plan.allows_retry(2, "skin")
+
+
+def test_start_temperature_is_the_best_rated_first_attempt():
+    rows = [_row(0, 40, 10, temperature=0.7), _row(0, 40, 30, temperature=0.9), _row(0, 5, 5, temperature=1.1)]
+    plan, _ = _plan(rows)
+    assert plan.start_temperature == 0.9
+
+
+def test_outcomes_are_bucketed_and_recorded():
+    plan, library = _plan([])
+    plan.record(1, "skin", 0.93, passed=True)
+    outcome = library.recorded[0]
+    assert (outcome.scenario, outcome.style, outcome.attempt, outcome.issue) == (_SCENARIO, _STYLE, 1, "skin")
+    assert outcome.temperature == 0.95
+    assert outcome.passed
+
+
+def test_disabled_policy_plans_the_defaults(monkeypatch):
+    monkeypatch.setattr(config, "RETRY_POLICY_ENABLED", False)
+    plan, _ = _plan([_row(1, 40, 0)])
+    assert plan.max_retries == 3
+    assert plan.allows_retry(1, "other")
+
+
+def test_issue_types():
+    assert issue_type(["Output is nearly identical to the original"]) == "unchanged"
+    assert issue_type(["Skin looks waxy and airbrushed"]) == "skin"
+    assert issue_type(["something odd", "left hand has 6 fingers"]) == "artifacts"
+    assert issue_type(["something odd"]) == "other"
@@ -0,0 +1,84 @@
+"""Sharded job directories, content-addressed blobs and job manifests."""
+
+import asyncio
+import hashlib
+import json
+import os
+
+import pytest
+
+from mcp_servers.object_store import LocalObjectStore
+from mcp_servers.storage import StorageMCP, blob_key, job_id_of, job_key, job_prefix, manifest_key
+
+
+def _shard(job_id: str) -> str:
+    return hashlib.sha256(job_id.encode()).hexdigest()[:2]
+
+
+def test_job_files_live_in_a_sharded_job_directory():
+    shard = _shard("abc12345")
+    assert job_prefix("abc12345") == f"jobs/{shard}/abc12345/"
+    assert job_key("abc12345_enhanced_1.jpg") == f"jobs/{shard}/abc12345/abc12345_enhanced_1.jpg"
+    # Batch photos share their job's directory
+    assert job_key("abc12345-2_working.jpg") == f"jobs/{shard}/abc12345/abc12345-2_working.jpg"
+    assert manifest_key("abc12345") == f"jobs/{shard}/abc12345/manifest.json"
+
+
+@pytest.mark.parametrize(
+    ("name", "job_id"),
+    [
+        ("abc12345_enhanced_1.jpg", "abc12345"),
+        ("abc12345-2_enhanced_1.jpg", "abc12345"),
+        ("jobs/5e/abc12345/abc12345-2_enhanced_1.jpg", "abc12345"),
+        ("jobs/5e/abc12345", None),
+        ("_cas/ab/abcdef.jpg", None),
+        ("_ref_cache/ref_1.jpg", None),
+        ("plainname", None),
+    ],
+)
+def test_job_id_of(name, job_id):
+    assert job_id_of(name) == job_id
+
+
+def test_job_key_rejects_files_outside_a_job():
+    with pytest.raises(ValueError):
+        job_key("_ref_cache/ref_1.jpg")
+
+
+def test_identical_outputs_share_one_blob(tmp_path):
+    storage = StorageMCP(LocalObjectStore(str(tmp_path)))
+    data = b"\xff\xd8same pixels"
+
+    async def run():
+        first = await storage.save(data, job_key("job1_enhanced_1.jpg"))
+        second = await storage.save(data, job_key("job2_enhanced_1.jpg"))
+        return first, second
+
+    first, second = asyncio.run(run())
+    blob = tmp_path / blob_key(data, ".jpg")
+    assert blob.exists()
+    assert os.path.samefile(tmp_path / first, blob)
+    assert os.path.samefile(tmp_path / second, blob)
+    assert len(list((tmp_path / "_cas").rglob("*.jpg"))) == 1
+
+
+def test_manifest_lists_every_job_file_with_its_size(tmp_path):
+    storage = StorageMCP(LocalObjectStore(str(tmp_path)))
+    photos = [{"photo_id": "job1", "images": ["job1_enhanced_1.jpg"]}]
+
+    async def run():
+        await storage.save(b"w" * 100, job_key("job1_working.jpg"))
+        await storage.save(b"e" * 250, job_key("job1_enhanced_1.jpg"))
+        written = await storage.write_manifest("job1", photos)
+        return written, await storage.read_manifest("job1"), await storage.read_manifest("nojob")
+
+    written, read, missing = asyncio.run(run())
+    assert written == read
+    assert read["version"] == 1
+    assert read["job_id"] == "job1"
+    assert read["photos"] == photos
+    assert read["assets"] == {"job1_working.jpg": 100, "job1_enhanced_1.jpg": 250}
+    assert read["bytes"] == 350
+    assert missing is None
+    stored = json.loads((tmp_path / manifest_key("job1")).read_bytes())
+    assert stored == read
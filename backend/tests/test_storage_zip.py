@@ -0,0 +1,58 @@
+"""Streaming ZIP archives of stored outputs."""
+
+import asyncio
+import io
+import os
+import zipfile
+
+from mcp_servers.object_store import LocalObjectStore
+from mcp_servers.storage import StorageMCP
+
+
+def _storage(tmp_path) -> StorageMCP:
+    return StorageMCP(LocalObjectStore(str(tmp_path / "out")))
+
+
+def test_archive_streams_in_chunks_and_round_trips(tmp_path):
+    storage = _storage(tmp_path)
+    photo = os.urandom(1024 * 1024)
+    notes = b"caption " * 4096
+    asyncio.run(storage.save(photo, "jobs/ab/job1/final.jpg"))
+    asyncio.run(storage.save(notes, "jobs/ab/job1/notes.txt"))
+
+    reads = []
+    original_iter = storage.store.iter_chunks
+
+    def counting_iter(key):
+        for chunk in original_iter(key):
+            reads.append(key)
+            yield chunk
+
+    storage.store.iter_chunks = counting_iter
+    stream = storage.iter_zip(["jobs/ab/job1/final.jpg", "jobs/ab/job1/notes.txt"])
+
+    # The first bytes go out after one read, not after the whole photo is buffered
+    first = next(stream)
+    assert first.startswith(b"PK\x03\x04")
+    assert len(reads) == 1
+    chunks = [first, *stream]
+    assert len(chunks) > 10
+    assert max(len(c) for c in chunks) < 256 * 1024
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as archive:
+        assert archive.namelist() == ["final.jpg", "notes.txt"]
+        assert archive.read("final.jpg") == photo
+        assert archive.read("notes.txt") == notes
+        # Already-compressed images are stored as-is; text is deflated
+        assert archive.getinfo("final.jpg").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("notes.txt").compress_type == zipfile.ZIP_DEFLATED
+        assert archive.testzip() is None
+
+
+def test_create_zip_stores_the_archive(tmp_path):
+    storage = _storage(tmp_path)
+    asyncio.run(storage.save(b"\xff\xd8image", "jobs/ab/job1/final.jpg"))
+    key = asyncio.run(storage.create_zip(["jobs/ab/job1/final.jpg"], "jobs/ab/job1/all.zip"))
+    data = asyncio.run(storage.load(key))
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.read("final.jpg") == b"\xff\xd8image"
@@ -0,0 +1,82 @@
+"""Span nesting and the background JSONL exporter."""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+import tracing
+from tracing import JsonlSpanExporter, span, traced, STATUS_ERROR
+
+
+@pytest.fixture
+def exported(tmp_path, monkeypatch):
+    """Routes spans to a fresh exporter; call the result to close it and read the spans."""
+    path = tmp_path / "traces.jsonl"
+    exporter = JsonlSpanExporter(str(path))
+    monkeypatch.setattr(tracing, "_exporter", exporter)
+
+    def read() -> dict[str, dict]:
+        exporter.close()
+        lines = path.read_text().splitlines()
+        return {item["name"]: item for item in map(json.loads, lines)}
+
+    return read
+
+
+def test_spans_nest_across_tasks_and_export_as_otlp(exported):
+    @traced("child")
+    async def child():
+        await asyncio.sleep(0)
+
+    async def run():
+        with span("job", **{"job.id": "abc", "photos": 2}):
+            await asyncio.gather(child(), asyncio.create_task(child()))
+
+    asyncio.run(run())
+    spans = exported()
+
+    root = spans["job"]
+    assert "parentSpanId" not in root
+    assert {"key": "photos", "value": {"intValue": "2"}} in root["attributes"]
+    assert {"key": "job.id", "value": {"stringValue": "abc"}} in root["attributes"]
+    child_span = spans["child"]
+    assert child_span["traceId"] == root["traceId"]
+    assert child_span["parentSpanId"] == root["spanId"]
+    assert int(root["endTimeUnixNano"]) >= int(root["startTimeUnixNano"])
+
+
+def test_errors_are_recorded_and_reraised(exported):
+    with pytest.raises(ValueError):
+        with span("failing"):
+            raise ValueError("bad input")
+    failing = exported()["failing"]
+    assert failing["status"] == {"code": STATUS_ERROR, "message": "ValueError: bad input"}
+
+
+def test_close_writes_every_queued_span(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    exporter = JsonlSpanExporter(str(path))
+    for i in range(500):
+        item = tracing.Span(f"s{i}", trace_id="t" * 32)
+        item.end()
+        exporter.export(item)
+    exporter.close()
+    assert len(path.read_text().splitlines()) == 500
+    assert not exporter._writer.is_alive()
+
+
+def test_failed_write_does_not_stop_the_writer(tmp_path):
+    directory = tmp_path / "missing"
+    exporter = JsonlSpanExporter(str(directory / "traces.jsonl"))
+    exporter.export(tracing.Span("lost", trace_id="t" * 32))
+    while not exporter._spans.empty():
+        time.sleep(0.01)
+
+    # Once the path is writable again, later spans go out
+    directory.mkdir()
+    exporter.export(tracing.Span("later", trace_id="t" * 32))
+    exporter.close()
+    names = [json.loads(line)["name"] for line in (directory / "traces.jsonl").read_text().splitlines()]
+    assert "later" in names
@@ -0,0 +1,80 @@
+"""Request-body cap on the upload routes."""
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from config import config
+from upload_limit import UploadSizeLimitMiddleware, body_limit
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(config, "MAX_UPLOAD_SIZE_MB", 1)
+    monkeypatch.setattr(config, "MAX_UPLOAD_SIZE_BYTES", 1024 * 1024)
+    monkeypatch.setattr(config, "MAX_PHOTOS_PER_REQUEST", 3)
+
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimitMiddleware)
+
+    @app.post("/api/enhance")
+    async def enhance(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    @app.post("/api/enhance/batch")
+    async def batch(files: list[UploadFile] = File(...)):
+        return {"files": len(files)}
+
+    @app.post("/api/other")
+    async def other(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    return TestClient(app)
+
+
+def _file(size: int) -> dict:
+    return {"file": ("photo.jpg", b"\xff" * size, "image/jpeg")}
+
+
+def test_batch_route_allows_one_file_per_photo(client):
+    overhead = config.UPLOAD_FORM_OVERHEAD_BYTES
+    assert body_limit("/api/enhance") == 1024 * 1024 + overhead
+    assert body_limit("/api/enhance/batch") == 3 * 1024 * 1024 + overhead
+
+
+def test_upload_within_the_limit_passes(client):
+    response = client.post("/api/enhance", files=_file(512 * 1024))
+    assert response.status_code == 200
+    assert response.json() == {"size": 512 * 1024}
+
+
+def test_declared_length_over_the_limit_is_rejected_up_front(client):
+    limit = body_limit("/api/enhance")
+    response = client.post(
+        "/api/enhance",
+        content=b"x" * 16,
+        headers={"content-length": str(limit + 1), "content-type": "multipart/form-data; boundary=b"},
+    )
+    assert response.status_code == 413
+    assert "Maximum size: 1MB" in response.json()["detail"]
+
+
+def test_body_larger_than_declared_is_cut_off_while_streaming(client):
+    def chunks():
+        # No Content-Length: the body arrives chunked and crosses the limit mid-stream
+        yield b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.jpg\"\r\n\r\n"
+        for _ in range(40):
+            yield b"\xff" * 64 * 1024
+        yield b"\r\n--b--\r\n"
+
+    response = client.post(
+        "/api/enhance",
+        content=chunks(),
+        headers={"content-type": "multipart/form-data; boundary=b"},
+    )
+    assert response.status_code == 413
+
+
+def test_other_routes_are_not_limited(client):
+    response = client.post("/api/other", files=_file(2 * 1024 * 1024))
+    assert response.status_code == 200
@@ -0,0 +1,55 @@
+"""Bounded waits on process warm-up."""
+
+import asyncio
+
+import pytest
+
+import warmup
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    monkeypatch.setattr(warmup, "_state", warmup._WarmUpState())
+
+
+def _noop():
+    pass
+
+
+async def _anoop():
+    pass
+
+
+def test_wait_times_out_when_warm_up_never_ran():
+    assert asyncio.run(warmup.wait_until_ready(0.01)) is False
+    assert warmup.readiness()["status"] == "starting"
+
+
+def test_wait_reports_a_failed_warm_up(monkeypatch):
+    def broken():
+        raise RuntimeError("no model clients")
+
+    monkeypatch.setattr(warmup, "_import_pipeline", broken)
+
+    async def run():
+        await warmup.warm_up()
+        return await warmup.wait_until_ready(1)
+
+    assert asyncio.run(run()) is False
+    assert warmup.readiness()["status"] == "failed"
+    assert warmup.readiness()["error"] == "no model clients"
+
+
+def test_wait_returns_once_warm_up_succeeds(monkeypatch):
+    monkeypatch.setattr(warmup, "_import_pipeline", _noop)
+    monkeypatch.setattr(warmup, "_model_clients", _noop)
+    monkeypatch.setattr(warmup, "_agents", _anoop)
+    monkeypatch.setattr(warmup, "_style_library", _anoop)
+
+    async def run():
+        waiter = asyncio.create_task(warmup.wait_until_ready(5))
+        await warmup.warm_up()
+        return await waiter
+
+    assert asyncio.run(run()) is True
+    assert warmup.is_ready()
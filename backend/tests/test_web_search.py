@@ -0,0 +1,47 @@
+"""Reference photo search over one shared HTTP client."""
+
+import asyncio
+
+import httpx
+
+from config import config
+from mcp_servers import web_search
+from mcp_servers.web_search import WebSearchMCP
+
+
+def _handler(request: httpx.Request) -> httpx.Response:
+    if request.url.host == "api.unsplash.com":
+        photo = {"urls": {"regular": "https://images.example/a.jpg", "thumb": "t"}, "user": {"name": "A"}}
+        return httpx.Response(200, json={"results": [photo]})
+    if request.url.host == "api.pexels.com":
+        photo = {"src": {"large": "https://images.example/b.jpg", "small": "s"}}
+        return httpx.Response(200, json={"photos": [photo]})
+    return httpx.Response(200, content=b"\xff\xd8jpeg")
+
+
+def test_searches_and_downloads_share_one_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "UNSPLASH_API_KEY", "u")
+    monkeypatch.setattr(config, "PEXELS_API_KEY", "p")
+
+    created = []
+
+    class RecordingClient(httpx.AsyncClient):
+        def __init__(self, **kwargs):
+            super().__init__(transport=httpx.MockTransport(_handler), **kwargs)
+            created.append(self)
+
+    monkeypatch.setattr(web_search.httpx, "AsyncClient", RecordingClient)
+    search = WebSearchMCP()
+
+    async def run():
+        results = []
+        for _ in range(2):
+            results = await search.search_images("cafe portrait", count=2)
+        paths = [await search.download_image(r["url"]) for r in results]
+        return results, paths
+
+    results, paths = asyncio.run(run())
+    assert [r["source"] for r in results] == ["unsplash", "pexels"]
+    assert all(p and open(p, "rb").read() == b"\xff\xd8jpeg" for p in paths)
+    assert len(created) == 1
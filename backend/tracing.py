@@ -0,0 +1,254 @@
+from __future__ import annotations
+"""Lightweight per-job tracing with a local JSONL span exporter.
+
+Each job gets one root span; agents, MCP calls, HTTP requests, model calls
+and retry waits open child spans underneath it. Finished spans are appended
+to a JSONL file using the OTLP/JSON span layout (traceId, spanId,
+parentSpanId, startTimeUnixNano, ...) by a background writer thread, so a
+slow job can be broken down after the fact without running a collector.
+"""
+
+import asyncio
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from config import config
+
+logger = logging.getLogger("glowup.tracing")
+
+# Ends the exporter's writer thread
+_STOP = object()
+
+# OTLP span kinds / status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "glowup_current_span", default=None
+)
+
+
+def _otlp_value(value) -> dict:
+    """Encode a Python value as an OTLP AnyValue."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    """A single timed operation within a trace."""
+
+    __slots__ = (
+        "name", "trace_id", "span_id", "parent_id", "kind",
+        "attributes", "events", "start_ns", "end_ns", "status", "status_message",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: str | None = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: dict | None = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.events: list[tuple[str, int, dict]] = []
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+        self.status = STATUS_OK
+        self.status_message = ""
+
+    def set_attribute(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def add_event(self, name: str, **attributes) -> None:
+        self.events.append((name, time.time_ns(), attributes))
+
+    def record_error(self, exc: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"[:500]
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end_ns or time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def to_otlp(self) -> dict:
+        """Serialize using the OTLP/JSON span field names."""
+        data = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or time.time_ns()),
+            "attributes": [
+                {"key": k, "value": _otlp_value(v)}
+                for k, v in self.attributes.items() if v is not None
+            ],
+            "status": {"code": self.status},
+        }
+        if self.parent_id:
+            data["parentSpanId"] = self.parent_id
+        if self.status_message:
+            data["status"]["message"] = self.status_message
+        if self.events:
+            data["events"] = [
+                {
+                    "name": name,
+                    "timeUnixNano": str(ts),
+                    "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in attrs.items()],
+                }
+                for name, ts, attrs in self.events
+            ]
+        return data
+
+
+class JsonlSpanExporter:
+    """Appends finished spans to a local JSONL file, one span per line.
+
+    ``export`` only queues the span; a writer thread serializes and writes
+    it, so finishing a span never does file I/O on the event loop.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._spans: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name="trace-export", daemon=True)
+        self._writer.start()
+
+    def export(self, span: Span) -> None:
+        self._spans.put(span)
+
+    def close(self) -> None:
+        """Write the queued spans and stop the writer thread."""
+        if self._writer.is_alive():
+            self._spans.put(_STOP)
+            self._writer.join(timeout=5)
+
+    def _write_loop(self) -> None:
+        file = None
+        try:
+            while True:
+                batch = [self._spans.get()]
+                # Whatever else has finished meanwhile goes out in the same write
+                while batch[-1] is not _STOP:
+                    try:
+                        batch.append(self._spans.get_nowait())
+                    except queue.Empty:
+                        break
+                spans = [item for item in batch if item is not _STOP]
+                if spans:
+                    lines = "".join(
+                        json.dumps(item.to_otlp(), separators=(",", ":")) + "\n" for item in spans
+                    )
+                    try:
+                        if file is None:
+                            file = open(self.path, "a", encoding="utf-8")
+                        file.write(lines)
+                        file.flush()
+                    except OSError as e:
+                        logger.warning("tracing.export_failed path=%s error=%s", self.path, str(e))
+                if batch[-1] is _STOP:
+                    return
+        finally:
+            if file is not None:
+                file.close()
+
+
+_exporter: JsonlSpanExporter | None = (
+    JsonlSpanExporter(config.TRACE_EXPORT_PATH) if config.TRACING_ENABLED else None
+)
+if _exporter is not None:
+    atexit.register(_exporter.close)
+
+
+@contextmanager
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+    """Open a child span of the current span (or a new root span).
+
+    Works in both sync and async code — the active span is tracked in a
+    context variable, so tasks created inside a span inherit it as parent.
+    """
+    parent = _current_span.get()
+    current = Span(
+        name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        parent_id=parent.span_id if parent else None,
+        kind=kind,
+        attributes=attributes,
+    )
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_error(e)
+        raise
+    finally:
+        current.end()
+        _current_span.reset(token)
+        if _exporter is not None:
+            _exporter.export(current)
+        if parent is None:
+            logger.debug(
+                "trace.done name=%s trace_id=%s duration_ms=%.0f",
+                name, current.trace_id, current.duration_ms,
+            )
+
+
+def traced(name: str, kind: int = SPAN_KIND_INTERNAL):
+    """Decorator that wraps a sync or async function call in a span."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, kind=kind):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            with span(name, kind=kind):
+                return func(*args, **kwargs)
+        return sync_wrapper
+    return decorator
+
+
+async def traced_async_sleep(seconds: float) -> None:
+    """Drop-in for tenacity's ``sleep`` that records each backoff wait as a span."""
+    with span("retry.wait", **{"retry.sleep_s": round(seconds, 3)}):
+        await asyncio.sleep(seconds)
+
+
+def current_span() -> Span | None:
+    """Return the active span, if any."""
+    return _current_span.get()
+
+
+def current_trace_id() -> str | None:
+    """Return the trace id of the active span, if any."""
+    active = _current_span.get()
+    return active.trace_id if active else None
@@ -0,0 +1,82 @@
+from __future__ import annotations
+"""Request-body limit for upload endpoints, enforced before the form is parsed.
+
+Starlette spools a multipart body to a temporary file while it parses the
+form, so an ``UploadFile`` only exists once the whole request has been
+received. The per-file check in the upload handlers therefore cannot stop a
+client from sending far more than MAX_UPLOAD_SIZE_MB. This ASGI middleware
+caps the request body itself: a declared Content-Length over the limit is
+answered with 413 without reading any of the body, and a body that turns
+out to be larger than declared (or has no Content-Length) is cut off as
+soon as it crosses the limit.
+"""
+
+import logging
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from config import config
+
+logger = logging.getLogger("glowup.upload_limit")
+
+# Routes that take uploads; batch requests may carry several files
+_UPLOAD_PATH_PREFIX = "/api/enhance"
+_BATCH_PATH = "/api/enhance/batch"
+
+
+def too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large. Maximum size: {config.MAX_UPLOAD_SIZE_MB}MB",
+    )
+
+
+def body_limit(path: str) -> int:
+    """Largest request body accepted for an upload route."""
+    files = config.MAX_PHOTOS_PER_REQUEST if path == _BATCH_PATH else 1
+    return files * config.MAX_UPLOAD_SIZE_BYTES + config.UPLOAD_FORM_OVERHEAD_BYTES
+
+
+class UploadSizeLimitMiddleware:
+    """Reject oversized upload requests without receiving their bodies."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or not scope["path"].startswith(_UPLOAD_PATH_PREFIX)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        limit = body_limit(scope["path"])
+        declared = dict(scope["headers"]).get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            logger.info(
+                "upload_limit.reject path=%s content_length=%s limit=%d",
+                scope["path"], declared.decode(), limit,
+            )
+            error = too_large()
+            response = JSONResponse({"detail": error.detail}, status_code=error.status_code)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised while the form is parsed, so the app answers 413
+                    logger.info(
+                        "upload_limit.reject path=%s received=%d limit=%d",
+                        scope["path"], received, limit,
+                    )
+                    raise too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
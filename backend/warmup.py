@@ -0,0 +1,141 @@
+from __future__ import annotations
+"""Process warm-up — pays cold-start costs before the first job instead of during it.
+
+The server module imports only what it needs to accept requests; the
+pipeline (model SDK, NumPy, HTTP client, retry library) is imported here in a
+worker thread, so liveness checks are answered while it loads. Warm-up then
+creates the per-key model clients and governors, builds the app-scoped agents
+(opening the prompt library: schema migrations, vector index) and fills the
+library caches. Readiness is
+reported only once every step has run; job handlers wait a bounded time for
+it and answer 503 if warm-up failed or has not finished.
+"""
+
+import asyncio
+import importlib
+import logging
+import time
+from tracing import span
+
+logger = logging.getLogger("glowup.warmup")
+
+# Heavy third-party modules, imported (and timed) individually so the startup
+# log doubles as an import-time profile
+_HEAVY_MODULES = ("google.genai", "numpy", "PIL.Image", "httpx", "tenacity")
+
+
+class _WarmUpState:
+    def __init__(self):
+        self.status = "starting"
+        self.error: str | None = None
+        self.duration_ms: int | None = None
+        self.steps: dict[str, int] = {}
+        self._done: asyncio.Event | None = None
+
+    @property
+    def done(self) -> asyncio.Event:
+        # Created on first use, inside the server's event loop
+        if self._done is None:
+            self._done = asyncio.Event()
+        return self._done
+
+
+_state = _WarmUpState()
+
+
+async def _step(name: str, func, *args):
+    """Run one warm-up step (sync steps go to a worker thread) and record its duration."""
+    started = time.perf_counter()
+    with span("warmup.step", step=name):
+        if asyncio.iscoroutinefunction(func):
+            result = await func(*args)
+        else:
+            result = await asyncio.to_thread(func, *args)
+    duration_ms = int((time.perf_counter() - started) * 1000)
+    _state.steps[name] = duration_ms
+    logger.info("warmup.step name=%s duration_ms=%d", name, duration_ms)
+    return result
+
+
+def _import_pipeline():
+    for module in _HEAVY_MODULES:
+        started = time.perf_counter()
+        importlib.import_module(module)
+        logger.info(
+            "warmup.import module=%s duration_ms=%d",
+            module, int((time.perf_counter() - started) * 1000),
+        )
+    importlib.import_module("pipeline")
+
+
+def _model_clients() -> None:
+    from config import config
+    from key_pool import key_pool
+    from model_governor import governor_for
+
+    key_pool.warm_clients()
+    for model in config.MODEL_CONCURRENCY:
+        governor_for(model)
+
+
+async def _agents() -> None:
+    from agents.registry import get_agents
+
+    # Opening the prompt library runs migrations and loads the vector index — blocking
+    agents = await asyncio.to_thread(get_agents)
+    await agents.architect.load_library_context()
+
+
+async def _style_library() -> None:
+    from mcp_servers.style_library import StyleLibraryMCP
+
+    styles = await StyleLibraryMCP().get_all_styles()
+    logger.info("warmup.styles count=%d", len(styles))
+
+
+async def warm_up() -> None:
+    """Run every warm-up step once; marks the process ready (or failed) when done."""
+    started = time.perf_counter()
+    try:
+        with span("warmup"):
+            await _step("imports", _import_pipeline)
+            await _step("model_clients", _model_clients)
+            await _step("agents", _agents)
+            await _step("style_library", _style_library)
+        _state.status = "ready"
+    except asyncio.CancelledError:
+        _state.status = "stopped"
+        raise
+    except Exception as e:
+        # Readiness and job handlers report 503 from here on, so the process gets replaced
+        _state.status = "failed"
+        _state.error = str(e)
+        logger.error("warmup.failed error=%s", str(e))
+    finally:
+        _state.duration_ms = int((time.perf_counter() - started) * 1000)
+        _state.done.set()
+    if _state.status == "ready":
+        logger.info("warmup.ready duration_ms=%d steps=%s", _state.duration_ms, _state.steps)
+
+
+async def wait_until_ready(timeout: float | None = None) -> bool:
+    """Wait up to ``timeout`` seconds for warm-up; True only if it succeeded."""
+    try:
+        await asyncio.wait_for(_state.done.wait(), timeout)
+    except asyncio.TimeoutError:
+        return False
+    return is_ready()
+
+
+def readiness() -> dict:
+    """Warm-up status for the readiness endpoint."""
+    return {
+        "status": _state.status,
+        "duration_ms": _state.duration_ms,
+        "steps": dict(_state.steps),
+        "error": _state.error,
+    }
+
+
+def is_ready() -> bool:
+    return _state.status == "ready"